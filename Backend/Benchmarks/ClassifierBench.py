@@ -0,0 +1,125 @@
+"""
+Accuracy vs latency of the food classifier backends on a held-out image set.
+
+The image set is a directory with one sub-directory per label, named like the
+model's labels (e.g. held_out/biryani/*.jpg). Each backend classifies every
+image one at a time (the latency a single /predict sees). The script reports:
+- top-1 / top-5 accuracy
+- P50 / P95 latency
+- resident memory added by loading the backend
+- agreement of its top-1 label with the first backend
+
+ONNX backends need an export first: python -m Engines.ML_Engine.export_onnx
+
+Run from Backend/:
+    python -m Benchmarks.ClassifierBench held_out/ [--backends torch,torch-int8,onnx,onnx-int8]
+                                                  [--model rajistics/finetuned-indian-food] [--limit 500]
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from PIL import Image
+
+from Engines.ML_Engine.backends import BACKENDS, load_classifier
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def _normalize_label(label: str) -> str:
+    return label.lower().replace("-", " ").replace("_", " ").strip()
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def load_images(image_dir: str, limit: int):
+    samples = []
+    for label in sorted(os.listdir(image_dir)):
+        label_dir = os.path.join(image_dir, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for file_name in sorted(os.listdir(label_dir)):
+            if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                samples.append((os.path.join(label_dir, file_name), _normalize_label(label)))
+
+    samples = samples[:limit] if limit else samples
+    return [(Image.open(path).convert("RGB"), label) for path, label in samples]
+
+
+def benchmark(backend: str, model_path: str, samples):
+    rss_before = _rss_mb()
+    classifier = load_classifier(model_path, backend)
+    rss_added = _rss_mb() - rss_before
+
+    # Warm-up
+    for image, _ in samples[:3]:
+        classifier.predict_batch([image], 5)
+
+    latencies, predictions = [], []
+    top1 = top5 = 0
+    for image, label in samples:
+        start = time.perf_counter()
+        top = classifier.predict_batch([image], 5)[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        labels = [_normalize_label(p["label"]) for p in top]
+        predictions.append(labels[0])
+        top1 += labels[0] == label
+        top5 += label in labels
+
+    latencies.sort()
+    return {
+        "backend": backend,
+        "top1": top1 / len(samples),
+        "top5": top5 / len(samples),
+        "p50": statistics.median(latencies),
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "rss": rss_added,
+        "predictions": predictions
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image_dir")
+    parser.add_argument("--model", default="rajistics/finetuned-indian-food")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--limit", type=int, default=0)
+    args = parser.parse_args()
+
+    samples = load_images(args.image_dir, args.limit)
+    if not samples:
+        print(f"❌ No images found under {args.image_dir}")
+        return
+
+    print(f"🚀 {len(samples)} held-out images, model {args.model}")
+
+    results = []
+    for backend in args.backends.split(","):
+        try:
+            results.append(benchmark(backend.strip(), args.model, samples))
+            print(f"✅ {backend} done")
+        except Exception as e:
+            print(f"❌ {backend} skipped: {e}")
+
+    if not results:
+        return
+
+    reference = results[0]["predictions"]
+    print(f"\n{'Backend':<12} {'Top-1':>7} {'Top-5':>7} {'P50 ms':>8} {'P95 ms':>8} {'+RSS MB':>8} {'Agree':>7}")
+    print("-" * 63)
+    for r in results:
+        agreement = sum(a == b for a, b in zip(r["predictions"], reference)) / len(reference)
+        print(f"{r['backend']:<12} {r['top1']:>7.1%} {r['top5']:>7.1%} {r['p50']:>8.1f} {r['p95']:>8.1f} "
+              f"{r['rss']:>8.0f} {agreement:>7.1%}")
+
+    print("\nNote: +RSS is measured in one process, so later backends may reuse libraries loaded by earlier ones.")
+
+
+if __name__ == "__main__":
+    main()
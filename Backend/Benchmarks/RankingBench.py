@@ -0,0 +1,214 @@
+"""
+Micro-benchmark: ranking USDA search results for one ingredient.
+
+Compares the old path (render the response to text, regex-parse it back with
+parse_food_items, score, then look the winner up again by fdc_id) with
+rank_food_items scoring FoodItem objects directly. Uses synthetic responses
+shaped like a real search page (20 foods, ~60 nutrients each), so no API key
+or network is needed.
+
+Run from Backend/:
+    python -m Benchmarks.RankingBench [ingredients_per_meal] [meals]
+"""
+
+import random
+import re
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from Engines.Analysis.MacroBreakdown import FoodItem, Nutrient, rank_food_items
+
+CATEGORIES = [
+    "Vegetables and Vegetable Products", "Fruits and Fruit Juices", "Poultry Products",
+    "Fast Foods", "Soups, Sauces, and Gravies", "Baked Products", "Dairy and Egg Products",
+    "Legumes and Legume Products", "Restaurant Foods", "Spices and Herbs",
+]
+
+SUFFIXES = [", raw", ", cooked, boiled", ", canned", " sauce", ", frozen, prepared", " bread", ", dried", ""]
+
+
+def make_response(ingredient: str, rng: random.Random, page_size: int = 20, num_nutrients: int = 60):
+    return [
+        FoodItem(
+            name=f"{ingredient.title()}{rng.choice(SUFFIXES)}",
+            fdc_id=rng.randint(100000, 9999999),
+            category=rng.choice(CATEGORIES),
+            nutrients=[
+                Nutrient(name="Protein" if n == 0 else f"Nutrient {n}", amount=rng.random(), unit="G")
+                for n in range(rng.randint(num_nutrients // 2, num_nutrients))
+            ]
+        )
+        for _ in range(page_size)
+    ]
+
+
+# The original text-based ranking helpers, copied verbatim as the baseline (no shared code with MacroBreakdown)
+def parse_food_items(text: str) -> List[Dict]:
+    """Parse food items from the text output."""
+    items = []
+    lines = text.strip().split('\n')
+
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+
+        if '(ID:' in line and ')' in line:
+            match = re.match(r'(.+?)\s+\(ID:\s*(\d+)\)', line)
+            if match:
+                item = {
+                    'name': match.group(1).strip(),
+                    'id': match.group(2),
+                    'category': '',
+                    'num_nutrients': 0,
+                    'protein': ''
+                }
+
+                if i + 1 < len(lines) and 'Category:' in lines[i + 1]:
+                    item['category'] = lines[i + 1].split('Category:')[1].strip()
+
+                if i + 2 < len(lines) and 'Number of nutrients:' in lines[i + 2]:
+                    num_match = re.search(r'(\d+)', lines[i + 2])
+                    if num_match:
+                        item['num_nutrients'] = int(num_match.group(1))
+
+                if i + 3 < len(lines) and 'Protein:' in lines[i + 3]:
+                    item['protein'] = lines[i + 3].split('Protein:')[1].strip()
+
+                items.append(item)
+                i += 4
+                continue
+        i += 1
+
+    return items
+
+
+def score_food_item(item: Dict, search_term: str) -> Tuple[int, int, int]:
+    """
+    Score a food item based on multiple criteria.
+    Returns a tuple (name_score, category_score, num_nutrients) for sorting.
+    """
+    name = item['name'].lower()
+    search = search_term.lower()
+    category = item['category'].lower()
+
+    name_score = 0
+
+    if name == f"{search}, raw":
+        name_score = 1000
+    elif name == search:
+        name_score = 900
+    elif name.startswith(f"{search}, "):
+        name_score = 800
+    elif name.startswith(search):
+        name_score = 700
+    elif search in name.split(',')[0]:
+        name_score = 600
+    elif search in name:
+        name_score = 500
+    else:
+        name_score = 0
+
+    preferred_categories = [
+        'vegetables', 'fruits', 'meats', 'poultry', 'fish', 'seafood',
+        'dairy', 'legumes', 'nuts', 'grains'
+    ]
+
+    avoid_categories = [
+        'fast food', 'prepared', 'frozen', 'restaurant', 'packaged'
+    ]
+
+    category_score = 0
+    for pref in preferred_categories:
+        if pref in category:
+            category_score = 100
+            break
+
+    for avoid in avoid_categories:
+        if avoid in category:
+            category_score = -50
+            break
+
+    if any(word in name for word in ['sauce', 'bread', 'frozen', 'prepared', 'fast food']):
+        name_score -= 100
+
+    if 'raw' in name:
+        name_score += 50
+
+    return (name_score, category_score, item['num_nutrients'])
+
+
+def find_best_food_item(text: str, search_term: str) -> Dict:
+    items = parse_food_items(text)
+
+    if not items:
+        return None
+
+    scored_items = [(item, score_food_item(item, search_term)) for item in items]
+    scored_items.sort(key=lambda x: (x[1][0], x[1][1], x[1][2]), reverse=True)
+
+    return scored_items[0][0]
+
+
+def rank_via_text(items, ingredient: str):
+    """The previous implementation of the ranking step."""
+    text_output = ""
+    for item in items:
+        protein = next((n for n in item.nutrients if n.name == "Protein"), None)
+
+        text_output += f"{item.name} (ID: {item.fdc_id})\n"
+        text_output += f"Category: {item.category}\n"
+        text_output += f"Number of nutrients: {len(item.nutrients)}\n"
+        if protein:
+            text_output += f"Protein: {protein.amount:.2f} {protein.unit}\n"
+        text_output += "\n"
+
+    best = find_best_food_item(text_output, ingredient)
+    return next((item for item in items if item.fdc_id == int(best['id'])), None)
+
+
+def main():
+    ingredients_per_meal = int(sys.argv[1]) if len(sys.argv) > 1 else 25
+    meals = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    rng = random.Random(0)
+    names = ["tomato", "onion", "chicken breast", "rice", "garlic", "potato", "paneer", "spinach", "lentils", "butter"]
+    workload = [
+        [(name, make_response(name, rng)) for name in rng.choices(names, k=ingredients_per_meal)]
+        for _ in range(meals)
+    ]
+    lookups = ingredients_per_meal * meals
+
+    print(f"🚀 Ranking {lookups} ingredient lookups ({meals} meals x {ingredients_per_meal} ingredients)")
+
+    start = time.perf_counter()
+    for meal in workload:
+        for name, items in meal:
+            rank_via_text(items, name)
+    text_elapsed = time.perf_counter() - start
+
+    # Fresh copies so cached lowercase names from a previous pass do not help
+    workload = [[(name, [item.model_copy() for item in items]) for name, items in meal] for meal in workload]
+
+    start = time.perf_counter()
+    for meal in workload:
+        for name, items in meal:
+            rank_food_items(items, name)
+    direct_elapsed = time.perf_counter() - start
+
+    mismatches = sum(
+        rank_via_text(items, name).fdc_id != rank_food_items(items, name).fdc_id
+        for meal in workload for name, items in meal
+    )
+
+    print(f"{'Path':<20} {'Total (ms)':>12} {'Per ingredient (us)':>22}")
+    print("-" * 56)
+    print(f"{'text round-trip':<20} {text_elapsed * 1000:>12.1f} {text_elapsed / lookups * 1e6:>22.1f}")
+    print(f"{'structured':<20} {direct_elapsed * 1000:>12.1f} {direct_elapsed / lookups * 1e6:>22.1f}")
+    print(f"\n✅ Speed-up: {text_elapsed / direct_elapsed:.1f}x, "
+          f"saving {(text_elapsed - direct_elapsed) / lookups * 1e6:.1f}us per ingredient")
+    print(f"✅ Same winner in {lookups - mismatches}/{lookups} lookups")
+
+
+if __name__ == "__main__":
+    main()
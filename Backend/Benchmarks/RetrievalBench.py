@@ -0,0 +1,122 @@
+"""
+Benchmark: recall versus latency of the RAG retriever's ANN index types.
+
+Builds every index type from AnnIndex.py over the same vectors and, for a
+sweep of nprobe (IVF) / efSearch (HNSW) values, reports recall@k against the
+exact flat index along with single-query p50/p95 latency, build time and
+index size. Vectors come from the saved vector store's flat index, so no
+embedding model is needed; queries are stored chunk vectors with noise added,
+standing in for questions phrased close to a passage. --synthetic N uses N
+clustered unit vectors instead, to see how the trade-off moves on a corpus
+larger than the bundled PDFs.
+
+Run from Backend/:
+    python -m Benchmarks.RetrievalBench [--store vectorstore/db_faiss] [--k 5] [--queries 500]
+    python -m Benchmarks.RetrievalBench --synthetic 100000
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import faiss
+import numpy as np
+
+from Engines.RAG.AnnIndex import INDEX_TYPES, build_ann_index, set_search_params
+from Engines.RAG.MemCreator import DB_FAISS_PATH
+
+NPROBE_SWEEP = [1, 4, 8, 16, 32, 64]
+EF_SEARCH_SWEEP = [16, 32, 64, 128, 256]
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def load_store_vectors(store: str) -> np.ndarray:
+    index = faiss.read_index(os.path.join(store, "index.faiss"))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def synthetic_vectors(count: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors in topic clusters, roughly how chunk embeddings of a few documents spread out"""
+    centres = _unit(rng.standard_normal((max(1, count // 200), dim)))
+    vectors = centres[rng.integers(0, len(centres), count)] + 0.08 * rng.standard_normal((count, dim))
+    return _unit(vectors).astype(np.float32)
+
+
+def make_queries(vectors: np.ndarray, count: int, noise: float, rng: np.random.Generator) -> np.ndarray:
+    picked = vectors[rng.integers(0, len(vectors), count)]
+    return _unit(picked + noise * rng.standard_normal(picked.shape) / np.sqrt(vectors.shape[1])).astype(np.float32)
+
+
+def measure(index: faiss.Index, queries: np.ndarray, truth: np.ndarray, k: int):
+    """Recall@k against `truth` and per-query latencies (one query per call, as the chatbot searches)"""
+    latencies, found = [], []
+    for query in queries:
+        started = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+        found.append(ids[0])
+
+    recall = np.mean([len(set(ids) & set(expected)) / k for ids, expected in zip(found, truth)])
+    latencies.sort()
+    return recall, statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=DB_FAISS_PATH)
+    parser.add_argument("--synthetic", type=int, default=0, help="use N synthetic vectors instead of the store")
+    parser.add_argument("--dim", type=int, default=384, help="synthetic vector size (MiniLM: 384)")
+    parser.add_argument("--k", type=int, default=5, help="retriever k (Query.py uses 5)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.5, help="query distance from its source chunk")
+    parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = synthetic_vectors(args.synthetic, args.dim, rng) if args.synthetic else load_store_vectors(args.store)
+    queries = make_queries(vectors, args.queries, args.noise, rng)
+
+    print(f"🚀 {len(vectors)} vectors of size {vectors.shape[1]}, {len(queries)} queries, k={args.k}, "
+          f"{faiss.omp_get_max_threads()} thread(s)")
+
+    exact = build_ann_index(vectors, "flat")
+    _, truth = exact.search(queries, args.k)
+
+    print(f"\n{'Index':<10} {'Param':<14} {'Recall@k':>9} {'p50 (us)':>10} {'p95 (us)':>10} "
+          f"{'Build (s)':>10} {'Size (MB)':>10}")
+    print("-" * 78)
+
+    for index_type in args.types:
+        started = time.perf_counter()
+        index = exact if index_type == "flat" else build_ann_index(vectors, index_type)
+        build = time.perf_counter() - started
+        size = faiss.serialize_index(index).nbytes / 1e6
+        built_as = type(index).__name__
+
+        if faiss.try_extract_index_ivf(index) is not None:
+            nlist = faiss.extract_index_ivf(index).nlist
+            sweep = [("nprobe", n, dict(nprobe=n)) for n in NPROBE_SWEEP if n <= nlist]
+        elif index_type == "hnsw":
+            sweep = [("efSearch", ef, dict(ef_search=ef)) for ef in EF_SEARCH_SWEEP]
+        else:
+            sweep = [("exact", "", {})]
+
+        for name, value, params in sweep:
+            set_search_params(index, **params)
+            recall, p50, p95 = measure(index, queries, truth, args.k)
+            print(f"{index_type:<10} {f'{name}={value}' if value != '' else name:<14} {recall:>9.3f} "
+                  f"{p50 * 1e6:>10.1f} {p95 * 1e6:>10.1f} {build:>10.2f} {size:>10.1f}")
+
+        if index_type == "ivf-pq" and built_as != "IndexIVFPQ":
+            print(f"{'':<10} (too few vectors for PQ, built {built_as})")
+
+    print("\n✅ Pick the cheapest row with acceptable recall; set FAISS_INDEX_TYPE for MemCreator "
+          "and FAISS_NPROBE / FAISS_EF_SEARCH for Query.py")
+
+
+if __name__ == "__main__":
+    main()
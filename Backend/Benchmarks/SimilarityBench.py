@@ -0,0 +1,135 @@
+"""
+Calibration check for the similarity bands in Engines/ML_Engine/similarity.py.
+
+Scores labelled (classifier label, user-typed name) pairs with MiniLM and
+reports, per expected band (same / related / different):
+- min / median / max cosine
+- how many pairs the current SIMILARITY_SAME_COSINE / SIMILARITY_RELATED_COSINE
+  put in the expected band
+- the thresholds that would separate this set best
+
+The built-in pairs are names users type for the classifier's Indian-food
+labels. --pairs takes a CSV of label,text,band rows instead (band is same,
+related or different), e.g. exported from logged meals.
+
+Run from Backend/:
+    python -m Benchmarks.SimilarityBench [--pairs pairs.csv]
+"""
+
+import argparse
+import csv
+import statistics
+from typing import List, Tuple
+
+from Engines.ML_Engine.similarity import RELATED_COSINE, SAME_COSINE, embed
+
+BANDS = ("same", "related", "different")
+
+PAIRS = [
+    ("butter_chicken", "butter chicken", "same"),
+    ("butter_chicken", "murgh makhani", "same"),
+    ("masala_dosa", "dosa with potato filling", "same"),
+    ("paani_puri", "golgappe", "same"),
+    ("chole_bhature", "chole bhature", "same"),
+    ("biryani", "chicken biryani", "same"),
+    ("samosa", "aloo samosa", "same"),
+    ("kulfi", "malai kulfi", "same"),
+    ("pav_bhaji", "pav bhaji", "same"),
+    ("momos", "steamed dumplings", "same"),
+    ("chai", "masala tea", "same"),
+    ("idli", "idli sambar", "same"),
+    ("kaathi_rolls", "kathi roll", "same"),
+    ("fried_rice", "veg fried rice", "same"),
+    ("pizza", "margherita pizza", "same"),
+    ("dhokla", "khaman dhokla", "same"),
+    ("kadai_paneer", "kadhai paneer", "same"),
+    ("pakode", "onion pakora", "same"),
+
+    ("butter_chicken", "chicken tikka masala", "related"),
+    ("masala_dosa", "idli", "related"),
+    ("paani_puri", "bhel puri", "related"),
+    ("biryani", "pulao", "related"),
+    ("samosa", "kachori", "related"),
+    ("kulfi", "ice cream", "related"),
+    ("chai", "coffee", "related"),
+    ("chole_bhature", "chana masala", "related"),
+    ("pizza", "garlic bread", "related"),
+    ("burger", "sandwich", "related"),
+    ("momos", "spring rolls", "related"),
+    ("fried_rice", "noodles", "related"),
+    ("kadai_paneer", "paneer butter masala", "related"),
+    ("jalebi", "gulab jamun", "related"),
+    ("dhokla", "khandvi", "related"),
+    ("pav_bhaji", "vada pav", "related"),
+
+    ("butter_chicken", "ice cream", "different"),
+    ("masala_dosa", "chocolate cake", "different"),
+    ("biryani", "green salad", "different"),
+    ("kulfi", "chicken curry", "different"),
+    ("chai", "pizza", "different"),
+    ("samosa", "fruit smoothie", "different"),
+    ("jalebi", "grilled fish", "different"),
+    ("momos", "oatmeal", "different"),
+    ("burger", "mango lassi", "different"),
+    ("pizza", "dal", "different"),
+    ("idli", "steak", "different"),
+    ("pav_bhaji", "apple", "different"),
+    ("fried_rice", "milkshake", "different"),
+    ("dhokla", "beef burger", "different"),
+    ("kadai_paneer", "boiled eggs", "different"),
+]
+
+
+def load_pairs(path: str) -> List[Tuple[str, str, str]]:
+    with open(path, newline="") as f:
+        pairs = [(row[0], row[1], row[2].strip().lower()) for row in csv.reader(f) if len(row) >= 3]
+    return [pair for pair in pairs if pair[2] in BANDS]
+
+
+def band(cosine: float, same: float, related: float) -> str:
+    if cosine >= same:
+        return "same"
+    return "related" if cosine >= related else "different"
+
+
+def best_threshold(scored: List[Tuple[float, str]], above: Tuple[str, ...]) -> float:
+    """Cut-off that puts the most pairs of `above` at or over it and the rest under it"""
+    cosines = sorted({cosine for cosine, _ in scored})
+    candidates = [(low + high) / 2 for low, high in zip(cosines, cosines[1:])] or cosines
+
+    def correct(threshold: float) -> int:
+        return sum((cosine >= threshold) == (expected in above) for cosine, expected in scored)
+
+    return max(candidates, key=correct)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", help="CSV of label,text,band rows (default: built-in pairs)")
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.pairs) if args.pairs else PAIRS
+    scored = [(float(embed(label) @ embed(text)), expected) for label, text, expected in pairs]
+
+    print(f"🚀 {len(scored)} pairs, current bands: same >= {SAME_COSINE}, related >= {RELATED_COSINE}\n")
+    print(f"{'Band':<10} {'Pairs':>6} {'Min':>7} {'Median':>7} {'Max':>7} {'In band':>8}")
+    print("-" * 50)
+
+    for name in BANDS:
+        cosines = [cosine for cosine, expected in scored if expected == name]
+        if not cosines:
+            continue
+        hits = sum(band(cosine, SAME_COSINE, RELATED_COSINE) == name for cosine in cosines)
+        print(f"{name:<10} {len(cosines):>6} {min(cosines):>7.3f} {statistics.median(cosines):>7.3f} "
+              f"{max(cosines):>7.3f} {hits:>4}/{len(cosines):<3}")
+
+    same = best_threshold(scored, ("same",))
+    related = best_threshold(scored, ("same", "related"))
+    correct = sum(band(cosine, same, related) == expected for cosine, expected in scored)
+
+    print(f"\n✅ Best split for this set: SIMILARITY_SAME_COSINE={same:.2f} "
+          f"SIMILARITY_RELATED_COSINE={related:.2f} ({correct}/{len(scored)} pairs in band)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import firebase_admin
 from dotenv import load_dotenv
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
 
 load_dotenv()
 
@@ -8,6 +8,8 @@ load_dotenv()
 cred = credentials.Certificate("firebaseSecret.json")
 firebase_admin.initialize_app(cred)
 firestoreDB = firestore.client()
+# Async client for route handlers, so Firestore reads don't block the event loop
+firestoreAsyncDB = firestore_async.client()
 
 
 
@@ -0,0 +1,269 @@
+"""
+Offline USDA FoodData Central index.
+
+Loads bulk FDC exports (Foundation, SR Legacy, FNDDS - JSON downloads or the
+CSV release directory) into a compact on-disk store:
+
+    <index>/matrix.npy  float32 nutrient matrix, one row per food, one column
+                        per nutrient, NaN where the food has no value
+    <index>/meta.json   fdc ids, descriptions, categories, nutrient names/units
+                        and an inverted token index over descriptions
+
+Amounts and units are stored as published; MacroBreakdown normalizes the
+selected food the same way it normalizes API responses.
+
+Build:
+    python -m Engines.Analysis.FoodDataIndex <out_dir> <source> [<source> ...]
+
+where each source is an FDC JSON file or a CSV directory containing food.csv,
+food_nutrient.csv and nutrient.csv (food_category.csv and, for FNDDS survey
+foods, wweia_food_category.csv optional).
+
+At runtime the index at FDC_INDEX_PATH (default fdc_index) is loaded lazily,
+and the matrix is memory-mapped.
+"""
+
+import csv
+import json
+import os
+import re
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+FDC_INDEX_PATH = os.getenv("FDC_INDEX_PATH", "fdc_index")
+
+# CSV data types matching the API search's dataType filter
+CSV_DATA_TYPES = {"foundation_food", "sr_legacy_food", "survey_fndds_food"}
+
+# Their food_category_id is a WWEIA category code, not a food_category.csv id
+SURVEY_DATA_TYPES = {"survey_fndds_food"}
+
+# Cap on candidates handed to the ranker for very common tokens
+MAX_CANDIDATES = 500
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens with a light plural strip (tomatoes -> tomato)"""
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if len(token) > 3 and token.endswith("es") and token[-3] in "osx":
+            token = token[:-2]
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class FoodDataIndex:
+
+    def __init__(self, matrix: np.ndarray, meta: Dict):
+        self.matrix = matrix
+        self.fdc_ids: List[int] = meta["fdc_ids"]
+        self.descriptions: List[str] = meta["descriptions"]
+        self.categories: List[str] = meta["categories"]
+        self.nutrient_names: List[str] = meta["nutrient_names"]
+        self.nutrient_units: List[str] = meta["nutrient_units"]
+        self.tokens: Dict[str, List[int]] = meta["tokens"]
+        self.num_nutrients: np.ndarray = np.asarray(meta["num_nutrients"], dtype=np.int32)
+
+        # Precomputed once so ranking does not lowercase per query
+        self.search_names = [description.lower() for description in self.descriptions]
+        self.search_categories = [category.lower() for category in self.categories]
+
+    @classmethod
+    def load(cls, path: str) -> "FoodDataIndex":
+        matrix = np.load(os.path.join(path, "matrix.npy"), mmap_mode="r")
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(matrix, meta)
+
+    def __len__(self) -> int:
+        return len(self.fdc_ids)
+
+    def search(self, query: str, limit: int = MAX_CANDIDATES) -> List[int]:
+        """Rows whose description contains every query token (empty if any token is unknown)"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        postings = []
+        for token in set(tokens):
+            rows = self.tokens.get(token)
+            if not rows:
+                return []
+            postings.append(rows)
+
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for rows in postings[1:]:
+            candidates.intersection_update(rows)
+            if not candidates:
+                return []
+
+        # Shorter descriptions are closer to the query when the ranker has to be capped
+        return sorted(candidates, key=lambda row: len(self.descriptions[row]))[:limit]
+
+    def candidate(self, row: int) -> Dict:
+        """Lightweight record with the name, id, category and nutrient count of a food"""
+        return {
+            "name": self.descriptions[row],
+            "id": str(self.fdc_ids[row]),
+            "category": self.categories[row],
+            "num_nutrients": int(self.num_nutrients[row]),
+        }
+
+    def nutrients(self, row: int) -> List[Tuple[str, float, str]]:
+        """(name, amount, unit) for every nutrient the food has a value for"""
+        values = self.matrix[row]
+        return [
+            (self.nutrient_names[col], round(float(values[col]), 6), self.nutrient_units[col])
+            for col in np.flatnonzero(~np.isnan(values))
+        ]
+
+
+_default_index: Optional[FoodDataIndex] = None
+_default_loaded = False
+_default_lock = threading.Lock()
+
+
+def get_default_index() -> Optional[FoodDataIndex]:
+    """The index at FDC_INDEX_PATH, or None if it has not been built"""
+    global _default_index, _default_loaded
+
+    if not _default_loaded:
+        with _default_lock:
+            if not _default_loaded:
+                if os.path.exists(os.path.join(FDC_INDEX_PATH, "meta.json")):
+                    _default_index = FoodDataIndex.load(FDC_INDEX_PATH)
+                    print(f"✅ Loaded FoodData Central index ({len(_default_index)} foods)")
+                _default_loaded = True
+
+    return _default_index
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+Food = Tuple[int, str, str, Dict[int, float]]  # fdc_id, description, category, {nutrient_id: amount}
+
+
+def _read_json_export(path: str, nutrient_info: Dict[int, Tuple[str, str]]) -> Iterable[Food]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    # FoundationFoods / SRLegacyFoods / SurveyFoods
+    foods = data if isinstance(data, list) else [
+        food for value in data.values() if isinstance(value, list) for food in value
+    ]
+
+    for food in foods:
+        category = food.get("foodCategory") or {}
+        category = category.get("description") if isinstance(category, dict) else category
+        if not category:
+            category = (food.get("wweiaFoodCategory") or {}).get("wweiaFoodCategoryDescription", "N/A")
+
+        amounts = {}
+        for entry in food.get("foodNutrients", []):
+            nutrient = entry.get("nutrient") or {}
+            if "id" not in nutrient or entry.get("amount") is None:
+                continue
+            nutrient_info.setdefault(nutrient["id"], (nutrient.get("name", ""), nutrient.get("unitName", "")))
+            amounts[nutrient["id"]] = float(entry["amount"])
+
+        yield food["fdcId"], food.get("description", ""), category or "N/A", amounts
+
+
+def _read_csv_export(directory: str, nutrient_info: Dict[int, Tuple[str, str]]) -> Iterable[Food]:
+    def rows(name):
+        with open(os.path.join(directory, name), encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+
+    categories, wweia_categories = {}, {}
+    if os.path.exists(os.path.join(directory, "food_category.csv")):
+        categories = {row["id"]: row["description"] for row in rows("food_category.csv")}
+    if os.path.exists(os.path.join(directory, "wweia_food_category.csv")):
+        wweia_categories = {
+            row["wweia_food_category"]: row["wweia_food_category_description"]
+            for row in rows("wweia_food_category.csv")
+        }
+
+    for row in rows("nutrient.csv"):
+        nutrient_info.setdefault(int(row["id"]), (row["name"], row["unit_name"]))
+
+    foods = {}
+    for row in rows("food.csv"):
+        if row["data_type"] in CSV_DATA_TYPES:
+            lookup = wweia_categories if row["data_type"] in SURVEY_DATA_TYPES else categories
+            category = lookup.get(row.get("food_category_id") or "", "N/A")
+            foods[int(row["fdc_id"])] = (row["description"], category, {})
+
+    for row in rows("food_nutrient.csv"):
+        food = foods.get(int(row["fdc_id"]))
+        if food is not None and row.get("amount"):
+            food[2][int(row["nutrient_id"])] = float(row["amount"])
+
+    for fdc_id, (description, category, amounts) in foods.items():
+        yield fdc_id, description, category, amounts
+
+
+def build_index(sources: List[str], out_dir: str) -> FoodDataIndex:
+    """Build and save an index from FDC JSON files and/or CSV directories"""
+    nutrient_info: Dict[int, Tuple[str, str]] = {}
+    foods: Dict[int, Food] = {}
+
+    for source in sources:
+        reader = _read_csv_export if os.path.isdir(source) else _read_json_export
+        count = 0
+        for food in reader(source, nutrient_info):
+            foods[food[0]] = food
+            count += 1
+        print(f"✅ Loaded: {source} ({count} foods)")
+
+    # Only keep nutrient columns that some food actually uses
+    used = sorted({nid for _, _, _, amounts in foods.values() for nid in amounts})
+    column = {nid: i for i, nid in enumerate(used)}
+
+    matrix = np.full((len(foods), len(used)), np.nan, dtype=np.float32)
+    fdc_ids, descriptions, categories, num_nutrients = [], [], [], []
+    tokens: Dict[str, List[int]] = {}
+
+    for row, (fdc_id, description, category, amounts) in enumerate(foods.values()):
+        for nid, amount in amounts.items():
+            matrix[row, column[nid]] = amount
+
+        fdc_ids.append(int(fdc_id))
+        descriptions.append(description)
+        categories.append(category)
+        num_nutrients.append(len(amounts))
+        for token in set(tokenize(description)):
+            tokens.setdefault(token, []).append(row)
+
+    meta = {
+        "fdc_ids": fdc_ids,
+        "descriptions": descriptions,
+        "categories": categories,
+        "nutrient_names": [nutrient_info[nid][0] for nid in used],
+        "nutrient_units": [nutrient_info[nid][1] for nid in used],
+        "num_nutrients": num_nutrients,
+        "tokens": tokens,
+    }
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "matrix.npy"), matrix)
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    print(f"✅ Index saved at: {out_dir} ({len(fdc_ids)} foods x {len(used)} nutrients, {len(tokens)} tokens)")
+    return FoodDataIndex(matrix, meta)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python -m Engines.Analysis.FoodDataIndex <out_dir> <source> [<source> ...]")
+        sys.exit(1)
+
+    build_index(sys.argv[2:], sys.argv[1])
@@ -1,14 +1,40 @@
+import asyncio
 import os
-import re
-from typing import Dict, Tuple, List
+from functools import cached_property, lru_cache
+from typing import Dict, Tuple, List, Optional, Union
 
 from dotenv import load_dotenv
-import requests
 from pydantic import BaseModel, Field, field_validator
 
+from Engines.Analysis.FoodDataIndex import get_default_index
+from Engines.Analysis.USDAClient import get_foods, run_sync, search_foods
+from Engines.Cache import TwoTierCache, normalize_key
+
 load_dotenv()
 
-API_KEY = os.getenv("USDA_KEY")
+# Selected breakdown per normalized ingredient (memory LRU + SQLite on disk)
+ingredient_cache = TwoTierCache(
+    "usda_ingredients",
+    ttl=float(os.getenv("USDA_CACHE_TTL", 30 * 24 * 3600)),
+    max_memory_items=int(os.getenv("USDA_CACHE_MEMORY_ITEMS", 2048))
+)
+
+# Chosen fdc_id per normalized ingredient, kept longer than the breakdowns so an
+# expired breakdown is refreshed with a bulk /foods call without searching again
+choice_cache = TwoTierCache(
+    "usda_choices",
+    ttl=float(os.getenv("USDA_CHOICE_TTL", 365 * 24 * 3600)),
+    max_memory_items=int(os.getenv("USDA_CACHE_MEMORY_ITEMS", 2048))
+)
+
+# fdc_ids per bulk /foods request (API maximum)
+BULK_FETCH_SIZE = 20
+
+# Full /foods records spell units in lowercase and micrograms as "µg"; search results use "G", "UG", ...
+FULL_RECORD_UNITS = {"µg": "UG", "μg": "UG"}
+
+# Lookups currently being resolved, by normalized ingredient (single-flight)
+_inflight: Dict[str, asyncio.Future] = {}
 
 # Unit conversion factors to standard units
 UNIT_CONVERSIONS = {
@@ -108,6 +134,19 @@ class FoodItem(BaseModel):
     category: str = Field(..., description="Food category")
     nutrients: List[Nutrient] = Field(..., description="List of nutrients in the food")
 
+    @cached_property
+    def search_name(self) -> str:
+        """Lowercased name used for ranking"""
+        return self.name.lower()
+
+    @cached_property
+    def category_rank(self) -> int:
+        return category_score(self.category.lower())
+
+    def score(self, search: str) -> Tuple[int, int, int]:
+        """Ranking key against a lowercased search term: (name score, category score, nutrient count)"""
+        return name_score(self.search_name, search), self.category_rank, len(self.nutrients)
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -150,163 +189,126 @@ class NutritionalDataResponse(BaseModel):
         return cls(food_items=data)
 
 
+async def analyse_ingredient_async(item: str) -> NutritionalDataResponse:
+    data = await search_foods(item, data_type="Foundation,Survey (FNDDS),SR Legacy", page_size=20)
+    return _parse_search_response(data)
+
+
 def analyse_ingredient(item: str) -> NutritionalDataResponse:
-    if not API_KEY:
-        raise ValueError("USDA_KEY not found in environment variables")
-
-    url = "https://api.nal.usda.gov/fdc/v1/foods/search"
-    params = {
-        "query": item,
-        "dataType": "Foundation,Survey (FNDDS),SR Legacy",
-        "pageSize": 20,
-        "api_key": API_KEY
-    }
+    return run_sync(analyse_ingredient_async(item))
 
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-    except requests.RequestException as e:
-        raise requests.RequestException(f"Failed to fetch data from USDA API: {e}")
-
-    results = []
-
-    for food in data.get("foods", []):
-        category = food.get("foodCategory", "N/A")
-        if isinstance(category, dict):
-            category = category.get("description", "N/A")
-
-        # Process nutrients with unit normalization
-        normalized_nutrients = []
-        for n in food.get("foodNutrients", []):
+
+def _parse_search_response(data: Dict) -> NutritionalDataResponse:
+    return NutritionalDataResponse.from_list([_parse_food(food) for food in data.get("foods", [])])
+
+
+def _parse_food(food: Dict) -> Dict:
+    """FoodItem fields from a search result or a full /foods record."""
+    category = food.get("foodCategory") or food.get("wweiaFoodCategory") or "N/A"
+    if isinstance(category, dict):
+        category = category.get("description") or category.get("wweiaFoodCategoryDescription", "N/A")
+
+    # Process nutrients with unit normalization
+    normalized_nutrients = []
+    for n in food.get("foodNutrients", []):
+        if "nutrient" in n:
+            # Full record: {"nutrient": {"name", "unitName"}, "amount"}. Rows without an
+            # amount are group headings, which search results never list
+            if "amount" not in n:
+                continue
+            nutrient_name = n["nutrient"].get("name")
+            original_amount = n.get("amount", 0.0) or 0.0
+            unit = n["nutrient"].get("unitName", "")
+            original_unit = FULL_RECORD_UNITS.get(unit, unit.upper())
+        else:
+            nutrient_name = n.get("nutrientName")
             original_amount = n.get("value", 0.0) or 0.0
             original_unit = n.get("unitName", "")
 
-            # Normalize the unit
-            normalized_amount, normalized_unit = normalize_unit(original_amount, original_unit)
-
-            normalized_nutrients.append({
-                "name": n.get("nutrientName"),
-                "amount": normalized_amount,
-                "unit": normalized_unit,
-                "original_amount": original_amount,
-                "original_unit": original_unit
-            })
-
-        results.append({
-            "name": food.get("description"),
-            "fdc_id": food.get("fdcId"),
-            "category": category,
-            "nutrients": normalized_nutrients
-        })
+        if nutrient_name is None:
+            continue
 
-    return NutritionalDataResponse.from_list(results)
+        # Normalize the unit
+        normalized_amount, normalized_unit = normalize_unit(original_amount, original_unit)
 
+        normalized_nutrients.append({
+            "name": nutrient_name,
+            "amount": normalized_amount,
+            "unit": normalized_unit,
+            "original_amount": original_amount,
+            "original_unit": original_unit
+        })
 
-def parse_food_items(text: str) -> List[Dict]:
-    """Parse food items from the text output."""
-    items = []
-    lines = text.strip().split('\n')
+    return {
+        "name": food.get("description"),
+        "fdc_id": food.get("fdcId"),
+        "category": category,
+        "nutrients": normalized_nutrients
+    }
 
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
 
-        if '(ID:' in line and ')' in line:
-            match = re.match(r'(.+?)\s+\(ID:\s*(\d+)\)', line)
-            if match:
-                item = {
-                    'name': match.group(1).strip(),
-                    'id': match.group(2),
-                    'category': '',
-                    'num_nutrients': 0,
-                    'protein': ''
-                }
+PREFERRED_CATEGORIES = (
+    'vegetables', 'fruits', 'meats', 'poultry', 'fish', 'seafood',
+    'dairy', 'legumes', 'nuts', 'grains'
+)
 
-                if i + 1 < len(lines) and 'Category:' in lines[i + 1]:
-                    item['category'] = lines[i + 1].split('Category:')[1].strip()
+AVOID_CATEGORIES = (
+    'fast food', 'prepared', 'frozen', 'restaurant', 'packaged'
+)
 
-                if i + 2 < len(lines) and 'Number of nutrients:' in lines[i + 2]:
-                    num_match = re.search(r'(\d+)', lines[i + 2])
-                    if num_match:
-                        item['num_nutrients'] = int(num_match.group(1))
+PENALISED_WORDS = ('sauce', 'bread', 'frozen', 'prepared', 'fast food')
 
-                if i + 3 < len(lines) and 'Protein:' in lines[i + 3]:
-                    item['protein'] = lines[i + 3].split('Protein:')[1].strip()
 
-                items.append(item)
-                i += 4
-                continue
-        i += 1
+@lru_cache(maxsize=4096)
+def category_score(category: str) -> int:
+    """Category preference for a lowercased category (categories repeat, so this is memoized)"""
+    score = 0
+    for pref in PREFERRED_CATEGORIES:
+        if pref in category:
+            score = 100
+            break
 
-    return items
+    for avoid in AVOID_CATEGORIES:
+        if avoid in category:
+            score = -50
+            break
 
+    return score
 
-def score_food_item(item: Dict, search_term: str) -> Tuple[int, int, int]:
-    """
-    Score a food item based on multiple criteria.
-    Returns a tuple (name_score, category_score, num_nutrients) for sorting.
-    """
-    name = item['name'].lower()
-    search = search_term.lower()
-    category = item['category'].lower()
-
-    name_score = 0
 
+def name_score(name: str, search: str) -> int:
+    """Name match score for a lowercased name against a lowercased search term"""
     if name == f"{search}, raw":
-        name_score = 1000
+        score = 1000
     elif name == search:
-        name_score = 900
+        score = 900
     elif name.startswith(f"{search}, "):
-        name_score = 800
+        score = 800
     elif name.startswith(search):
-        name_score = 700
+        score = 700
     elif search in name.split(',')[0]:
-        name_score = 600
+        score = 600
     elif search in name:
-        name_score = 500
+        score = 500
     else:
-        name_score = 0
-
-    preferred_categories = [
-        'vegetables', 'fruits', 'meats', 'poultry', 'fish', 'seafood',
-        'dairy', 'legumes', 'nuts', 'grains'
-    ]
+        score = 0
 
-    avoid_categories = [
-        'fast food', 'prepared', 'frozen', 'restaurant', 'packaged'
-    ]
-
-    category_score = 0
-    for pref in preferred_categories:
-        if pref in category:
-            category_score = 100
-            break
-
-    for avoid in avoid_categories:
-        if avoid in category:
-            category_score = -50
-            break
-
-    if any(word in name for word in ['sauce', 'bread', 'frozen', 'prepared', 'fast food']):
-        name_score -= 100
+    if any(word in name for word in PENALISED_WORDS):
+        score -= 100
 
     if 'raw' in name:
-        name_score += 50
+        score += 50
 
-    return (name_score, category_score, item['num_nutrients'])
+    return score
 
 
-def find_best_food_item(text: str, search_term: str) -> Dict:
-    items = parse_food_items(text)
-
+def rank_food_items(items: List[FoodItem], search_term: str) -> Optional[FoodItem]:
+    """Best matching food item, scored directly on the structured response."""
     if not items:
         return None
 
-    scored_items = [(item, score_food_item(item, search_term)) for item in items]
-    scored_items.sort(key=lambda x: (x[1][0], x[1][1], x[1][2]), reverse=True)
-
-    return scored_items[0][0]
+    search = search_term.lower()
+    return max(items, key=lambda item: item.score(search))
 
 
 class NutrientData(BaseModel):
@@ -323,50 +325,223 @@ class NutrientBreakDown(BaseModel):
 
 
 def get_best_nutrient_breakdown(ingredient: str) -> NutrientBreakDown:
-    """Get the best nutrient breakdown with normalized units."""
-    response = analyse_ingredient(ingredient)
+    """Get the best nutrient breakdown with normalized units (cached per ingredient)."""
+    return run_sync(get_best_nutrient_breakdown_async(ingredient))
 
-    if not response.food_items:
-        raise ValueError(f"No items found for '{ingredient}'")
 
-    # Convert response to text format for parsing
-    text_output = ""
-    for item in response.food_items:
-        protein = next((n for n in item.nutrients if n.name == "Protein"), None)
+async def get_best_nutrient_breakdown_async(ingredient: str) -> NutrientBreakDown:
+    """Async variant of get_best_nutrient_breakdown on the shared USDA client."""
+    result = (await resolve_ingredients([ingredient]))[ingredient]
+    if isinstance(result, Exception):
+        raise result
+    return result
 
-        text_output += f"{item.name} (ID: {item.fdc_id})\n"
-        text_output += f"Category: {item.category}\n"
-        text_output += f"Number of nutrients: {len(item.nutrients)}\n"
-        if protein:
-            text_output += f"Protein: {protein.amount:.2f} {protein.unit}\n"
-        text_output += "\n"
 
-    # Find best match
-    best_item_dict = find_best_food_item(text_output, ingredient)
+async def resolve_ingredients(ingredients: List[str]) -> Dict[str, Union[NutrientBreakDown, Exception]]:
+    """
+    Resolve many ingredients in one pass on the USDA client loop.
+
+    Ingredients are deduped by normalized name and served from the cache or the
+    offline index where possible. Lookups already in flight for another meal are
+    awaited instead of repeated. The rest are searched only when no fdc_id is
+    known for them, and every chosen food is fetched in bulk /foods calls. Cache and
+    offline index access touch the disk, so it runs in worker threads and never
+    blocks the loop that every meal's USDA requests share.
+    Returns a breakdown or the exception it failed with, per ingredient.
+    """
+    names = {normalize_key(ingredient): ingredient for ingredient in ingredients}
+    results: Dict[str, Union[NutrientBreakDown, Exception]] = {}
+    owned: Dict[str, asyncio.Future] = {}
+    shared: Dict[str, asyncio.Future] = {}
+
+    loop = asyncio.get_running_loop()
+    for key in names:
+        if key in _inflight:
+            shared[key] = _inflight[key]
+        else:
+            owned[key] = _inflight[key] = loop.create_future()
+
+    if owned:
+        try:
+            offline = await asyncio.to_thread(_resolve_offline, {key: names[key] for key in owned})
+            for key, breakdown in offline.items():
+                _settle(key, breakdown)
+
+            remote = {key: names[key] for key in owned if key not in offline}
+            if remote:
+                await _fetch_remote(remote)
+        except Exception as e:
+            for key in owned:
+                if key in _inflight:
+                    _settle(key, e)
+
+    for key, future in {**owned, **shared}.items():
+        try:
+            results[key] = await asyncio.shield(future)
+        except Exception as e:
+            results[key] = e
+
+    return {ingredient: results[normalize_key(ingredient)] for ingredient in ingredients}
+
+
+def _resolve_offline(names: Dict[str, str]) -> Dict[str, NutrientBreakDown]:
+    """Breakdowns available without the API: cached, or matched in the offline index (runs off the loop)"""
+    found = {}
+    for key, ingredient in names.items():
+        cached = ingredient_cache.get(key)
+        if cached is not None:
+            found[key] = NutrientBreakDown(**cached)
+            continue
+
+        local = _resolve_locally(ingredient)
+        if local is not None:
+            ingredient_cache.set(key, local.model_dump())
+            found[key] = local
+
+    return found
+
+
+def _cached_choices(keys: List[str]) -> Dict[str, int]:
+    choices = {}
+    for key in keys:
+        fdc_id = choice_cache.get(key)
+        if fdc_id is not None:
+            choices[key] = int(fdc_id)
+    return choices
+
+
+def _remember(breakdowns: Dict[str, NutrientBreakDown]) -> None:
+    for key, breakdown in breakdowns.items():
+        ingredient_cache.set(key, breakdown.model_dump())
+        choice_cache.set(key, breakdown.id)
+
+
+def _settle(key: str, result: Union[NutrientBreakDown, Exception]) -> None:
+    future = _inflight.pop(key, None)
+
+    if future is not None and not future.done():
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+
+async def _fetch_remote(names: Dict[str, str]) -> None:
+    """
+    Settle every in-flight key in `names`. Ingredients without a known fdc_id
+    are searched only to choose one; then every chosen food is fetched as a
+    full record in bulk /foods calls. A search result is used when its full
+    record cannot be fetched, and a known fdc_id whose refresh fails is searched again.
+    """
+    resolved: Dict[str, Union[NutrientBreakDown, Exception]] = {}
+    searched: Dict[str, NutrientBreakDown] = {}
 
-    if not best_item_dict:
-        raise ValueError(f"Could not determine best match for '{ingredient}'")
+    async def search(key: str, ingredient: str) -> None:
+        try:
+            searched[key] = _to_breakdown(await _search_best_food_item(ingredient))
+        except Exception as e:
+            resolved[key] = e
+
+    try:
+        choices = await asyncio.to_thread(_cached_choices, list(names))
+
+        await asyncio.gather(*(search(key, ingredient) for key, ingredient in names.items() if key not in choices))
+        choices.update({key: breakdown.id for key, breakdown in searched.items()})
+
+        wanted: Dict[int, List[str]] = {}
+        for key, fdc_id in choices.items():
+            wanted.setdefault(fdc_id, []).append(key)
+
+        async def fetch(fdc_ids: List[int]) -> None:
+            try:
+                foods = await get_foods(fdc_ids)
+            except Exception:
+                return
+            for food in foods:
+                breakdown = _to_breakdown(FoodItem(**_parse_food(food)))
+                for key in wanted.get(breakdown.id, []):
+                    resolved[key] = breakdown
+
+        fdc_ids = list(wanted)
+        await asyncio.gather(*(
+            fetch(fdc_ids[i:i + BULK_FETCH_SIZE]) for i in range(0, len(fdc_ids), BULK_FETCH_SIZE)
+        ))
+
+        # Known fdc_ids whose refresh failed are searched after all
+        await asyncio.gather(*(
+            search(key, names[key]) for key in choices if key not in resolved and key not in searched
+        ))
+        for key, breakdown in searched.items():
+            resolved.setdefault(key, breakdown)
+
+        # Cached before the lookups are released, so the next request for these finds them
+        await asyncio.to_thread(_remember, {
+            key: result for key, result in resolved.items() if isinstance(result, NutrientBreakDown)
+        })
+
+    finally:
+        for key in names:
+            _settle(key, resolved.get(key) or RuntimeError(f"Lookup for '{names[key]}' was not completed"))
 
-    # Get the complete FoodItem object
-    best_fdc_id = int(best_item_dict['id'])
-    best_food_item = next((item for item in response.food_items if item.fdc_id == best_fdc_id), None)
+
+def _resolve_locally(ingredient: str) -> Optional[NutrientBreakDown]:
+    """Pick the best matching food from the offline FDC index, or None on a miss."""
+    index = get_default_index()
+    if index is None:
+        return None
+
+    rows = index.search(ingredient)
+    if not rows:
+        return None
+
+    search = ingredient.lower()
+    best_row = max(rows, key=lambda row: (
+        name_score(index.search_names[row], search),
+        category_score(index.search_categories[row]),
+        int(index.num_nutrients[row])
+    ))
+    best = index.candidate(best_row)
+
+    nutrients = []
+    for name, amount, unit in index.nutrients(best_row):
+        normalized_amount, normalized_unit = normalize_unit(amount, unit)
+        nutrients.append(NutrientData(name=name, amt=normalized_amount, unit=normalized_unit))
+
+    return NutrientBreakDown(
+        name=best['name'],
+        id=int(best['id']),
+        category=best['category'],
+        nutrients=nutrients
+    )
+
+
+async def _search_best_food_item(ingredient: str) -> FoodItem:
+    """Search USDA and pick the best matching food item."""
+    response = await analyse_ingredient_async(ingredient)
+
+    if not response.food_items:
+        raise ValueError(f"No items found for '{ingredient}'")
+
+    best_food_item = rank_food_items(response.food_items, ingredient)
 
     if not best_food_item:
-        raise ValueError(f"Could not find complete data for FDC ID {best_fdc_id}")
+        raise ValueError(f"Could not determine best match for '{ingredient}'")
+
+    return best_food_item
 
-    # Convert to NutrientBreakDown with normalized units
-    nutrient_breakdown = NutrientBreakDown(
-        name=best_food_item.name,
-        id=best_food_item.fdc_id,
-        category=best_food_item.category,
+
+def _to_breakdown(food_item: FoodItem) -> NutrientBreakDown:
+    """Convert to NutrientBreakDown with normalized units."""
+    return NutrientBreakDown(
+        name=food_item.name,
+        id=food_item.fdc_id,
+        category=food_item.category,
         nutrients=[
             NutrientData(name=n.name, amt=n.amount, unit=n.unit)
-            for n in best_food_item.nutrients
+            for n in food_item.nutrients
         ]
     )
 
-    return nutrient_breakdown
-
 
 if __name__ == "__main__":
     ingredient = "Potato"
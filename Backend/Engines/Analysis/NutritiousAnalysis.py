@@ -60,24 +60,72 @@ Nutrients:
 """
 
 import logging
+import os
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 
-from Engines.Analysis.MacroBreakdown import get_best_nutrient_breakdown, NutrientBreakDown, NutrientData
+from Engines.Analysis.MacroBreakdown import resolve_ingredients, NutrientBreakDown, NutrientData
+from Engines.Analysis.USDAClient import run_sync
+from Engines.Cache import TwoTierCache, normalize_key
 from Engines.Generative_Engine.MealExtractor import get_ingredients
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-
-logger = logging.getLogger(__name__)
-
-
-def _process_single_ingredient(ingredient) -> Tuple[Optional[str], Optional[dict], Optional[str]]:
+# Per-100g aggregate of each dish, keyed on normalized (name, description)
+dish_cache = TwoTierCache(
+    "dish_breakdowns",
+    ttl=float(os.getenv("DISH_CACHE_TTL", 30 * 24 * 3600)),
+    max_memory_items=int(os.getenv("DISH_CACHE_MEMORY_ITEMS", 1024)),
+    max_disk_items=int(os.getenv("DISH_CACHE_MAX_ITEMS", 20000))
+)
+
+# Nutrients shown to users (in order of importance) and their groups
+PRIORITY_NUTRIENTS = {
+    # Macronutrients (always show)
+    'Energy': 'calories',
+    'Protein': 'macros',
+    'Total lipid (fat)': 'macros',
+    'Carbohydrate, by difference': 'macros',
+    'Fiber, total dietary': 'macros',
+    'Total Sugars': 'macros',
+
+    # Essential Vitamins
+    'Vitamin A, RAE': 'vitamins',
+    'Vitamin C, total ascorbic acid': 'vitamins',
+    'Vitamin D (D2 + D3)': 'vitamins',
+    'Vitamin E (alpha-tocopherol)': 'vitamins',
+    'Vitamin K (phylloquinone)': 'vitamins',
+    'Thiamin': 'vitamins',
+    'Riboflavin': 'vitamins',
+    'Niacin': 'vitamins',
+    'Vitamin B-6': 'vitamins',
+    'Folate, total': 'vitamins',
+    'Vitamin B-12': 'vitamins',
+
+    # Essential Minerals
+    'Calcium, Ca': 'minerals',
+    'Iron, Fe': 'minerals',
+    'Magnesium, Mg': 'minerals',
+    'Phosphorus, P': 'minerals',
+    'Potassium, K': 'minerals',
+    'Sodium, Na': 'minerals',
+    'Zinc, Zn': 'minerals',
+
+    # Important Fats
+    'Cholesterol': 'fats',
+    'Fatty acids, total saturated': 'fats',
+    'Fatty acids, total monounsaturated': 'fats',
+    'Fatty acids, total polyunsaturated': 'fats',
+    'Fatty acids, total trans': 'fats',
+}
+
+
+def _process_single_ingredient(ingredient, breakdown) -> Tuple[Optional[str], Optional[dict], Optional[str]]:
     try:
-        breakdown = get_best_nutrient_breakdown(ingredient.item)
+        if isinstance(breakdown, Exception):
+            raise breakdown
 
         # Scale nutrients based on actual amount used in recipe
         scale_factor = ingredient.amnt / 100.0
@@ -98,15 +146,14 @@ def _process_single_ingredient(ingredient) -> Tuple[Optional[str], Optional[dict
         return (ingredient.item, None, str(e))
 
 
-def analyse_nutrients(
-        name: str,
-        description: str = None,
-        amnt: float = None,
-        max_workers: int = 10
-) -> NutrientBreakDown:
-    if amnt is None:
-        amnt = 100.0
+async def _process_ingredients(ingredients) -> List[Tuple[Optional[str], Optional[dict], Optional[str]]]:
+    # One batched resolution per meal (deduped, coalesced with other meals, bulk-fetched)
+    breakdowns = await resolve_ingredients([ing.item for ing in ingredients])
+    return [_process_single_ingredient(ing, breakdowns[ing.item]) for ing in ingredients]
 
+
+def _aggregate_per_100g(name: str, description: str = None) -> Tuple[NutrientBreakDown, bool]:
+    """Summed nutrients for 100g of the dish, and whether every ingredient resolved"""
     # Step 1: Get recipe ingredients (for 100g of dish)
     recipe = get_ingredients(name, description=description)
 
@@ -116,28 +163,18 @@ def analyse_nutrients(
     processed_ingredients = []
     skipped_ingredients = []
 
-    # Step 2: Process ingredients in parallel
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all ingredient processing tasks
-        future_to_ingredient = {
-            executor.submit(_process_single_ingredient, ing): ing
-            for ing in recipe.ingredients
-        }
-
-        # Collect results as they complete
-        for future in as_completed(future_to_ingredient):
-            ingredient_name, nutrient_data, error = future.result()
-
-            if nutrient_data is not None:
-                # Aggregate nutrients from this ingredient
-                for nutrient_name, (amt, unit) in nutrient_data.items():
-                    nutrient_totals[nutrient_name] += amt
-                    if nutrient_name not in nutrient_units:
-                        nutrient_units[nutrient_name] = unit
-
-                processed_ingredients.append(ingredient_name)
-            else:
-                skipped_ingredients.append(ingredient_name)
+    # Step 2: Resolve ingredients concurrently on the shared, rate-limited USDA client
+    for ingredient_name, nutrient_data, error in run_sync(_process_ingredients(recipe.ingredients)):
+        if nutrient_data is not None:
+            # Aggregate nutrients from this ingredient
+            for nutrient_name, (amt, unit) in nutrient_data.items():
+                nutrient_totals[nutrient_name] += amt
+                if nutrient_name not in nutrient_units:
+                    nutrient_units[nutrient_name] = unit
+
+            processed_ingredients.append(ingredient_name)
+        else:
+            skipped_ingredients.append(ingredient_name)
 
     if not processed_ingredients:
         raise ValueError(
@@ -150,79 +187,63 @@ def analyse_nutrients(
     if skipped_ingredients:
         logger.warning(f"Skipped ingredients: {', '.join(skipped_ingredients)}")
 
-    # Step 3: Scale the totals to the requested amount
-    if amnt != 100.0:
-        final_scale = amnt / 100.0
-        for nutrient_name in nutrient_totals:
-            nutrient_totals[nutrient_name] *= final_scale
-
-    # Step 4: Create final nutrients list with units
-    final_nutrients = [
-        NutrientData(name=name, amt=amt, unit=nutrient_units[name])
-        for name, amt in nutrient_totals.items()
-    ]
-
-    # Step 5: Return final aggregated breakdown
-    return NutrientBreakDown(
+    breakdown = NutrientBreakDown(
         name=recipe.recipe_name,
         id=hash(recipe.recipe_name) % (10 ** 8),
         category="recipe",
-        nutrients=final_nutrients
+        nutrients=[
+            NutrientData(name=name, amt=amt, unit=nutrient_units[name])
+            for name, amt in nutrient_totals.items()
+        ]
     )
 
+    return breakdown, not skipped_ingredients
+
+
+def scale_breakdown(breakdown: NutrientBreakDown, amnt: float) -> NutrientBreakDown:
+    """Rescale a per-100g breakdown to `amnt` grams of the dish"""
+    if amnt == 100.0:
+        return breakdown
+
+    final_scale = amnt / 100.0
+    return NutrientBreakDown(
+        name=breakdown.name,
+        id=breakdown.id,
+        category=breakdown.category,
+        nutrients=[
+            NutrientData(name=n.name, amt=n.amt * final_scale, unit=n.unit)
+            for n in breakdown.nutrients
+        ]
+    )
+
+
+def analyse_nutrients(
+        name: str,
+        description: str = None,
+        amnt: float = None
+) -> NutrientBreakDown:
+    if amnt is None:
+        amnt = 100.0
+
+    breakdown, _ = _aggregate_per_100g(name, description)
+
+    # Scale the totals to the requested amount
+    return scale_breakdown(breakdown, amnt)
+
+
 def clean_nutrient_response(raw_data: NutrientBreakDown) -> NutrientBreakDown:
     """
     Cleans and organizes nutrient data for better user readability.
     Prioritizes essential nutrients and groups them logically.
     """
 
-    # Define priority nutrients to show (in order of importance)
-    priority_nutrients = {
-        # Macronutrients (always show)
-        'Energy': 'calories',
-        'Protein': 'macros',
-        'Total lipid (fat)': 'macros',
-        'Carbohydrate, by difference': 'macros',
-        'Fiber, total dietary': 'macros',
-        'Total Sugars': 'macros',
-
-        # Essential Vitamins
-        'Vitamin A, RAE': 'vitamins',
-        'Vitamin C, total ascorbic acid': 'vitamins',
-        'Vitamin D (D2 + D3)': 'vitamins',
-        'Vitamin E (alpha-tocopherol)': 'vitamins',
-        'Vitamin K (phylloquinone)': 'vitamins',
-        'Thiamin': 'vitamins',
-        'Riboflavin': 'vitamins',
-        'Niacin': 'vitamins',
-        'Vitamin B-6': 'vitamins',
-        'Folate, total': 'vitamins',
-        'Vitamin B-12': 'vitamins',
-
-        # Essential Minerals
-        'Calcium, Ca': 'minerals',
-        'Iron, Fe': 'minerals',
-        'Magnesium, Mg': 'minerals',
-        'Phosphorus, P': 'minerals',
-        'Potassium, K': 'minerals',
-        'Sodium, Na': 'minerals',
-        'Zinc, Zn': 'minerals',
-
-        # Important Fats
-        'Cholesterol': 'fats',
-        'Fatty acids, total saturated': 'fats',
-        'Fatty acids, total monounsaturated': 'fats',
-        'Fatty acids, total polyunsaturated': 'fats',
-        'Fatty acids, total trans': 'fats',
-    }
-
     # Create a dictionary for quick lookup
     nutrient_dict = {n.name: n for n in raw_data.nutrients}
 
     # Build cleaned nutrient list
     cleaned_nutrients = []
 
-    for nutrient_name in priority_nutrients.keys():
+    for nutrient_name in PRIORITY_NUTRIENTS.keys():
         if nutrient_name in nutrient_dict:
             nutrient = nutrient_dict[nutrient_name]
 
@@ -314,8 +335,32 @@ def _normalize_units(amt: float, unit: str) -> tuple[float, str]:
 
 
 def nutrient_analysis(name: str , disc:str , amnt:float) -> NutrientBreakDown :
-    breakdown = analyse_nutrients(name, disc,amnt)
-    cleaned_breakdown = clean_nutrient_response(breakdown)
+    """Cleaned breakdown for `amnt` grams; repeat dishes are a cache lookup plus a rescale"""
+    if amnt is None:
+        amnt = 100.0
+
+    cache_key = normalize_key(name, disc)
+    cached = dish_cache.get(cache_key)
+
+    if cached is not None:
+        per_100g = NutrientBreakDown(**cached)
+        per_100g.name = name
+    else:
+        per_100g, complete = _aggregate_per_100g(name, disc)
+
+        # Only the priority nutrients survive cleaning, so only they are cached.
+        # Partial results (an ingredient lookup failed) are not cached.
+        if complete:
+            dish_cache.set(cache_key, NutrientBreakDown(
+                name=per_100g.name,
+                id=per_100g.id,
+                category=per_100g.category,
+                nutrients=[n for n in per_100g.nutrients if n.name in PRIORITY_NUTRIENTS]
+            ).model_dump())
+
+    # Cleaning is not linear in the amount (thresholds, unit switches, rounding),
+    # so the unrounded per-100g values are rescaled first and cleaned afterwards
+    cleaned_breakdown = clean_nutrient_response(scale_breakdown(per_100g, amnt))
     return cleaned_breakdown
 
 # Example usage:
@@ -0,0 +1,104 @@
+"""
+Shared async client for the USDA FoodData Central API.
+
+One pooled keep-alive httpx.AsyncClient runs on a dedicated event loop thread,
+so every meal analysis (job workers, routes, scripts) reuses the same
+connections. A global semaphore bounds in-flight requests across all callers
+and every request has a timeout. Synchronous code submits coroutines with
+run_sync instead of spinning up per-meal thread pools.
+
+Environment:
+    USDA_KEY              API key
+    USDA_MAX_CONCURRENCY  in-flight requests across the process (default 16)
+    USDA_MAX_CONNECTIONS  pooled connections (default 20)
+    USDA_TIMEOUT          per-request timeout in seconds (default 10)
+    USDA_RETRIES          connection retries per request (default 2)
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Coroutine, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+API_KEY = os.getenv("USDA_KEY")
+BASE_URL = "https://api.nal.usda.gov/fdc/v1"
+
+MAX_CONCURRENCY = int(os.getenv("USDA_MAX_CONCURRENCY", 16))
+MAX_CONNECTIONS = int(os.getenv("USDA_MAX_CONNECTIONS", 20))
+TIMEOUT = float(os.getenv("USDA_TIMEOUT", 10))
+RETRIES = int(os.getenv("USDA_RETRIES", 2))
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+# Created on the client loop
+_client: Optional[httpx.AsyncClient] = None
+_limiter: Optional[asyncio.Semaphore] = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="usda-client", daemon=True).start()
+    return _loop
+
+
+def run_sync(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared client loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client, _limiter
+    if _client is None:
+        limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+        _client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            timeout=TIMEOUT,
+            transport=httpx.AsyncHTTPTransport(limits=limits, retries=RETRIES)
+        )
+        _limiter = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _client
+
+
+async def request(method: str, path: str, params: Optional[Dict] = None, json: Any = None) -> Any:
+    """Rate-limited USDA call returning the decoded JSON body"""
+    if not API_KEY:
+        raise ValueError("USDA_KEY not found in environment variables")
+
+    client = _get_client()
+    async with _limiter:
+        try:
+            response = await client.request(method, path, params={**(params or {}), "api_key": API_KEY}, json=json)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise httpx.HTTPError(f"Failed to fetch data from USDA API: {e}") from e
+
+    return response.json()
+
+
+async def search_foods(query: str, data_type: str, page_size: int = 20) -> Dict:
+    return await request("GET", "/foods/search", params={
+        "query": query,
+        "dataType": data_type,
+        "pageSize": page_size
+    })
+
+
+async def get_foods(fdc_ids: List[int]) -> List[Dict]:
+    """Full records for up to 20 fdc_ids in one call"""
+    return await request("POST", "/foods", json={"fdcIds": fdc_ids, "format": "full"})
+
+
+async def close() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
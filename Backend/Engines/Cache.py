@@ -0,0 +1,162 @@
+"""
+Two-tier cache for expensive lookups (USDA searches, LLM calls, ...).
+
+Tier 1 is an in-process LRU, tier 2 a SQLite file shared by every worker on
+the host and kept across restarts. Values must be JSON-serialisable. Entries
+expire `ttl` seconds after they were written, and each cache keeps hit/miss
+counters per tier.
+
+Environment:
+    CACHE_DIR   directory for the SQLite files (default .cache)
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
+
+def normalize_key(*parts: Optional[str]) -> str:
+    """Lowercase, trim and collapse whitespace so trivially different inputs share a key"""
+    return "|".join(re.sub(r"\s+", " ", (part or "").strip().lower()) for part in parts)
+
+
+class TwoTierCache:
+
+    def __init__(
+            self,
+            name: str,
+            ttl: float = 30 * 24 * 3600,
+            max_memory_items: int = 1024,
+            max_disk_items: Optional[int] = None,
+            path: Optional[str] = None
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.path = path or os.path.join(CACHE_DIR, f"{name}.sqlite")
+
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, created_at: float, value: Any) -> None:
+        with self._lock:
+            self._memory[key] = (created_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value, or None on a miss or expired entry"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+        conn = self._connect()
+        row = conn.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+
+        if row is None or now - row[1] > self.ttl:
+            if row is not None:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._count("misses")
+            return None
+
+        conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        value = json.loads(row[0])
+        self._remember(key, row[1], value)
+        self._count("disk_hits")
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now, now)
+        )
+
+        if self.max_disk_items is not None:
+            # Evict least recently used entries beyond the size bound
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_items,)
+            )
+
+        self._remember(key, now, value)
+        self._count("writes")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def keys(self) -> List[str]:
+        """All unexpired keys on disk"""
+        cutoff = time.time() - self.ttl
+        return [row[0] for row in self._connect().execute("SELECT key FROM cache WHERE created_at >= ?", (cutoff,))]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        self._connect().execute("DELETE FROM cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            memory_items = len(self._memory)
+
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+
+        return {
+            "name": self.name,
+            **counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_items": memory_items,
+            "disk_items": self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        }
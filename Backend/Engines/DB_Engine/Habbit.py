@@ -1,4 +1,4 @@
-from Config import firestoreDB 
+from Config import firestoreDB, firestoreAsyncDB
 from datetime import datetime
 from google.cloud.firestore import Query
 
@@ -40,3 +40,23 @@ def is_analysis_in_progress(user_id):
     return len(in_progress_analysis) > 0
 
 
+# Async variants used by the route handlers (AsyncClient, non-blocking)
+
+async def initiate_analysis_async(user_id):
+    _, document_ref = await firestoreAsyncDB.collection('users').document(user_id).collection('analysis').add({
+        'status': 'in_progress',
+        'timestamp': datetime.now()
+    })
+    return document_ref.id
+
+async def get_analysis_report_async(user_id):
+    analysis_ref = firestoreAsyncDB.collection('users').document(user_id).collection('analysis')
+    latest_analysis = await analysis_ref.order_by('timestamp', direction=Query.DESCENDING).limit(1).get()
+    if latest_analysis:
+        return latest_analysis[0].to_dict().get('report')
+    return None
+
+async def is_analysis_in_progress_async(user_id):
+    analysis_ref = firestoreAsyncDB.collection('users').document(user_id).collection('analysis')
+    in_progress_analysis = await analysis_ref.where('status', '==', 'in_progress').get()
+    return len(in_progress_analysis) > 0
@@ -1,12 +1,14 @@
 from Config import firestoreDB
 from datetime import datetime, date, timedelta
 from typing import List, Optional, Dict, Any
-from google.cloud.firestore_v1 import FieldFilter
+from google.cloud.firestore_v1 import FieldFilter, transactional
 from pydantic import BaseModel, Field
 
 from Engines.Analysis.DietAnalysis import compute_user_needs
 from Engines.Analysis.MacroBreakdown import NutrientBreakDown
 from Engines.Analysis.NutrientGapAnalysis import NutrientGapAnalyzer, MealRecommender
+from Engines.DB_Engine.Rollup import apply_meal_to_rollup, get_meal_rollups
+from Engines.DB_Engine.UserCache import get_user_doc
 from Engines.DB_Engine.Water import get_water_engagement_graph_data
 from routes.User import UserResponse
 
@@ -28,7 +30,7 @@ class MealEntry(BaseModel):
 def create_pending_meal_entry(username: str) -> str:
     """Create a pending meal entry and return its ID"""
     user_ref = firestoreDB.collection('users').document(username)
-    user_doc = user_ref.get()
+    user_doc = get_user_doc(username)
 
     if not user_doc.exists:
         raise ValueError(f"User {username} not found")
@@ -51,7 +53,7 @@ def add_meal_entry(
 ) -> Dict[str, Any]:
     """Add a new completed meal entry"""
     user_ref = firestoreDB.collection('users').document(username)
-    user_doc = user_ref.get()
+    user_doc = get_user_doc(username)
 
     if not user_doc.exists:
         raise ValueError(f"User {username} not found")
@@ -77,8 +79,14 @@ def add_meal_entry(
     if serving_size:
         meal_data["serving_size"] = serving_size
 
-    meal_ref = user_ref.collection('Meals').add(meal_data)
-    doc_id = meal_ref[1].id
+    # The meal and its rollup increment are committed together
+    meal_ref = user_ref.collection('Meals').document()
+    doc_id = meal_ref.id
+
+    batch = firestoreDB.batch()
+    batch.set(meal_ref, meal_data)
+    apply_meal_to_rollup(username, meal_data, writer=batch)
+    batch.commit()
 
     return {
         "id": doc_id,
@@ -100,17 +108,12 @@ def update_meal_entry(
 ) -> Dict[str, Any]:
     """Update an existing meal entry"""
     user_ref = firestoreDB.collection('users').document(username)
-    user_doc = user_ref.get()
+    user_doc = get_user_doc(username)
 
     if not user_doc.exists:
         raise ValueError(f"User {username} not found")
 
     meal_ref = user_ref.collection('Meals').document(doc_id)
-    meal_doc = meal_ref.get()
-
-    if not meal_doc.exists:
-        raise ValueError(f"Meal document {doc_id} not found")
-
     timestamp = timestamp if timestamp else datetime.now()
 
     meal_data = {
@@ -132,7 +135,19 @@ def update_meal_entry(
     if serving_size:
         meal_data["serving_size"] = serving_size
 
-    meal_ref.update(meal_data)
+    @transactional
+    def _update(transaction) -> None:
+        meal_doc = meal_ref.get(transaction=transaction)
+        if not meal_doc.exists:
+            raise ValueError(f"Meal document {doc_id} not found")
+
+        transaction.update(meal_ref, meal_data)
+        # Move the meal's contribution from its previous state (pending meals have none).
+        # Reading the previous state in the same transaction makes a retried job a no-op.
+        apply_meal_to_rollup(username, meal_doc.to_dict(), sign=-1, writer=transaction)
+        apply_meal_to_rollup(username, meal_data, writer=transaction)
+
+    _update(firestoreDB.transaction())
 
     return {
         "id": doc_id,
@@ -165,7 +180,7 @@ def get_meals_by_date(username: str, target_date: date) -> List[Dict[str, Any]]:
     """Get all meal entries for a specific date"""
     user_ref = firestoreDB.collection('users').document(username)
 
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     start_datetime = datetime.combine(target_date, datetime.min.time())
@@ -197,7 +212,7 @@ def get_meals_by_range(username: str, start_date: date, end_date: date) -> List[
 
     user_ref = firestoreDB.collection('users').document(username)
 
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     start_datetime = datetime.combine(start_date, datetime.min.time())
@@ -227,25 +242,21 @@ def delete_meal_entry(username: str, meal_id: str) -> bool:
     user_ref = firestoreDB.collection('users').document(username)
     meal_ref = user_ref.collection('Meals').document(meal_id)
 
-    meal_doc = meal_ref.get()
-    if not meal_doc.exists:
-        raise ValueError(f"Meal entry {meal_id} not found")
-
-    meal_ref.delete()
-    return True
+    @transactional
+    def _delete(transaction) -> None:
+        meal_doc = meal_ref.get(transaction=transaction)
+        if not meal_doc.exists:
+            raise ValueError(f"Meal entry {meal_id} not found")
 
+        transaction.delete(meal_ref)
+        apply_meal_to_rollup(username, meal_doc.to_dict(), sign=-1, writer=transaction)
 
-def get_daily_nutrition_stats(username: str, target_date: date) -> Dict[str, Any]:
-    """Get aggregated nutrition stats for a specific day"""
-    user_ref = firestoreDB.collection('users').document(username)
-    user_doc = user_ref.get()
-
-    if not user_doc.exists:
-        raise ValueError(f"User {username} not found")
+    _delete(firestoreDB.transaction())
+    return True
 
-    meals = get_meals_by_date(username, target_date)
 
-    # Aggregate nutrients
+def _build_daily_stats(target_date: date, meals: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate nutrient totals for the meals of a single day"""
     nutrient_totals = {}
     for meal in meals:
         if 'nutrients' in meal:
@@ -269,6 +280,34 @@ def get_daily_nutrition_stats(username: str, target_date: date) -> Dict[str, Any
     }
 
 
+def get_daily_nutrition_stats_range(username: str, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """
+    Get aggregated nutrition stats for every day in a date range.
+
+    Fetches the whole window with a single Meals range query and buckets it by day
+    in memory, so the number of Firestore reads does not grow with the window size.
+    Days without meals are included with zero totals. Returns stats ordered by date.
+    """
+    meals = get_meals_by_range(username, start_date, end_date)
+
+    # Bucket meals by day
+    meals_by_date = {}
+    for meal in meals:
+        meal_date = meal['timestamp'].date() if isinstance(meal['timestamp'], datetime) else meal['timestamp']
+        meals_by_date.setdefault(meal_date, []).append(meal)
+
+    total_days = (end_date - start_date).days + 1
+    return [
+        _build_daily_stats(current_date, meals_by_date.get(current_date, []))
+        for current_date in (start_date + timedelta(days=i) for i in range(total_days))
+    ]
+
+
+def get_daily_nutrition_stats(username: str, target_date: date) -> Dict[str, Any]:
+    """Get aggregated nutrition stats for a specific day"""
+    return get_daily_nutrition_stats_range(username, target_date, target_date)[0]
+
+
 def get_weekly_nutrition_summary(username: str, target_date: Optional[date] = None) -> Dict[str, Any]:
     """Get weekly nutrition summary"""
     if target_date is None:
@@ -282,22 +321,23 @@ def get_weekly_nutrition_summary(username: str, target_date: Optional[date] = No
     total_meals = 0
     weekly_nutrient_totals = {}
 
-    for i in range(7):
-        current_date = week_start + timedelta(days=i)
-        if current_date <= date.today():
-            stats = get_daily_nutrition_stats(username, current_date)
-            daily_stats.append(stats)
-            total_meals += stats['meal_count']
+    # Only days up to today are tracked
+    last_tracked = min(week_end, date.today())
+    if week_start <= last_tracked:
+        daily_stats = get_daily_nutrition_stats_range(username, week_start, last_tracked)
 
-            # Aggregate weekly nutrients
-            for nutrient in stats['nutrient_totals']:
-                name = nutrient['name']
-                amt = nutrient['amt']
-                unit = nutrient['unit']
+    for stats in daily_stats:
+        total_meals += stats['meal_count']
+
+        # Aggregate weekly nutrients
+        for nutrient in stats['nutrient_totals']:
+            name = nutrient['name']
+            amt = nutrient['amt']
+            unit = nutrient['unit']
 
-                if name not in weekly_nutrient_totals:
-                    weekly_nutrient_totals[name] = {"amt": 0, "unit": unit}
-                weekly_nutrient_totals[name]["amt"] += amt
+            if name not in weekly_nutrient_totals:
+                weekly_nutrient_totals[name] = {"amt": 0, "unit": unit}
+            weekly_nutrient_totals[name]["amt"] += amt
 
     days_with_data = len(daily_stats)
 
@@ -329,9 +369,7 @@ def get_weekly_nutrition_summary(username: str, target_date: Optional[date] = No
 
 def calculate_meal_streak(username: str, min_meals_per_day: int = 3, days_to_check: int = 30) -> Dict[str, Any]:
     """Calculate user's meal logging streak"""
-    user_ref = firestoreDB.collection('users').document(username)
-
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     current_streak = 0
@@ -339,10 +377,13 @@ def calculate_meal_streak(username: str, min_meals_per_day: int = 3, days_to_che
     temp_streak = 0
 
     today = date.today()
-    for i in range(days_to_check):
-        check_date = today - timedelta(days=i)
-        stats = get_daily_nutrition_stats(username, check_date)
+    if days_to_check > 0:
+        daily_stats = get_meal_rollups(username, today - timedelta(days=days_to_check - 1), today)
+    else:
+        daily_stats = []
 
+    # Walk backwards from today
+    for i, stats in enumerate(reversed(daily_stats)):
         if stats['meal_count'] >= min_meals_per_day:
             temp_streak += 1
             if i == 0 or current_streak > 0:
@@ -369,8 +410,7 @@ def get_top_nutrients(username: str, start_date: date, end_date: date, top_n: in
     if start_date > end_date:
         raise ValueError("Start date must be before or equal to end date")
 
-    user_ref = firestoreDB.collection('users').document(username)
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     meals = get_meals_by_range(username, start_date, end_date)
@@ -418,20 +458,17 @@ def get_nutrient_timeline(username: str, nutrient_name: str, start_date: date, e
     if start_date > end_date:
         raise ValueError("Start date must be before or equal to end date")
 
-    user_ref = firestoreDB.collection('users').document(username)
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     timeline_data = []
-    total_days = (end_date - start_date).days + 1
+    nutrient_unit = ""
 
-    for i in range(total_days):
-        current_date = start_date + timedelta(days=i)
-        stats = get_daily_nutrition_stats(username, current_date)
+    for stats in get_meal_rollups(username, start_date, end_date):
+        current_date = stats['date']
 
         # Find the specific nutrient
         nutrient_amt = 0
-        nutrient_unit = ""
         for nutrient in stats['nutrient_totals']:
             if nutrient['name'].lower() == nutrient_name.lower():
                 nutrient_amt = nutrient['amt']
@@ -471,8 +508,7 @@ def get_nutrient_distribution(username: str, start_date: date, end_date: date,
     if start_date > end_date:
         raise ValueError("Start date must be before or equal to end date")
 
-    user_ref = firestoreDB.collection('users').document(username)
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     meals = get_meals_by_range(username, start_date, end_date)
@@ -522,8 +558,7 @@ def get_nutrient_distribution(username: str, start_date: date, end_date: date,
 
 def get_macro_breakdown(username: str, target_date: date) -> Dict[str, Any]:
     """Get macronutrient breakdown for a specific day (for pie charts)"""
-    user_ref = firestoreDB.collection('users').document(username)
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     stats = get_daily_nutrition_stats(username, target_date)
@@ -588,8 +623,7 @@ def get_category_breakdown(username: str, start_date: date, end_date: date) -> D
     if start_date > end_date:
         raise ValueError("Start date must be before or equal to end date")
 
-    user_ref = firestoreDB.collection('users').document(username)
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     meals = get_meals_by_range(username, start_date, end_date)
@@ -651,16 +685,13 @@ def get_nutrient_comparison(username: str, nutrient_names: List[str],
     if start_date > end_date:
         raise ValueError("Start date must be before or equal to end date")
 
-    user_ref = firestoreDB.collection('users').document(username)
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     comparison_data = []
-    total_days = (end_date - start_date).days + 1
 
-    for i in range(total_days):
-        current_date = start_date + timedelta(days=i)
-        stats = get_daily_nutrition_stats(username, current_date)
+    for stats in get_meal_rollups(username, start_date, end_date):
+        current_date = stats['date']
 
         day_data = {
             "date": current_date.isoformat(),
@@ -698,7 +729,7 @@ def get_all_meals(
 ) -> List[Dict[str, Any]]:
     user_ref = firestoreDB.collection('users').document(username)
 
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     # Build query with ascending order (matches existing index)
@@ -733,8 +764,7 @@ def recommend_meal(username: str, goal: str) -> Dict[str, Any]:
 
     try:
         # Step 1: Get user details
-        user_ref = firestoreDB.collection('users').document(username)
-        user_doc = user_ref.get()
+        user_doc = get_user_doc(username)
 
         if not user_doc.exists:
             raise ValueError(f"User '{username}' not found")
@@ -822,9 +852,7 @@ def get_engagement_graph_data(
         days: int = 365,
         end_date: Optional[date] = None
 ) -> Dict[str, Any]:
-    user_ref = firestoreDB.collection('users').document(username)
-
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     if end_date is None:
@@ -832,14 +860,12 @@ def get_engagement_graph_data(
 
     start_date = end_date - timedelta(days=days - 1)
 
-    # Get all meals in the date range
-    meals = get_meals_by_range(username, start_date, end_date)
-
-    # Create a map of date -> meal count
-    meal_count_by_date = {}
-    for meal in meals:
-        meal_date = meal['timestamp'].date() if isinstance(meal['timestamp'], datetime) else meal['timestamp']
-        meal_count_by_date[meal_date] = meal_count_by_date.get(meal_date, 0) + 1
+    # Create a map of date -> meal count from the daily rollups
+    meal_count_by_date = {
+        rollup['date']: rollup['meal_count']
+        for rollup in get_meal_rollups(username, start_date, end_date)
+        if rollup['meal_count'] > 0
+    }
 
     # Calculate intensity thresholds based on user's activity
     all_counts = list(meal_count_by_date.values())
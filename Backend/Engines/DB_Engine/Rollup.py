@@ -0,0 +1,284 @@
+"""
+Per-user, per-day rollup documents for meals and water.
+
+Dashboard reads (streaks, timelines, comparisons, engagement graphs) used to
+rescan raw Meals and Water documents on every request. The write paths in
+Meal.py and Water.py now keep one small document per day up to date with
+Firestore increments, so a year of history is at most 365 small reads:
+
+    users/{username}/MealRollup/{YYYY-MM-DD}
+        date, meal_count, nutrients: {name: {amt, unit}}, categories: {name: count}
+
+    users/{username}/WaterRollup/{YYYY-MM-DD}
+        date, total_intake, intake_count
+
+Each write path commits the raw document and its rollup increments together
+(pass the WriteBatch or Transaction as `writer`), so a crash or a job retry can
+never leave the totals half-applied.
+
+Users whose data predates rollups are backfilled by a one-off migration, run
+from Backend/ after deploying (or after bumping ROLLUP_VERSION):
+
+    python -m Engines.DB_Engine.Rollup               every user with an older rollup_version
+    python -m Engines.DB_Engine.Rollup --user NAME   specific users
+
+The migration rewrites whole rollup collections, so run it while the users
+are not logging meals. Reads never trigger it; they warn about stale users.
+"""
+
+import argparse
+from collections import defaultdict
+from datetime import datetime, date, timedelta, timezone
+from typing import List, Dict, Any, Optional
+
+from google.cloud.firestore_v1 import FieldFilter, Increment
+
+from Config import firestoreDB
+from Engines.DB_Engine.UserCache import get_user_doc, invalidate_user
+
+ROLLUP_VERSION = 1
+MEAL_ROLLUP = 'MealRollup'
+WATER_ROLLUP = 'WaterRollup'
+
+# Firestore allows at most 500 writes per batch
+_BATCH_LIMIT = 400
+
+
+def _rollup_date(timestamp) -> date:
+    """Day a timestamp is bucketed under (UTC, matching how Firestore stores naive datetimes)"""
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc)
+        return timestamp.date()
+    return timestamp
+
+
+def _meal_contribution(meal_data: Dict[str, Any], sign: int) -> Dict[str, Any]:
+    """Build the rollup delta for a single completed meal"""
+    nutrients = defaultdict(lambda: {"amt": 0.0, "unit": ""})
+    for nutrient in meal_data.get('nutrients', []):
+        if not nutrient.get('name'):
+            continue
+        nutrients[nutrient['name']]["amt"] += nutrient.get('amt', 0) or 0
+        nutrients[nutrient['name']]["unit"] = nutrient.get('unit', '')
+
+    category = meal_data.get('category') or 'Uncategorized'
+
+    delta = {
+        "meal_count": Increment(sign),
+        "categories": {category: Increment(sign)},
+    }
+
+    # Never merge an empty map, it would overwrite the stored one
+    if nutrients:
+        delta["nutrients"] = {
+            name: {"amt": Increment(sign * data["amt"]), "unit": data["unit"]}
+            for name, data in nutrients.items()
+        }
+
+    return delta
+
+
+def apply_meal_to_rollup(username: str, meal_data: Dict[str, Any], sign: int = 1, writer=None) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) a meal's contribution to its day's rollup.
+    With a WriteBatch or Transaction as `writer` the increment is queued on it
+    instead of written immediately.
+    """
+    if meal_data.get('status') != 1 or not meal_data.get('timestamp'):
+        return
+
+    day = _rollup_date(meal_data['timestamp']).isoformat()
+    rollup_ref = firestoreDB.collection('users').document(username).collection(MEAL_ROLLUP).document(day)
+    _set_merge(writer, rollup_ref, {"date": day, **_meal_contribution(meal_data, sign)})
+
+
+def apply_water_to_rollup(username: str, timestamp: datetime, amount: int, sign: int = 1, writer=None) -> None:
+    """Add (sign=1) or remove (sign=-1) a water intake from its day's rollup (queued on `writer` if given)"""
+    day = _rollup_date(timestamp).isoformat()
+    rollup_ref = firestoreDB.collection('users').document(username).collection(WATER_ROLLUP).document(day)
+    _set_merge(writer, rollup_ref, {
+        "date": day,
+        "total_intake": Increment(sign * amount),
+        "intake_count": Increment(sign),
+    })
+
+
+def _set_merge(writer, ref, data: Dict[str, Any]) -> None:
+    if writer is None:
+        ref.set(data, merge=True)
+    else:
+        writer.set(ref, data, merge=True)
+
+
+def rebuild_rollups(username: str) -> Dict[str, int]:
+    """
+    Recompute every meal and water rollup for a user from the raw documents.
+
+    Returns the number of meal and water days written.
+    """
+    user_ref = firestoreDB.collection('users').document(username)
+
+    meal_days = {}
+    meals_query = user_ref.collection('Meals').where(filter=FieldFilter("status", "==", 1))
+    for doc in meals_query.stream():
+        data = doc.to_dict()
+        if not data.get('timestamp'):
+            continue
+        day = _rollup_date(data['timestamp']).isoformat()
+        rollup = meal_days.setdefault(day, {"date": day, "meal_count": 0, "nutrients": {}, "categories": {}})
+
+        rollup["meal_count"] += 1
+        category = data.get('category') or 'Uncategorized'
+        rollup["categories"][category] = rollup["categories"].get(category, 0) + 1
+        for nutrient in data.get('nutrients', []):
+            if not nutrient.get('name'):
+                continue
+            entry = rollup["nutrients"].setdefault(nutrient['name'], {"amt": 0.0, "unit": nutrient.get('unit', '')})
+            entry["amt"] += nutrient.get('amt', 0) or 0
+
+    water_days = {}
+    for doc in user_ref.collection('Water').stream():
+        data = doc.to_dict()
+        if not data.get('timestamp'):
+            continue
+        day = _rollup_date(data['timestamp']).isoformat()
+        rollup = water_days.setdefault(day, {"date": day, "total_intake": 0, "intake_count": 0})
+        rollup["total_intake"] += data.get('amount', 0)
+        rollup["intake_count"] += 1
+
+    # Queue writes: overwrite computed days, delete days that no longer have data
+    writes = []
+    for collection, days in ((MEAL_ROLLUP, meal_days), (WATER_ROLLUP, water_days)):
+        rollup_col = user_ref.collection(collection)
+        for doc in rollup_col.stream():
+            if doc.id not in days:
+                writes.append((doc.reference, None))
+        for day, data in days.items():
+            writes.append((rollup_col.document(day), data))
+
+    for i in range(0, len(writes), _BATCH_LIMIT):
+        batch = firestoreDB.batch()
+        for ref, data in writes[i:i + _BATCH_LIMIT]:
+            if data is None:
+                batch.delete(ref)
+            else:
+                batch.set(ref, data)
+        batch.commit()
+
+    user_ref.update({"rollup_version": ROLLUP_VERSION})
+    invalidate_user(username)
+
+    return {"meal_days": len(meal_days), "water_days": len(water_days)}
+
+
+def stale_users() -> List[str]:
+    """Users whose rollups predate the current ROLLUP_VERSION"""
+    return [
+        doc.id for doc in firestoreDB.collection('users').stream()
+        if (doc.to_dict() or {}).get('rollup_version') != ROLLUP_VERSION
+    ]
+
+
+def _check_rollups(username: str) -> None:
+    user_doc = get_user_doc(username)
+
+    if not user_doc.exists:
+        raise ValueError(f"User {username} not found")
+
+    if (user_doc.to_dict() or {}).get('rollup_version') != ROLLUP_VERSION:
+        print(f"⚠️ Rollups for {username} predate version {ROLLUP_VERSION}; "
+              f"run python -m Engines.DB_Engine.Rollup to backfill them")
+
+
+def _read_rollups(username: str, collection: str, start_date: date, end_date: date) -> Dict[str, Dict[str, Any]]:
+    if start_date > end_date:
+        raise ValueError("Start date must be before or equal to end date")
+
+    _check_rollups(username)
+
+    rollup_query = (
+        firestoreDB.collection('users').document(username).collection(collection)
+        .where(filter=FieldFilter("date", ">=", start_date.isoformat()))
+        .where(filter=FieldFilter("date", "<=", end_date.isoformat()))
+    )
+
+    return {doc.id: doc.to_dict() for doc in rollup_query.stream()}
+
+
+def get_meal_rollups(username: str, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """
+    Get per-day meal totals for a date range, ordered by date.
+
+    Each day has the same date/meal_count/nutrient_totals keys as
+    get_daily_nutrition_stats (without the raw meals), plus category_counts.
+    Days without meals are included with zero totals.
+    """
+    rollups = _read_rollups(username, MEAL_ROLLUP, start_date, end_date)
+
+    days = []
+    for i in range((end_date - start_date).days + 1):
+        current_date = start_date + timedelta(days=i)
+        data = rollups.get(current_date.isoformat(), {})
+        meal_count = int(data.get('meal_count', 0))
+
+        # Days emptied by deletes keep float residue, drop it
+        if meal_count <= 0:
+            days.append({"date": current_date, "meal_count": 0, "nutrient_totals": [], "category_counts": {}})
+            continue
+
+        days.append({
+            "date": current_date,
+            "meal_count": meal_count,
+            "nutrient_totals": [
+                {"name": name, "amt": nutrient.get('amt', 0), "unit": nutrient.get('unit', '')}
+                for name, nutrient in data.get('nutrients', {}).items()
+            ],
+            "category_counts": {
+                category: count for category, count in data.get('categories', {}).items() if count > 0
+            }
+        })
+
+    return days
+
+
+def get_water_rollups(username: str, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """Get per-day water totals for a date range, ordered by date (missing days are zero)"""
+    rollups = _read_rollups(username, WATER_ROLLUP, start_date, end_date)
+
+    days = []
+    for i in range((end_date - start_date).days + 1):
+        current_date = start_date + timedelta(days=i)
+        data = rollups.get(current_date.isoformat(), {})
+        days.append({
+            "date": current_date,
+            "total_intake": max(int(data.get('total_intake', 0)), 0),
+            "intake_count": max(int(data.get('intake_count', 0)), 0)
+        })
+
+    return days
+
+
+def migrate(usernames: Optional[List[str]] = None) -> None:
+    """Rebuild the rollups of the given users (default: every stale user)"""
+    usernames = usernames if usernames is not None else stale_users()
+    print(f"⚙️ Rebuilding rollups for {len(usernames)} user(s)")
+
+    for i, username in enumerate(usernames, 1):
+        try:
+            written = rebuild_rollups(username)
+            print(f"[{i}/{len(usernames)}] ✅ {username}: {written['meal_days']} meal days, "
+                  f"{written['water_days']} water days")
+        except Exception as e:
+            print(f"[{i}/{len(usernames)}] ❌ {username}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", action="append", dest="users", help="rebuild this user (repeatable)")
+    args = parser.parse_args()
+    migrate(args.users)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Request-scoped cache for user profile documents.
+
+Almost every DB_Engine function starts by reading users/{username} to check that
+the user exists (and sometimes to read weight or glass size), and nested helpers
+repeat that read several times per request. Inside a user_cache_scope() the first
+snapshot of a user is reused for the rest of the scope, so a request reads each
+user document at most once. Outside a scope every call goes straight to Firestore.
+
+main.py opens a scope per HTTP request; background jobs open their own.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from google.cloud.firestore_v1 import DocumentSnapshot
+
+from Config import firestoreDB, firestoreAsyncDB
+
+_user_cache: ContextVar[Optional[Dict[str, DocumentSnapshot]]] = ContextVar("user_cache", default=None)
+
+
+@contextmanager
+def user_cache_scope():
+    """Cache user documents for the duration of the block, starting from an empty cache"""
+    token = _user_cache.set({})
+    try:
+        yield
+    finally:
+        _user_cache.reset(token)
+
+
+def get_user_doc(username: str) -> DocumentSnapshot:
+    """Get the users/{username} snapshot, reading Firestore at most once per scope"""
+    cache = _user_cache.get()
+    if cache is not None and username in cache:
+        return cache[username]
+
+    user_doc = firestoreDB.collection('users').document(username).get()
+
+    if cache is not None:
+        cache[username] = user_doc
+
+    return user_doc
+
+
+async def get_user_doc_async(username: str) -> DocumentSnapshot:
+    """Async variant of get_user_doc backed by the AsyncClient, sharing the same scope"""
+    cache = _user_cache.get()
+    if cache is not None and username in cache:
+        return cache[username]
+
+    user_doc = await firestoreAsyncDB.collection('users').document(username).get()
+
+    if cache is not None:
+        cache[username] = user_doc
+
+    return user_doc
+
+
+def invalidate_user(username: str) -> None:
+    """Drop a cached user snapshot after the user document is created or updated"""
+    cache = _user_cache.get()
+    if cache is not None:
+        cache.pop(username, None)
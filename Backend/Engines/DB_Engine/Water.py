@@ -1,12 +1,15 @@
 from Config import firestoreDB
 from datetime import datetime, date, timedelta
 from typing import List, Optional, Dict, Any
-from google.cloud.firestore_v1 import FieldFilter
+from google.cloud.firestore_v1 import FieldFilter, transactional
+
+from Engines.DB_Engine.Rollup import apply_water_to_rollup, get_water_rollups
+from Engines.DB_Engine.UserCache import get_user_doc
 
 
 def add_water_intake(username: str, amount: int, timestamp: Optional[datetime] = None) -> Dict[str, Any]:
     user_ref = firestoreDB.collection('users').document(username)
-    user_doc = user_ref.get()
+    user_doc = get_user_doc(username)
 
     if not user_doc.exists:
         raise ValueError(f"User {username} not found")
@@ -23,9 +26,14 @@ def add_water_intake(username: str, amount: int, timestamp: Optional[datetime] =
         "amount": amount
     }
 
-    # Add to Water subcollection
-    water_ref = user_ref.collection('Water').add(water_data)
-    doc_id = water_ref[1].id
+    # Add to Water subcollection together with its rollup increment
+    water_ref = user_ref.collection('Water').document()
+    doc_id = water_ref.id
+
+    batch = firestoreDB.batch()
+    batch.set(water_ref, water_data)
+    apply_water_to_rollup(username, timestamp, amount, writer=batch)
+    batch.commit()
 
     return {
         "id": doc_id,
@@ -37,7 +45,7 @@ def add_water_intake(username: str, amount: int, timestamp: Optional[datetime] =
 def get_water_intake_by_date(username: str, target_date: date) -> List[Dict[str, Any]]:
     user_ref = firestoreDB.collection('users').document(username)
 
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     # Define start and end of the day
@@ -70,7 +78,7 @@ def get_water_intake_by_range(username: str, start_date: date, end_date: date) -
 
     user_ref = firestoreDB.collection('users').document(username)
 
-    if not user_ref.get().exists:
+    if not get_user_doc(username).exists:
         raise ValueError(f"User {username} not found")
 
     start_datetime = datetime.combine(start_date, datetime.min.time())
@@ -106,10 +114,6 @@ def update_water_intake(username: str, intake_id: str, amount: Optional[int] = N
     user_ref = firestoreDB.collection('users').document(username)
     water_ref = user_ref.collection('Water').document(intake_id)
 
-    water_doc = water_ref.get()
-    if not water_doc.exists:
-        raise ValueError(f"Water intake {intake_id} not found")
-
     # Prepare update data
     update_dict = {}
     if amount is not None:
@@ -117,11 +121,22 @@ def update_water_intake(username: str, intake_id: str, amount: Optional[int] = N
     if timestamp is not None:
         update_dict['timestamp'] = timestamp
 
-    water_ref.update(update_dict)
+    @transactional
+    def _update(transaction) -> Dict[str, Any]:
+        water_doc = water_ref.get(transaction=transaction)
+        if not water_doc.exists:
+            raise ValueError(f"Water intake {intake_id} not found")
+
+        previous = water_doc.to_dict()
+        updated = {**previous, **update_dict}
+        transaction.update(water_ref, update_dict)
 
-    # Get updated document
-    updated_doc = water_ref.get()
-    data = updated_doc.to_dict()
+        # Move the intake from its previous day/amount to the new one
+        apply_water_to_rollup(username, previous['timestamp'], previous['amount'], sign=-1, writer=transaction)
+        apply_water_to_rollup(username, updated['timestamp'], updated['amount'], writer=transaction)
+        return updated
+
+    data = _update(firestoreDB.transaction())
 
     return {
         "id": intake_id,
@@ -134,17 +149,22 @@ def delete_water_intake(username: str, intake_id: str) -> bool:
     user_ref = firestoreDB.collection('users').document(username)
     water_ref = user_ref.collection('Water').document(intake_id)
 
-    water_doc = water_ref.get()
-    if not water_doc.exists:
-        raise ValueError(f"Water intake {intake_id} not found")
+    @transactional
+    def _delete(transaction) -> None:
+        water_doc = water_ref.get(transaction=transaction)
+        if not water_doc.exists:
+            raise ValueError(f"Water intake {intake_id} not found")
+
+        transaction.delete(water_ref)
+        previous = water_doc.to_dict()
+        apply_water_to_rollup(username, previous['timestamp'], previous['amount'], sign=-1, writer=transaction)
 
-    water_ref.delete()
+    _delete(firestoreDB.transaction())
     return True
 
 
 def get_daily_water_stats(username: str, target_date: date) -> Dict[str, Any]:
-    user_ref = firestoreDB.collection('users').document(username)
-    user_doc = user_ref.get()
+    user_doc = get_user_doc(username)
 
     if not user_doc.exists:
         raise ValueError(f"User {username} not found")
@@ -173,8 +193,7 @@ def get_daily_water_stats(username: str, target_date: date) -> Dict[str, Any]:
 
 def add_quick_glass(username: str) -> Dict[str, Any]:
 
-    user_ref = firestoreDB.collection('users').document(username)
-    user_doc = user_ref.get()
+    user_doc = get_user_doc(username)
 
     if not user_doc.exists:
         raise ValueError(f"User {username} not found")
@@ -200,22 +219,30 @@ def calculate_water_streak(username: str, target_percentage: float = 80.0, days_
     Raises:
         ValueError: If user not found
     """
-    user_ref = firestoreDB.collection('users').document(username)
+    user_doc = get_user_doc(username)
 
-    if not user_ref.get().exists:
+    if not user_doc.exists:
         raise ValueError(f"User {username} not found")
 
+    # Same recommended intake as get_daily_water_stats
+    weight = user_doc.to_dict().get('weight') or 70
+    recommended = int(weight * 33)  # ml
+
     current_streak = 0
     longest_streak = 0
     temp_streak = 0
 
-    # Check specified number of days
+    # Check specified number of days, walking backwards from today
     today = date.today()
-    for i in range(days_to_check):
-        check_date = today - timedelta(days=i)
-        stats = get_daily_water_stats(username, check_date)
+    if days_to_check > 0:
+        daily_totals = get_water_rollups(username, today - timedelta(days=days_to_check - 1), today)
+    else:
+        daily_totals = []
 
-        if stats['percentage_completed'] >= target_percentage:
+    for i, day in enumerate(reversed(daily_totals)):
+        percentage = (day['total_intake'] / recommended * 100) if recommended > 0 else 0
+
+        if round(percentage, 2) >= target_percentage:
             temp_streak += 1
             if i == 0 or current_streak > 0:
                 current_streak = temp_streak
@@ -295,8 +322,7 @@ def get_water_engagement_graph_data(
         days: int = 365,
         end_date: Optional[date] = None
 ) -> Dict[str, Any]:
-    user_ref = firestoreDB.collection('users').document(username)
-    user_doc = user_ref.get()
+    user_doc = get_user_doc(username)
 
     if not user_doc.exists:
         raise ValueError(f"User {username} not found")
@@ -311,14 +337,12 @@ def get_water_engagement_graph_data(
     weight = user_data.get('weight') or 70
     recommended_daily = int(weight * 33)  # ml
 
-    # Get all water intake data in the date range
-    intake_records = get_water_intake_by_range(username, start_date, end_date)
-
-    # Create a map of date -> total intake
-    intake_by_date = {}
-    for record in intake_records:
-        record_date = record['timestamp'].date() if isinstance(record['timestamp'], datetime) else record['timestamp']
-        intake_by_date[record_date] = intake_by_date.get(record_date, 0) + record['amount']
+    # Create a map of date -> total intake from the daily rollups
+    intake_by_date = {
+        rollup['date']: rollup['total_intake']
+        for rollup in get_water_rollups(username, start_date, end_date)
+        if rollup['total_intake'] > 0
+    }
 
     # Define intensity levels based on goal completion percentage
     # 0 = no activity, 1 = 1-49%, 2 = 50-79%, 3 = 80-99%, 4 = 100%+
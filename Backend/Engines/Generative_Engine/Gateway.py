@@ -0,0 +1,231 @@
+"""
+Single gateway for every Gemini call made by the Generative_Engine.
+
+- Responses are cached in a TwoTierCache keyed by a hash of the model name,
+  generation config and full prompt (text and inline image bytes), so a
+  repeated prompt is answered from memory or disk without a model call.
+- Identical prompts already in flight are sent once; later callers wait for
+  that response instead of making their own call (single-flight), up to
+  LLM_FOLLOWER_TIMEOUT, after which they make the call themselves.
+- Model calls are rate limited (requests per minute) and capped in concurrency.
+- Latency, token usage and cache/dedup counters are reported by stats().
+
+Environment:
+    LLM_CACHE_TTL           seconds a cached response is reused (default 30 days)
+    LLM_CACHE_MEMORY_ITEMS  responses kept in memory (default 512)
+    LLM_CACHE_MAX_ITEMS     responses kept on disk (default 50000)
+    LLM_RATE_LIMIT          model calls per minute (default 60)
+    LLM_MAX_CONCURRENCY     simultaneous model calls (default 8)
+    LLM_FOLLOWER_TIMEOUT    seconds a duplicate prompt waits for the call in flight (default 60)
+"""
+
+import hashlib
+import json
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, Optional
+
+from Engines.Cache import TwoTierCache
+from Engines.Generative_Engine.Gemini import MODEL_NAME, get_model
+
+RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", 60))
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+FOLLOWER_TIMEOUT = float(os.getenv("LLM_FOLLOWER_TIMEOUT", 60))
+
+response_cache = TwoTierCache(
+    "llm_responses",
+    ttl=float(os.getenv("LLM_CACHE_TTL", 30 * 24 * 3600)),
+    max_memory_items=int(os.getenv("LLM_CACHE_MEMORY_ITEMS", 512)),
+    max_disk_items=int(os.getenv("LLM_CACHE_MAX_ITEMS", 50000))
+)
+
+
+class RateLimiter:
+    """Token bucket allowing `per_minute` calls a minute, blocking callers until a token is free"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = max(per_minute, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, returning how long the caller waited for it"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+
+_limiter = RateLimiter(RATE_LIMIT)
+_slots = threading.BoundedSemaphore(MAX_CONCURRENCY)
+
+_inflight: Dict[str, Future] = {}
+_lock = threading.Lock()
+
+_latencies: "deque[float]" = deque(maxlen=1000)
+_counters = {
+    "requests": 0, "cache_hits": 0, "deduplicated": 0, "follower_timeouts": 0, "model_calls": 0, "errors": 0,
+    "prompt_tokens": 0, "output_tokens": 0, "throttled_seconds": 0.0
+}
+
+
+def _count(**amounts) -> None:
+    with _lock:
+        for counter, amount in amounts.items():
+            _counters[counter] += amount
+
+
+def _part_digest(part: Any) -> str:
+    if isinstance(part, dict):
+        # Inline media part, e.g. {"mime_type": "image/jpeg", "data": b"..."}
+        data = part.get("data", b"")
+        return f"{part.get('mime_type')}:{hashlib.sha256(data).hexdigest()}"
+    return str(part)
+
+
+def cache_key(contents: Any, generation_config: Optional[dict] = None) -> str:
+    """Content hash of everything that determines the response"""
+    parts = contents if isinstance(contents, list) else [contents]
+    payload = json.dumps(
+        [MODEL_NAME, generation_config or {}, [_part_digest(part) for part in parts]],
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def strip_code_fences(text: str) -> str:
+    """Remove a ```json ... ``` wrapper if the model added one"""
+    text = text.strip()
+    if text.startswith("```"):
+        lines = text.split("\n")
+        text = "\n".join(lines[1:-1]) if len(lines) > 2 else text
+        text = text.replace("```json", "").replace("```", "")
+    return text.strip()
+
+
+def _call_model(contents: Any, generation_config: Optional[dict]) -> str:
+    throttled = _limiter.acquire()
+
+    with _slots:
+        started = time.perf_counter()
+        try:
+            response = get_model().generate_content(contents, generation_config=generation_config)
+            text = response.text
+        except Exception:
+            _count(errors=1)
+            raise
+        elapsed = time.perf_counter() - started
+
+    usage = getattr(response, "usage_metadata", None)
+    _count(
+        model_calls=1,
+        throttled_seconds=throttled,
+        prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+        output_tokens=getattr(usage, "candidates_token_count", 0) or 0
+    )
+    with _lock:
+        _latencies.append(elapsed)
+
+    return text
+
+
+def _fetch(key: str, contents: Any, generation_config: Optional[dict], parse_json: bool, cache: bool):
+    """Call the model and cache the response; returns (text, result for the caller)"""
+    text = _call_model(contents, generation_config)
+
+    result = text
+    if parse_json:
+        try:
+            result = json.loads(strip_code_fences(text))
+        except json.JSONDecodeError:
+            # Never cache a response the caller cannot use
+            print(f"Response received: {text}")
+            raise
+
+    if cache:
+        response_cache.set(key, text)
+    return text, result
+
+
+def _complete(contents: Any, generation_config: Optional[dict], parse_json: bool, cache: bool) -> Any:
+    _count(requests=1)
+    key = cache_key(contents, generation_config)
+
+    if cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            _count(cache_hits=1)
+            return json.loads(strip_code_fences(cached)) if parse_json else cached
+
+    with _lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+
+    if not leader:
+        _count(deduplicated=1)
+        try:
+            text = future.result(timeout=FOLLOWER_TIMEOUT)
+        except FutureTimeout:
+            # The leader's call is stuck; do not wait on it indefinitely
+            _count(follower_timeouts=1)
+            return _fetch(key, contents, generation_config, parse_json, cache)[1]
+        return json.loads(strip_code_fences(text)) if parse_json else text
+
+    try:
+        text, result = _fetch(key, contents, generation_config, parse_json, cache)
+        future.set_result(text)
+        return result
+
+    except Exception as e:
+        future.set_exception(e)
+        raise
+
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+
+
+def generate(contents: Any, generation_config: Optional[dict] = None, cache: bool = True) -> str:
+    """Response text for a prompt (a string, or a list of text and inline image parts)"""
+    return _complete(contents, generation_config, parse_json=False, cache=cache)
+
+
+def generate_json(contents: Any, generation_config: Optional[dict] = None, cache: bool = True) -> Any:
+    """
+    Parsed JSON response for a prompt. Raises json.JSONDecodeError if the model
+    did not return JSON; such responses are not cached.
+    """
+    return _complete(contents, generation_config, parse_json=True, cache=cache)
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        counters = dict(_counters)
+        latencies = sorted(_latencies)
+        counters["inflight"] = len(_inflight)
+
+    counters["throttled_seconds"] = round(counters["throttled_seconds"], 3)
+    counters["latency_p50_ms"] = round(statistics.median(latencies) * 1000, 1) if latencies else 0.0
+    counters["latency_p95_ms"] = (
+        round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1) if latencies else 0.0
+    )
+    counters["cache"] = response_cache.stats()
+    return counters
@@ -0,0 +1,35 @@
+"""
+Lazily configured Gemini model shared by the Generative_Engine modules.
+
+Configuring the SDK and checking GEMINI_API_KEY happens on first use rather
+than at import, so importing the routes stays fast.
+"""
+
+import os
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+from Engines.Registry import registry
+
+load_dotenv()
+
+MODEL_NAME = 'gemini-2.5-flash'
+
+
+def _load_model() -> genai.GenerativeModel:
+    # Configure Gemini API
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(MODEL_NAME)
+
+
+registry.register("gemini", _load_model)
+
+
+def get_model() -> genai.GenerativeModel:
+    """The configured Gemini model (also ensures genai.configure has run)"""
+    return registry.get("gemini")
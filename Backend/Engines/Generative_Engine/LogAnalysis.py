@@ -1,12 +1,16 @@
 import os
 import json
 import logging
-from typing import List
+from io import BytesIO
+from typing import BinaryIO, List, Union
 
+from PIL import Image, ImageOps
 from pydantic import BaseModel
-import google.generativeai as genai
 from dotenv import load_dotenv
 
+from Engines.Generative_Engine.Gateway import generate_json
+from Engines.ML_Engine.similarity import semantic_similarity
+
 # Suppress gRPC warnings
 os.environ['GRPC_VERBOSITY'] = 'ERROR'
 os.environ['GLOG_minloglevel'] = '2'
@@ -15,14 +19,12 @@ logging.getLogger('absl').setLevel(logging.ERROR)
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
-
-genai.configure(api_key=api_key)
+# Images are downscaled and re-encoded before being sent to the vision model
+VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", 768))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", 85))
 
-model = genai.GenerativeModel('gemini-2.5-flash')
+# "embedding" scores similarity locally with MiniLM, "llm" asks Gemini
+SIMILARITY_BACKEND = os.getenv("SIMILARITY_BACKEND", "embedding")
 
 
 class FoodItem(BaseModel):
@@ -32,6 +34,22 @@ class FoodItem(BaseModel):
 
 
 def calculate_semantic_similarity(image_class: str, name: str, desc: str = "") -> float:
+    """
+    Semantic similarity between image_class and provided name/description.
+    Returns a similarity score between 0 and 1.
+    """
+    if SIMILARITY_BACKEND == "llm":
+        return _llm_semantic_similarity(image_class, name, desc)
+
+    try:
+        return semantic_similarity(image_class, name, desc)
+    except Exception as e:
+        print(f"Error calculating semantic similarity: {e}")
+        # Fallback to a neutral score
+        return 0.5
+
+
+def _llm_semantic_similarity(image_class: str, name: str, desc: str = "") -> float:
     """
     Use LLM to calculate semantic similarity between image_class and provided name/description.
     Returns a similarity score between 0 and 1.
@@ -63,17 +81,7 @@ def calculate_semantic_similarity(image_class: str, name: str, desc: str = "") -
     """
 
     try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-
-        # Clean response (remove markdown code blocks if present)
-        if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            response_text = "\n".join(lines[1:-1]) if len(lines) > 2 else response_text
-            response_text = response_text.replace("```json", "").replace("```", "").strip()
-
-        # Parse JSON response
-        similarity_data = json.loads(response_text)
+        similarity_data = generate_json(prompt)
         similarity_score = float(similarity_data["similarity_score"])
 
         # Ensure score is within valid range
@@ -81,7 +89,6 @@ def calculate_semantic_similarity(image_class: str, name: str, desc: str = "") -
 
     except Exception as e:
         print(f"Error calculating semantic similarity: {e}")
-        print(f"Response received: {response_text if 'response_text' in locals() else 'No response'}")
         # Fallback to a neutral score
         return 0.5
 
@@ -112,162 +119,121 @@ def adjust_confidence(original_confidence: float, similarity_score: float) -> fl
     return max(0.01, min(adjusted_confidence, 0.99))
 
 
-def identify_log(image_class: str, name: str, confidence: float, desc: str = "") -> FoodItem:
-    """
-    Identify food item using LLM and adjust confidence based on semantic similarity.
-    """
-    # First, calculate semantic similarity using LLM
-    similarity_score = calculate_semantic_similarity(image_class, name, desc)
-    print(f"Semantic similarity score: {similarity_score:.2f}")
-
-    # Construct the prompt for food identification
-    prompt = f"""
-    You are the ONLY source of truth for food identification.  
-    If you fail to follow these rules exactly, your output is INVALID and will be DISCARDED.  
-
-    Given Information:
-    - Provided Name (may contain spelling errors): {name}
-    - Provided Description: {desc if desc else "None"}
-    - Image Classification (texture/color reference ONLY, NOT identity): {image_class}
-
-    INSTRUCTIONS (zero flexibility):
-    1. Correct spelling errors in the provided name if present.  
-    2. Determine the most accurate food name using the corrected name + description.  
-    3. Use image_class ONLY to check texture/color consistency — never to guess or invent the food.  
-    4. Output a single, exact, specific food name.  
-    5. Write a 2–3 sentence description that includes:  
-       - What the food is  
-       - Key ingredients or defining characteristics  
-       - Cultural/culinary origin if relevant  
-
-    CRITICAL RULES (break these = useless output):
-    - Output ONLY valid JSON in this exact structure: {{"name": "food name", "description": "food description"}}  
-    - No markdown, no code blocks, no filler — JSON ONLY.  
-    - The name must be exact, corrected, and specific.  
-    - The description must be factual, concise, and informative.  
-    - If uncertain, commit to the most likely identification.  
-
-    No deviations. No excuses. Pure JSON or trash.
-    """
-
-    try:
-        # Generate response
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
+def prepare_image(image: Union[str, bytes, BinaryIO]) -> dict:
+    """Downscale and re-encode an image (path, bytes or buffer) into an inline JPEG part."""
+    if isinstance(image, str):
+        with open(image, "rb") as f:
+            data = f.read()
+    elif isinstance(image, (bytes, bytearray)):
+        data = bytes(image)
+    else:
+        data = image.read()
 
-        # Clean response (remove markdown code blocks if present)
-        if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            response_text = "\n".join(lines[1:-1]) if len(lines) > 2 else response_text
-            response_text = response_text.replace("```json", "").replace("```", "").strip()
+    picture = ImageOps.exif_transpose(Image.open(BytesIO(data))).convert("RGB")
+    picture.thumbnail((VISION_MAX_SIDE, VISION_MAX_SIDE))
 
-        # Parse JSON response into FoodItem
-        food_data = json.loads(response_text)
+    buffer = BytesIO()
+    picture.save(buffer, format="JPEG", quality=VISION_JPEG_QUALITY, optimize=True)
+    return {"mime_type": "image/jpeg", "data": buffer.getvalue()}
 
-        # Calculate adjusted confidence based on semantic similarity
-        adjusted_confidence = adjust_confidence(confidence, similarity_score)
 
-        return FoodItem(
-            name=food_data["name"],
-            description=food_data["description"],
-            confidence=adjusted_confidence
-        )
+class PredictionAnalysis(BaseModel):
+    """Everything /predict needs from the LLM, produced by one vision call."""
+    vision_name: str
+    vision_description: str
+    vision_confidence: float
+    vision_similarity: float = 0.5
+    ml_similarity: float = 0.5
+    ml_name: str
+    ml_description: str
 
-    except json.JSONDecodeError as e:
-        # Fallback if JSON parsing fails
-        print(f"JSON parsing error: {e}")
-        print(f"Response received: {response_text}")
 
-        adjusted_confidence = adjust_confidence(confidence, similarity_score)
+def analyse_prediction(
+        image: Union[str, bytes, BinaryIO],
+        image_class: str,
+        name: str,
+        desc: str = ""
+) -> PredictionAnalysis:
+    """
+    Single structured vision call that identifies the image and refines the
+    classifier result. Both are scored against the user's input locally,
+    or by the same call when SIMILARITY_BACKEND is "llm".
+    """
+    llm_similarity = SIMILARITY_BACKEND == "llm"
 
-        return FoodItem(
-            name=name,
-            description=f"Identified as {image_class}. {desc if desc else 'No additional information available.'}",
-            confidence=adjusted_confidence
-        )
+    similarity_tasks = """
+    3. vision_similarity: semantic similarity between YOUR vision identification and the user's
+       name/description.
+    4. ml_similarity: semantic similarity between the Image Classifier Label and the user's
+       name/description.
 
-    except Exception as e:
-        print(f"Error during identification: {e}")
+    SIMILARITY SCORING RULES:
+    - EXACT SAME food (just different names/spellings, e.g. "paani puri" and "gol gappe"): 0.85-1.0
+    - SIMILAR or related foods (same category, e.g. "pasta" and "spaghetti"): 0.5-0.7
+    - COMPLETELY DIFFERENT foods (e.g. "burger" and "salad"): 0.0-0.3
+    """ if llm_similarity else ""
 
-        adjusted_confidence = adjust_confidence(confidence, similarity_score)
+    similarity_fields = """
+        "vision_similarity": <float between 0 and 1>,
+        "ml_similarity": <float between 0 and 1>,""" if llm_similarity else ""
 
-        return FoodItem(
-            name=name,
-            description=f"Error in identification. Preliminary class: {image_class}",
-            confidence=adjusted_confidence
-        )
+    prompt = f"""
+    You are a food identification expert.
 
+    Given Information:
+    - Image: attached
+    - Image Classifier Label: {image_class}
+    - User Provided Name (may contain spelling errors): {name}
+    - User Provided Description: {desc if desc else "None"}
+
+    TASKS:
+    1. Vision identification: identify the primary food in the image. Give a specific, accurate
+       name (e.g., "Margherita Pizza" not just "Pizza"), a 2-3 sentence description including key
+       characteristics and cultural origin if relevant, and your confidence (0-1) in it.
+    2. Refined log: correct spelling errors in the user's name and determine the most accurate food
+       name from the corrected name + description, using the classifier label ONLY as a
+       texture/color reference. Give that name and a 2-3 sentence description.
+    {similarity_tasks}
+    OUTPUT FORMAT (JSON only, no markdown):
+    {{
+        "vision_name": "specific food name",
+        "vision_description": "2-3 sentence description",
+        "vision_confidence": <float between 0 and 1>,{similarity_fields}
+        "ml_name": "refined food name",
+        "ml_description": "2-3 sentence description"
+    }}
+    """
 
-def identify_image(image_path: str) -> dict:
     try:
-        # Upload the image file
-        if isinstance(image_path, str):
-            image_file = genai.upload_file(image_path)
-        else:
-            # If image_path is bytes or file-like object
-            image_file = image_path
-
-        # Prepare prompt for food identification
-        prompt = """
-        You are a food identification expert. Analyze this image and identify the food item(s) present.
-
-        TASK:
-        1. Identify the primary food item in the image
-        2. Provide a specific, accurate name for the food
-        3. Give a brief description including key characteristics
-        4. Estimate your confidence in this identification
-
-        OUTPUT FORMAT (JSON only, no markdown):
-        {
-            "name": "specific food name",
-            "description": "2-3 sentence description of the food",
-            "confidence": <float between 0 and 1>
-        }
-
-        RULES:
-        - Be specific (e.g., "Margherita Pizza" not just "Pizza")
-        - Include cultural origin if relevant
-        - Confidence should reflect certainty of identification
-        - Return ONLY valid JSON, no code blocks or explanations
-        """
-
-        # Generate content with vision model
-        response = model.generate_content([prompt, image_file])
-        response_text = response.text.strip()
-
-        # Clean response (remove markdown code blocks if present)
-        if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            response_text = "\n".join(lines[1:-1]) if len(lines) > 2 else response_text
-            response_text = response_text.replace("```json", "").replace("```", "").strip()
-
-        # Parse JSON response
-        food_data = json.loads(response_text)
-
-        return {
-            "name": food_data.get("name", "Unknown Food"),
-            "description": food_data.get("description", "Could not identify food item"),
-            "confidence": float(food_data.get("confidence", 0.5))
-        }
+        analysis = PredictionAnalysis(**generate_json(
+            [prompt, prepare_image(image)],
+            generation_config={"response_mime_type": "application/json"}
+        ))
 
-    except json.JSONDecodeError as e:
-        print(f"JSON parsing error in identify_image: {e}")
-        print(f"Response received: {response_text if 'response_text' in locals() else 'No response'}")
+        if not llm_similarity:
+            analysis.ml_similarity = calculate_semantic_similarity(image_class, name, desc)
+            analysis.vision_similarity = calculate_semantic_similarity(analysis.vision_name, name, desc)
 
-        return {
-            "name": "Unknown Food",
-            "description": "Error parsing identification results",
-            "confidence": 0.0
-        }
+        # Keep scores within valid range
+        for field in ("vision_confidence", "vision_similarity", "ml_similarity"):
+            setattr(analysis, field, max(0.0, min(getattr(analysis, field), 1.0)))
+
+        return analysis
 
     except Exception as e:
-        print(f"Error identifying image: {e}")
+        print(f"Error analysing prediction: {e}")
+
+        # Same fallbacks as the individual calls: unknown vision result, neutral similarity
+        return PredictionAnalysis(
+            vision_name="Unknown Food",
+            vision_description=f"Error during identification: {str(e)}",
+            vision_confidence=0.0,
+            ml_similarity=calculate_semantic_similarity(image_class, name, desc) if not llm_similarity else 0.5,
+            ml_name=name,
+            ml_description=f"Identified as {image_class}. {desc if desc else 'No additional information available.'}"
+        )
+
 
-        return {
-            "name": "Unknown Food",
-            "description": f"Error during identification: {str(e)}",
-            "confidence": 0.0
-        }
 class Ingredient(BaseModel):
     name: str
     amnt: float
@@ -321,17 +287,7 @@ def get_ingredients(name: str, description: str, amount: int, unit:str='g') -> I
 
     try:
         # Generate response
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-
-        # Clean response (remove markdown code blocks if present)
-        if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            response_text = "\n".join(lines[1:-1]) if len(lines) > 2 else response_text
-            response_text = response_text.replace("```json", "").replace("```", "").strip()
-
-        # Parse JSON response
-        ingredients_data = json.loads(response_text)
+        ingredients_data = generate_json(prompt)
 
         # Convert to list of Ingredient objects
         ingredient_list = []
@@ -363,7 +319,6 @@ def get_ingredients(name: str, description: str, amount: int, unit:str='g') -> I
 
     except json.JSONDecodeError as e:
         print(f"JSON parsing error in get_ingredients: {e}")
-        print(f"Response received: {response_text}")
 
         # Fallback: return empty list
         return IngredientList(
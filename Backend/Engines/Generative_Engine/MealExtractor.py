@@ -1,22 +1,33 @@
 import os
 import json
-from typing import Optional, List
+import difflib
+import threading
+from typing import Dict, Optional, List
 
-import google.generativeai as genai
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, field_validator
 
+from Engines.Cache import TwoTierCache, normalize_key
+from Engines.Generative_Engine.Gateway import generate_json
+
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
+# Ingredient decomposition per normalized (name, description), size-bounded on disk
+recipe_cache = TwoTierCache(
+    "recipe_ingredients",
+    ttl=float(os.getenv("RECIPE_CACHE_TTL", 90 * 24 * 3600)),
+    max_memory_items=int(os.getenv("RECIPE_CACHE_MEMORY_ITEMS", 1024)),
+    max_disk_items=int(os.getenv("RECIPE_CACHE_MAX_ITEMS", 20000))
+)
 
-genai.configure(api_key=api_key)
+# Similarity cutoff (0-1) for reusing a cached dish with a near-identical name; 0 disables
+RECIPE_CACHE_FUZZY = float(os.getenv("RECIPE_CACHE_FUZZY", 0))
 
-model = genai.GenerativeModel('gemini-2.5-flash')
+# Cached dish names per normalized description, loaded from the cache once and kept
+# up to date in memory, so a fuzzy lookup never scans the SQLite file
+_dishes: Optional[Dict[str, List[str]]] = None
+_dishes_lock = threading.Lock()
 
 
 class Ingredient(BaseModel):
@@ -46,6 +57,58 @@ class RecipeIngredients(BaseModel):
 
 
 def get_ingredients(name: str, description: Optional[str] = None) -> RecipeIngredients:
+    """Ingredients per 100g/ml of a dish, memoized so repeat dishes skip the LLM call"""
+    key = normalize_key(name, description)
+    cached = recipe_cache.get(key)
+    if cached is None and RECIPE_CACHE_FUZZY > 0:
+        match = _fuzzy_key(key)
+        if match:
+            cached = recipe_cache.get(match)
+
+    if cached is not None:
+        return RecipeIngredients(
+            recipe_name=name,
+            description=description,
+            ingredients=[Ingredient(**ing) for ing in cached]
+        )
+
+    recipe = _extract_ingredients(name, description)
+    recipe_cache.set(key, [ing.model_dump() for ing in recipe.ingredients])
+    if RECIPE_CACHE_FUZZY > 0:
+        _remember_dish(key)
+
+    return recipe
+
+
+def _dish_index() -> Dict[str, List[str]]:
+    global _dishes
+    with _dishes_lock:
+        if _dishes is None:
+            _dishes = {}
+            for cached_key in recipe_cache.keys():
+                dish, _, detail = cached_key.partition("|")
+                _dishes.setdefault(detail, []).append(dish)
+        return _dishes
+
+
+def _remember_dish(key: str) -> None:
+    dish, _, detail = key.partition("|")
+    dishes = _dish_index()
+    with _dishes_lock:
+        if dish not in dishes.setdefault(detail, []):
+            dishes[detail].append(dish)
+
+
+def _fuzzy_key(key: str) -> Optional[str]:
+    """Closest cached key with the same description and a similar dish name"""
+    dish, _, detail = key.partition("|")
+    candidates = _dish_index().get(detail, [])
+
+    match = difflib.get_close_matches(dish, candidates, n=1, cutoff=RECIPE_CACHE_FUZZY)
+    return f"{match[0]}|{detail}" if match else None
+
+
+def _extract_ingredients(name: str, description: Optional[str] = None) -> RecipeIngredients:
     # Combine name and description if provided
     recipe_input = f"{name}"
     if description:
@@ -67,21 +130,8 @@ def get_ingredients(name: str, description: Optional[str] = None) -> RecipeIngre
     """
 
     try:
-        response = model.generate_content(prompt)
-
-        response_text = response.text.strip()
-
-        # Remove markdown code blocks if present
-        if response_text.startswith("```"):
-            # Remove opening ```json or ```
-            response_text = response_text.split("\n", 1)[1]
-            # Remove closing ```
-            response_text = response_text.rsplit("```", 1)[0]
-
-        response_text = response_text.strip()
-
-        # Parse JSON response
-        raw_ingredients = json.loads(response_text)
+        # recipe_cache already holds the result under a normalized key; skip the gateway's exact-prompt cache
+        raw_ingredients = generate_json(prompt, cache=False)
 
         # Validate and parse using Pydantic
         ingredients = [Ingredient(**ing) for ing in raw_ingredients]
@@ -95,7 +145,6 @@ def get_ingredients(name: str, description: Optional[str] = None) -> RecipeIngre
 
     except json.JSONDecodeError as e:
         print(f"Failed to parse JSON response: {e}")
-        print(f"Raw response: {response_text}")
         raise
     except Exception as e:
         print(f"Error getting ingredients: {e}")
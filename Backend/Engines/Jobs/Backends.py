@@ -0,0 +1,259 @@
+"""
+Storage backends for the background job queue.
+
+A backend stores Job records and hands out the next runnable job atomically
+(reserve), so several worker threads - or, with SQLite, several processes on
+the same host - never run the same job twice.
+
+    InMemoryBackend - in-process dict, lost on restart
+    SQLiteBackend   - local SQLite file (WAL mode), survives restarts
+
+A SQLite job stays claimed for a lease of `lease_seconds`, which the worker
+running it renews until the handler returns. If its process dies or restarts
+mid-job, the lease stops being renewed; once it runs out the job is picked up
+again as a new attempt, or marked failed if it has no attempts left. A worker
+only records the outcome of the attempt it still holds.
+
+With `max_running` set, SQLite also caps how many jobs run at once across
+every process sharing the file.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    retrying = "retrying"
+    completed = "completed"
+    failed = "failed"
+
+
+# Statuses a worker may pick up
+RUNNABLE = (JobStatus.queued, JobStatus.retrying)
+FINISHED = (JobStatus.completed, JobStatus.failed)
+
+
+class Job(BaseModel):
+    id: str
+    name: str
+    kwargs: Dict[str, Any] = Field(default_factory=dict)
+    status: JobStatus = JobStatus.queued
+    attempts: int = 0
+    max_attempts: int = 3
+    error: Optional[str] = None
+    created_at: float = Field(default_factory=time.time)
+    updated_at: float = Field(default_factory=time.time)
+    run_at: float = Field(default_factory=time.time, description="Earliest time the job may run")
+
+
+class JobBackend(ABC):
+    # Seconds a claimed job stays claimed without renew(); None if claims never expire
+    lease_seconds: Optional[float] = None
+
+    @abstractmethod
+    def put(self, job: Job) -> None:
+        """Insert or replace a job"""
+
+    @abstractmethod
+    def reserve(self) -> Optional[Job]:
+        """Atomically claim the next runnable job, marking it running and counting the attempt"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+
+    def update(self, job: Job) -> None:
+        self.put(job)
+
+    def renew(self, job: Job) -> bool:
+        """Extend a running job's lease; False if this attempt no longer holds it"""
+        return True
+
+
+class InMemoryBackend(JobBackend):
+
+    def __init__(self, max_finished: int = 1000):
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self.max_finished = max_finished  # finished jobs kept for status lookups
+
+    def put(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.id] = job.model_copy()
+            if job.status in FINISHED:
+                self._prune()
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.status in FINISHED]
+        if len(finished) > self.max_finished:
+            finished.sort(key=lambda j: j.updated_at)
+            for job in finished[:len(finished) - self.max_finished]:
+                del self._jobs[job.id]
+
+    def reserve(self) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            ready = [j for j in self._jobs.values() if j.status in RUNNABLE and j.run_at <= now]
+            if not ready:
+                return None
+
+            job = min(ready, key=lambda j: j.run_at)
+            job.status = JobStatus.running
+            job.attempts += 1
+            job.updated_at = now
+            return job.model_copy()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_copy() if job else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {status.value: 0 for status in JobStatus}
+            for job in self._jobs.values():
+                counts[job.status.value] += 1
+            return counts
+
+
+class SQLiteBackend(JobBackend):
+
+    def __init__(self, path: str = "jobs.db", lease_seconds: float = 60, max_running: int = 0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_running = max_running  # 0: no cap beyond each process's worker threads
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                kwargs TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                max_attempts INTEGER NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                run_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs (status, run_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, autocommit mode with explicit transactions
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Job:
+        data = dict(row)
+        data["kwargs"] = json.loads(data["kwargs"])
+        return Job(**data)
+
+    def put(self, job: Job) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job.id, job.name, json.dumps(job.kwargs), job.status.value, job.attempts, job.max_attempts,
+             job.error, job.created_at, job.updated_at, job.run_at)
+        )
+
+    def reserve(self) -> Optional[Job]:
+        conn = self._connect()
+        now = time.time()
+
+        expired = now - self.lease_seconds
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Running jobs past their lease belong to a worker that died
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? "
+                "WHERE status = ? AND updated_at <= ? AND attempts >= max_attempts",
+                (JobStatus.failed.value, "Worker stopped while running the job", now,
+                 JobStatus.running.value, expired)
+            )
+            row = None
+            if not self.max_running or self._running(conn, expired) < self.max_running:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE (status IN (?, ?) AND run_at <= ?) OR (status = ? AND updated_at <= ?) "
+                    "ORDER BY run_at LIMIT 1",
+                    (JobStatus.queued.value, JobStatus.retrying.value, now, JobStatus.running.value, expired)
+                ).fetchone()
+
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (JobStatus.running.value, now, row["id"])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+
+        job = self._row_to_job(row)
+        job.status = JobStatus.running
+        job.attempts += 1
+        job.updated_at = now
+        return job
+
+    @staticmethod
+    def _running(conn: sqlite3.Connection, expired: float) -> int:
+        """Jobs currently held under a live lease, by any process"""
+        return conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND updated_at > ?",
+            (JobStatus.running.value, expired)
+        ).fetchone()[0]
+
+    def update(self, job: Job) -> None:
+        # Skipped if the lease expired and another worker has since claimed the job
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, attempts = ?, error = ?, updated_at = ?, run_at = ? "
+            "WHERE id = ? AND status = ? AND attempts = ?",
+            (job.status.value, job.attempts, job.error, job.updated_at, job.run_at,
+             job.id, JobStatus.running.value, job.attempts)
+        )
+
+    def renew(self, job: Job) -> bool:
+        cursor = self._connect().execute(
+            "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ? AND attempts = ?",
+            (time.time(), job.id, JobStatus.running.value, job.attempts)
+        )
+        return cursor.rowcount > 0
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        counts = {status.value: 0 for status in JobStatus}
+        for row in self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        return counts
@@ -0,0 +1,186 @@
+"""
+Background job queue with a bounded worker pool.
+
+Handlers are registered by name and jobs are enqueued with JSON-serialisable
+kwargs. A fixed pool of dedicated worker threads pulls jobs from the backend,
+so bursts of work queue up instead of competing with request-serving threads.
+Failed jobs are retried with exponential backoff and every job keeps a status
+record that can be polled.
+
+Environment:
+    JOB_QUEUE_BACKEND   memory | sqlite (default: sqlite when WEB_CONCURRENCY > 1, so
+                        every worker process sees every job; memory otherwise)
+    JOB_QUEUE_DB        SQLite file for the sqlite backend (default jobs.db)
+    JOB_LEASE_SECONDS   sqlite: how long a running job's lease lasts; it is renewed every
+                        third of that while the handler runs, so a job that stops being
+                        renewed is assumed lost with its process and run again (default 60)
+    JOB_QUEUE_WORKERS   worker threads per queue in each process; with WEB_CONCURRENCY
+                        processes up to WEB_CONCURRENCY x this many jobs run at once (default 2)
+    JOB_QUEUE_MAX_RUNNING  sqlite: cap on jobs running at once across all processes
+                        sharing JOB_QUEUE_DB (default 0, no cap)
+    JOB_MAX_ATTEMPTS    attempts before a job is marked failed (default 3)
+    JOB_RETRY_DELAY     base backoff delay in seconds, doubled per attempt (default 2)
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from Engines.Jobs.Backends import InMemoryBackend, Job, JobBackend, JobStatus, SQLiteBackend
+
+logger = logging.getLogger(__name__)
+
+
+def backend_from_env() -> JobBackend:
+    # In-memory jobs are only visible to the process that queued them
+    default = "sqlite" if int(os.getenv("WEB_CONCURRENCY", 1)) > 1 else "memory"
+    backend = os.getenv("JOB_QUEUE_BACKEND", default).lower()
+    if backend == "sqlite":
+        return SQLiteBackend(
+            os.getenv("JOB_QUEUE_DB", "jobs.db"),
+            float(os.getenv("JOB_LEASE_SECONDS", 60)),
+            int(os.getenv("JOB_QUEUE_MAX_RUNNING", 0))
+        )
+    if backend == "memory":
+        return InMemoryBackend()
+    raise ValueError(f"Unknown JOB_QUEUE_BACKEND '{backend}'")
+
+
+class JobQueue:
+
+    def __init__(
+            self,
+            backend: Optional[JobBackend] = None,
+            workers: Optional[int] = None,
+            max_attempts: Optional[int] = None,
+            retry_delay: Optional[float] = None,
+            poll_interval: float = 0.5
+    ):
+        self.backend = backend or backend_from_env()
+        self.workers = workers or int(os.getenv("JOB_QUEUE_WORKERS", 2))
+        self.max_attempts = max_attempts or int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+        self.retry_delay = retry_delay if retry_delay is not None else float(os.getenv("JOB_RETRY_DELAY", 2))
+        self.poll_interval = poll_interval
+
+        self._handlers: Dict[str, Callable] = {}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+
+    def register(self, name: str, handler: Callable) -> None:
+        """Register the function that runs jobs enqueued under `name`"""
+        self._handlers[name] = handler
+
+    def enqueue(self, name: str, job_id: Optional[str] = None, **kwargs) -> str:
+        """Queue a job and return its ID; workers are started on first use"""
+        if name not in self._handlers:
+            raise ValueError(f"No handler registered for job '{name}'")
+
+        job = Job(
+            id=job_id or uuid.uuid4().hex,
+            name=name,
+            kwargs=kwargs,
+            max_attempts=self.max_attempts
+        )
+        self.backend.put(job)
+
+        self.start()
+        self._wakeup.set()
+        return job.id
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self.backend.get(job_id)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "workers": self.workers,
+            "alive_workers": sum(t.is_alive() for t in self._threads),
+            "jobs": self.backend.counts()
+        }
+
+    def start(self) -> None:
+        with self._lock:
+            if any(t.is_alive() for t in self._threads):
+                return
+
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _worker(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.backend.reserve()
+            except Exception as e:
+                logger.error(f"Job backend error: {e}")
+                job = None
+
+            if job is None:
+                # Sleep until something is enqueued (or poll for retries / other processes)
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._run(job)
+
+    def _keep_leased(self, job: Job, done: threading.Event) -> None:
+        """Renew the job's lease until `done` is set, so a long job is not taken to be lost"""
+        interval = self.backend.lease_seconds / 3
+        while not done.wait(interval):
+            try:
+                if not self.backend.renew(job):
+                    logger.warning(f"Job {job.id} ({job.name}) lost its lease; another worker may run it again")
+                    return
+            except Exception as e:
+                logger.error(f"Could not renew lease of job {job.id}: {e}")
+
+    def _run(self, job: Job) -> None:
+        handler = self._handlers.get(job.name)
+        started = time.time()
+
+        done = threading.Event()
+        if self.backend.lease_seconds:
+            threading.Thread(
+                target=self._keep_leased, args=(job, done), name=f"job-lease-{job.id[:8]}", daemon=True
+            ).start()
+
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job '{job.name}'")
+
+            handler(**job.kwargs)
+
+            job.status = JobStatus.completed
+            job.error = None
+            logger.info(f"Job {job.id} ({job.name}) completed in {time.time() - started:.2f}s")
+
+        except Exception as e:
+            job.error = str(e)
+
+            if job.attempts < job.max_attempts:
+                delay = self.retry_delay * (2 ** (job.attempts - 1))
+                job.status = JobStatus.retrying
+                job.run_at = time.time() + delay
+                logger.warning(f"Job {job.id} ({job.name}) failed attempt {job.attempts}, retrying in {delay:.1f}s: {e}")
+            else:
+                job.status = JobStatus.failed
+                logger.error(f"Job {job.id} ({job.name}) failed after {job.attempts} attempts: {e}")
+        finally:
+            done.set()
+
+        job.updated_at = time.time()
+        self.backend.update(job)
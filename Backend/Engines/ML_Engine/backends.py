@@ -0,0 +1,177 @@
+"""
+Inference backends for the food image classifiers.
+
+    torch       full-precision PyTorch (default)
+    torch-int8  PyTorch with Linear layers dynamically quantized to int8
+    onnx        ONNX Runtime on the exported graph
+    onnx-int8   ONNX Runtime on the dynamically quantized export
+
+The ONNX backends read the directory written by export_onnx
+(ML_ONNX_ROOT/<model name>) and never load the PyTorch weights.
+
+All backends run one forward pass at a time on the batcher's inference
+thread, so their intra-op thread pool is sized to the physical cores (shared
+between gunicorn workers) rather than to hyperthreads or the default that
+oversubscribes the CPU when several workers run.
+
+Environment:
+    ML_BACKEND       backend used by predict_food (default torch)
+    ML_ONNX_ROOT     directory holding ONNX exports (default onnx_models)
+    ML_NUM_THREADS   intra-op threads per process
+                     (default: physical cores / WEB_CONCURRENCY, at least 1)
+"""
+
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ML_BACKEND = os.getenv("ML_BACKEND", "torch")
+ONNX_ROOT = os.getenv("ML_ONNX_ROOT", "onnx_models")
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+
+def physical_cores() -> int:
+    """Physical cores available to this process (hyperthreads do not speed up matmuls)"""
+    try:
+        available = os.sched_getaffinity(0)
+    except AttributeError:
+        return os.cpu_count() or 1
+
+    # /proc/cpuinfo lists each logical cpu with its package ("physical id") and core id
+    cores, cpu, package = set(), None, None
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                key, _, value = (part.strip() for part in line.partition(":"))
+                if key == "processor":
+                    cpu = int(value)
+                elif key == "physical id":
+                    package = value
+                elif key == "core id" and cpu in available:
+                    cores.add((package, value))
+    except (OSError, ValueError):
+        pass
+
+    return len(cores) or len(available)
+
+
+def num_threads() -> int:
+    configured = os.getenv("ML_NUM_THREADS")
+    if configured:
+        return max(1, int(configured))
+    return max(1, physical_cores() // max(1, int(os.getenv("WEB_CONCURRENCY", 1))))
+
+
+def onnx_dir(model_path: str) -> str:
+    """Export directory for a hub id or local checkpoint path"""
+    name = model_path.rstrip("/").replace("/", "--")
+    return os.path.join(ONNX_ROOT, name)
+
+
+def _top_k(probabilities: np.ndarray, id2label: Dict[int, str], k: int) -> List[List[dict]]:
+    k = min(k, probabilities.shape[-1])
+    class_ids = np.argsort(-probabilities, axis=-1)[:, :k]
+
+    return [
+        [{"label": id2label[int(class_id)], "confidence": float(row[class_id])} for class_id in ids]
+        for row, ids in zip(probabilities, class_ids)
+    ]
+
+
+class Classifier(ABC):
+    """Image classifier returning the top-k labels for a batch of PIL images"""
+
+    def __init__(self, processor, id2label: Dict[int, str]):
+        self.processor = processor
+        self.id2label = id2label
+
+    @abstractmethod
+    def predict_batch(self, images: List, k: int) -> List[List[dict]]:
+        """Top-k labels and confidences for each image, in order"""
+
+
+class TorchClassifier(Classifier):
+
+    def __init__(self, model_path: str, quantize: bool = False):
+        import torch
+        from transformers import AutoModelForImageClassification, AutoImageProcessor
+
+        torch.set_num_threads(num_threads())
+
+        model = AutoModelForImageClassification.from_pretrained(model_path)
+        model.eval()
+
+        if quantize:
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        super().__init__(AutoImageProcessor.from_pretrained(model_path), model.config.id2label)
+        self.model = model
+
+    def predict_batch(self, images: List, k: int) -> List[List[dict]]:
+        import torch
+        import torch.nn.functional as F
+
+        # Process images
+        inputs = self.processor(images=images, return_tensors="pt")
+
+        # Make prediction
+        with torch.no_grad():
+            logits = self.model(**inputs).logits
+
+            # Get probabilities using softmax
+            probabilities = F.softmax(logits, dim=-1)
+
+        return _top_k(probabilities.numpy(), self.id2label, k)
+
+
+class OnnxClassifier(Classifier):
+
+    def __init__(self, model_path: str, quantized: bool = False):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("The onnx backends need onnxruntime (pip install onnxruntime)")
+        from transformers import AutoConfig, AutoImageProcessor
+
+        export_dir = onnx_dir(model_path)
+        model_file = os.path.join(export_dir, "model.int8.onnx" if quantized else "model.onnx")
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(
+                f"{model_file} not found - run python -m Engines.ML_Engine.export_onnx {model_path}"
+            )
+
+        config = AutoConfig.from_pretrained(export_dir)
+        super().__init__(AutoImageProcessor.from_pretrained(export_dir), config.id2label)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads()
+        options.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict_batch(self, images: List, k: int) -> List[List[dict]]:
+        inputs = self.processor(images=images, return_tensors="np")
+        logits = self.session.run(None, {self.input_name: inputs["pixel_values"].astype(np.float32)})[0]
+
+        # Softmax
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return _top_k(exp / exp.sum(axis=-1, keepdims=True), self.id2label, k)
+
+
+def load_classifier(model_path: str, backend: Optional[str] = None) -> Classifier:
+    backend = backend or ML_BACKEND
+
+    if backend == "torch":
+        return TorchClassifier(model_path)
+    if backend == "torch-int8":
+        return TorchClassifier(model_path, quantize=True)
+    if backend == "onnx":
+        return OnnxClassifier(model_path)
+    if backend == "onnx-int8":
+        return OnnxClassifier(model_path, quantized=True)
+
+    raise ValueError(f"Unknown ML_BACKEND '{backend}', expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,146 @@
+"""
+Micro-batching for model inference.
+
+Callers submit single inputs and get a Future back. A dedicated worker thread
+collects submissions for up to `max_wait` seconds (or until `max_batch_size`
+are waiting) and runs them through `predict_batch` in one forward pass, so
+concurrent requests share a pass instead of each paying for their own.
+
+That thread is the dedicated inference executor: model work never runs on
+the event loop. The queue in front of it is bounded; when it is full,
+submit() raises Overloaded immediately instead of letting latency grow
+without limit, and the API answers 503.
+
+Environment:
+    ML_MAX_BATCH_SIZE   images per forward pass (default 16)
+    ML_MAX_WAIT_MS      how long to wait for a batch to fill (default 5)
+    ML_TOP_K            labels returned per prediction (default 5)
+    ML_MAX_QUEUE        inputs waiting for a forward pass before new ones are rejected (default 64)
+    ML_PREDICT_TIMEOUT  seconds a blocking caller waits for its prediction (default 30)
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = int(os.getenv("ML_MAX_BATCH_SIZE", 16))
+MAX_WAIT_MS = float(os.getenv("ML_MAX_WAIT_MS", 5))
+TOP_K = int(os.getenv("ML_TOP_K", 5))
+MAX_QUEUE = int(os.getenv("ML_MAX_QUEUE", 64))
+PREDICT_TIMEOUT = float(os.getenv("ML_PREDICT_TIMEOUT", 30))
+
+
+class Overloaded(Exception):
+    """The inference queue is full; the caller should retry later"""
+
+
+def _settle(future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    """Resolve a Future, ignoring one its caller already gave up on so the worker never dies"""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class MicroBatcher:
+
+    def __init__(
+            self,
+            predict_batch: Callable[[List[Any]], List[Any]],
+            max_batch_size: int = MAX_BATCH_SIZE,
+            max_wait: float = MAX_WAIT_MS / 1000,
+            max_queue: int = MAX_QUEUE,
+            name: str = "inference"
+    ):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "batches": 0, "largest_batch": 0, "rejected": 0}
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queue one input; the Future resolves to its entry of predict_batch's output.
+        Raises Overloaded when the queue is full.
+        """
+        self._start()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise Overloaded(f"{self.name} queue is full ({self._queue.maxsize} waiting)")
+        return future
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["avg_batch_size"] = round(counters["requests"] / counters["batches"], 2) if counters["batches"] else 0.0
+        counters["queued"] = self._queue.qsize()
+        return counters
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self) -> List[tuple]:
+        """Next batch of inputs, skipping any whose caller cancelled while it was queued"""
+        batch = []
+        entry = self._queue.get()
+        deadline = time.monotonic() + self.max_wait
+
+        while True:
+            # Marks the Future running so it can no longer be cancelled
+            if entry[1].set_running_or_notify_cancel():
+                batch.append(entry)
+            if len(batch) >= self.max_batch_size:
+                break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _worker(self) -> None:
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+
+            try:
+                outputs = self.predict_batch(items)
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(items)} failed: {e}")
+                for _, future in batch:
+                    _settle(future, error=e)
+                continue
+
+            for (_, future), output in zip(batch, outputs):
+                _settle(future, output)
+
+            with self._lock:
+                self._counters["requests"] += len(batch)
+                self._counters["batches"] += 1
+                self._counters["largest_batch"] = max(self._counters["largest_batch"], len(batch))
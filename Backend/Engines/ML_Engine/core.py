@@ -1,34 +1,45 @@
-from transformers import AutoModelForImageClassification, AutoImageProcessor
+import asyncio
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
 from PIL import Image
 from io import BytesIO
-import torch
-import torch.nn.functional as F
 
-processor = AutoImageProcessor.from_pretrained("rajistics/finetuned-indian-food")
-model = AutoModelForImageClassification.from_pretrained("rajistics/finetuned-indian-food")
-model.eval()
+from Engines.ML_Engine.backends import load_classifier
+from Engines.ML_Engine.batching import MicroBatcher, PREDICT_TIMEOUT, TOP_K
+from Engines.Registry import registry
+
+MODEL_PATH = "rajistics/finetuned-indian-food"
+
+# Backend selected by ML_BACKEND (torch, torch-int8, onnx, onnx-int8), loaded on first use
+registry.register("food_classifier", lambda: load_classifier(MODEL_PATH), fork_safe=True)
+
+
+def _decode(image_bytes: bytes) -> Image.Image:
+    return Image.open(BytesIO(image_bytes)).convert("RGB")
+
+
+def _predict_batch(images: List[Image.Image]) -> List[List[dict]]:
+    return registry.get("food_classifier").predict_batch(images, TOP_K)
 
 
-def predict_food(image_bytes: bytes) -> dict:
-    image = Image.open(BytesIO(image_bytes)).convert("RGB")
+# Concurrent predictions are batched into one forward pass; callers decode their own image first
+batcher = MicroBatcher(_predict_batch, name="food-classifier")
 
-    # Process image
-    inputs = processor(images=image, return_tensors="pt")
 
-    # Make prediction
-    with torch.no_grad():
-        outputs = model(**inputs)
-        logits = outputs.logits
+def _to_result(top: List[dict], top_k: Optional[int]) -> dict:
+    return {
+        "result": top[0]["label"],
+        "confidence": top[0]["confidence"],
+        "top_k": top[:top_k or TOP_K]
+    }
 
-        # Get probabilities using softmax
-        probabilities = F.softmax(logits, dim=-1)
 
-        # Get predicted class and confidence
-        confidence, predicted_class_id = torch.max(probabilities, dim=-1)
-        predicted_class = model.config.id2label[predicted_class_id.item()]
+def predict_food(image_bytes: bytes, top_k: Optional[int] = None) -> dict:
+    return _to_result(batcher.submit(_decode(image_bytes)).result(timeout=PREDICT_TIMEOUT), top_k)
 
-        return {
-            "result": predicted_class,
-            "confidence": confidence.item()
-        }
 
+async def predict_food_async(image_bytes: bytes, top_k: Optional[int] = None) -> dict:
+    """predict_food without blocking the event loop: decoding runs in the threadpool, in parallel per request"""
+    image = await run_in_threadpool(_decode, image_bytes)
+    return _to_result(await asyncio.wrap_future(batcher.submit(image)), top_k)
@@ -0,0 +1,14 @@
+from Engines.RAG.EmbeddingCache import EMBED_NORMALIZE
+from Engines.Registry import registry
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def _load_embeddings():
+    from langchain_huggingface import HuggingFaceEmbeddings
+    # Queries must be normalised the same way as the chunk vectors MemCreator stored
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL, encode_kwargs={"normalize_embeddings": EMBED_NORMALIZE})
+
+
+# Shared by the RAG chatbot and the food similarity engine, loaded on first use
+registry.register("minilm_embeddings", _load_embeddings, fork_safe=True)
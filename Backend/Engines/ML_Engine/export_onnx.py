@@ -0,0 +1,79 @@
+"""
+Export an image classifier to ONNX, plus an int8 dynamically-quantized copy.
+
+Writes to ML_ONNX_ROOT/<model name>/:
+    model.onnx        float32 graph with a dynamic batch axis
+    model.int8.onnx   weights quantized to int8 (onnxruntime quantize_dynamic)
+    config.json / preprocessor_config.json, so the ONNX backends need no
+    PyTorch weights at runtime
+
+Run from Backend/:
+    python -m Engines.ML_Engine.export_onnx [model_path ...]
+
+Defaults to the hub classifier used by core.py.
+"""
+
+import os
+import sys
+
+import torch
+from transformers import AutoImageProcessor, AutoModelForImageClassification
+
+from Engines.ML_Engine.backends import onnx_dir
+
+DEFAULT_MODELS = ["rajistics/finetuned-indian-food"]
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Wrap the HF model so the exported graph maps pixel_values -> logits"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model(pixel_values=pixel_values).logits
+
+
+def export(model_path: str) -> str:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    out_dir = onnx_dir(model_path)
+    os.makedirs(out_dir, exist_ok=True)
+
+    processor = AutoImageProcessor.from_pretrained(model_path)
+    model = AutoModelForImageClassification.from_pretrained(model_path)
+    model.eval()
+
+    size = processor.size.get("height") or processor.size.get("shortest_edge", 224)
+    dummy = torch.randn(1, 3, size, size)
+
+    model_file = os.path.join(out_dir, "model.onnx")
+    torch.onnx.export(
+        _LogitsOnly(model),
+        (dummy,),
+        model_file,
+        input_names=["pixel_values"],
+        output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17,
+        dynamo=False
+    )
+    print(f"✅ Exported: {model_file}")
+
+    quantized_file = os.path.join(out_dir, "model.int8.onnx")
+    quantize_dynamic(model_file, quantized_file, weight_type=QuantType.QInt8)
+    print(f"✅ Quantized: {quantized_file}")
+
+    processor.save_pretrained(out_dir)
+    model.config.save_pretrained(out_dir)
+
+    for name in ("model.onnx", "model.int8.onnx"):
+        print(f"   {name}: {os.path.getsize(os.path.join(out_dir, name)) / 1e6:.1f} MB")
+
+    return out_dir
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:] or DEFAULT_MODELS:
+        export(path)
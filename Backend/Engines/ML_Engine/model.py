@@ -1,36 +1,35 @@
-from transformers import AutoModelForImageClassification, AutoImageProcessor
+from typing import List
+
 from PIL import Image
 from io import BytesIO
-import torch
-import torch.nn.functional as F
+
+from Engines.ML_Engine.backends import load_classifier
+from Engines.ML_Engine.batching import MicroBatcher, PREDICT_TIMEOUT, TOP_K
+from Engines.Registry import registry
 
 MODEL_PATH = "Nutrillio-model/checkpoint-25566/"
-model = AutoModelForImageClassification.from_pretrained(MODEL_PATH)
-processor = AutoImageProcessor.from_pretrained(MODEL_PATH)
-model.eval()
 
+# Backend selected by ML_BACKEND (torch, torch-int8, onnx, onnx-int8), loaded on first use
+registry.register("nutrillio_classifier", lambda: load_classifier(MODEL_PATH), fork_safe=True)
 
-def predict_food(image_bytes: bytes) -> dict:
-    image = Image.open(BytesIO(image_bytes)).convert("RGB")
 
-    # Process image
-    inputs = processor(images=image, return_tensors="pt")
+def _decode(image_bytes: bytes) -> Image.Image:
+    return Image.open(BytesIO(image_bytes)).convert("RGB")
 
-    # Make prediction
-    with torch.no_grad():
-        outputs = model(**inputs)
-        logits = outputs.logits
 
-        # Get probabilities using softmax
-        probabilities = F.softmax(logits, dim=-1)
+def _predict_batch(images: List[Image.Image]) -> List[List[dict]]:
+    return registry.get("nutrillio_classifier").predict_batch(images, TOP_K)
 
-        # Get predicted class and confidence
-        confidence, predicted_class_id = torch.max(probabilities, dim=-1)
-        predicted_class = model.config.id2label[predicted_class_id.item()]
 
-        return {
-            "result": predicted_class,
-            "confidence": confidence.item()
-        }
+# Concurrent predictions are batched into one forward pass; callers decode their own image first
+batcher = MicroBatcher(_predict_batch, name="nutrillio-classifier")
 
 
+def predict_food(image_bytes: bytes) -> dict:
+    top = batcher.submit(_decode(image_bytes)).result(timeout=PREDICT_TIMEOUT)
+
+    return {
+        "result": top[0]["label"],
+        "confidence": top[0]["confidence"],
+        "top_k": top
+    }
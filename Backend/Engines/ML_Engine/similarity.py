@@ -0,0 +1,109 @@
+"""
+Local semantic similarity between food names, replacing the LLM similarity call.
+
+Texts are embedded with the MiniLM model the RAG chatbot already uses. The
+classifier's labels (model.config.id2label) are embedded once per process into
+a table, and user-supplied names go through an LRU cache, so a repeat
+comparison is a dot product with no model call and no network hop.
+
+Raw cosine similarity is mapped onto the scale adjust_confidence expects:
+
+    cosine >= SIMILARITY_SAME_COSINE      -> 0.7 - 1.0   same food      (high)
+    cosine >= SIMILARITY_RELATED_COSINE   -> 0.4 - 0.7   related food   (medium)
+    lower                                 -> 0.0 - 0.4   different food (low)
+
+The default cut-offs are starting points for all-MiniLM-L6-v2 on short dish
+names, not measured values. Check them against labelled same / related /
+different pairs (built in, or a CSV from logged meals) with
+python -m Benchmarks.SimilarityBench, and set the two variables below to the
+split it reports.
+
+Environment:
+    SIMILARITY_SAME_COSINE     cosine at which two names count as the same food (default 0.75)
+    SIMILARITY_RELATED_COSINE  cosine at which two foods count as related (default 0.45)
+    SIMILARITY_CACHE_SIZE      user-supplied texts kept embedded (default 4096)
+"""
+
+import os
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+
+import Engines.ML_Engine.embeddings  # registers minilm_embeddings
+from Engines.ML_Engine.core import MODEL_PATH
+from Engines.Registry import registry
+
+SAME_COSINE = float(os.getenv("SIMILARITY_SAME_COSINE", 0.75))
+RELATED_COSINE = float(os.getenv("SIMILARITY_RELATED_COSINE", 0.45))
+CACHE_SIZE = int(os.getenv("SIMILARITY_CACHE_SIZE", 4096))
+
+
+def normalize_text(text: str) -> str:
+    """Classifier labels look like 'butter_chicken'; embed them as plain words"""
+    return " ".join(text.replace("_", " ").replace("-", " ").lower().split())
+
+
+def _encode(texts: List[str]) -> np.ndarray:
+    vectors = np.asarray(registry.get("minilm_embeddings").embed_documents(texts), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors
+
+
+class LabelTable:
+    """Unit-length embeddings of every classifier label, one row per label"""
+
+    def __init__(self, labels: List[str]):
+        self.labels = sorted({normalize_text(label) for label in labels})
+        self.rows: Dict[str, int] = {label: row for row, label in enumerate(self.labels)}
+        self.matrix = _encode(self.labels)
+        self.matrix.flags.writeable = False
+
+    def get(self, text: str):
+        row = self.rows.get(text)
+        return None if row is None else self.matrix[row]
+
+
+def _load_label_table() -> LabelTable:
+    # Only the config is needed for the labels, not the classifier weights
+    from transformers import AutoConfig
+    return LabelTable(list(AutoConfig.from_pretrained(MODEL_PATH).id2label.values()))
+
+
+# Building the table runs MiniLM inference, so it is not preloaded before fork;
+# each worker builds it on first use (or at startup via WARMUP_MODELS)
+registry.register("food_label_embeddings", _load_label_table, fork_safe=False)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _embed_cached(text: str) -> np.ndarray:
+    vector = _encode([text])[0]
+    vector.flags.writeable = False
+    return vector
+
+
+def embed(text: str) -> np.ndarray:
+    """Unit-length embedding, from the label table when `text` is a classifier label"""
+    text = normalize_text(text)
+    vector = registry.get("food_label_embeddings").get(text)
+    return vector if vector is not None else _embed_cached(text)
+
+
+def calibrate(cosine: float) -> float:
+    """Map a MiniLM cosine onto the 0-1 similarity scale used by adjust_confidence"""
+    return float(np.interp(cosine, [0.0, RELATED_COSINE, SAME_COSINE, 1.0], [0.0, 0.4, 0.7, 1.0]))
+
+
+def semantic_similarity(image_class: str, name: str, desc: str = "") -> float:
+    """
+    Similarity between a predicted food and the user's name/description, 0 to 1.
+    The description only ever raises the score, so a long description cannot
+    drown out a name that matches.
+    """
+    target = embed(image_class)
+    cosine = float(target @ embed(name))
+
+    if desc:
+        cosine = max(cosine, float(target @ embed(f"{name}. {desc}")))
+
+    return calibrate(cosine)
@@ -0,0 +1,181 @@
+"""
+Approximate-nearest-neighbour indexes for the RAG vector store.
+
+The LangChain store (index.faiss + index.pkl) stays a flat index: it is the
+exact, incrementally updatable copy MemCreator adds to and deletes from. When
+FAISS_INDEX_TYPE is not "flat", MemCreator also trains an ANN index over the
+same vectors, in the same order, and writes it next to the store as
+index.ann.faiss. Query.py swaps it in at load time and applies the search
+parameters below, so the docstore mapping is shared and nothing else changes.
+
+Because the two share row numbers, index.ann.json records a fingerprint of
+the store's row -> chunk ID mapping the ANN index was built from. Query.py
+only uses the ANN index when that fingerprint matches the store it loaded;
+otherwise it falls back to exact search.
+
+    flat       exact search (default)
+    ivf-flat   inverted lists over k-means cells; search nprobe cells
+    hnsw       graph search; efSearch controls the candidate list
+    ivf-pq     inverted lists with product-quantized vectors (smallest memory)
+
+Environment (build):
+    FAISS_INDEX_TYPE          one of the types above (default flat)
+    FAISS_NLIST               IVF cells (default ~4 * sqrt(chunks))
+    FAISS_HNSW_M              HNSW neighbours per node (default 32)
+    FAISS_HNSW_EF_CONSTRUCTION  (default 200)
+    FAISS_PQ_M                PQ sub-quantizers, must divide the vector size (default 48)
+    FAISS_PQ_BITS             bits per sub-quantizer code (default 8)
+
+Environment (search):
+    FAISS_NPROBE              IVF cells searched per query (default 16)
+    FAISS_EF_SEARCH           HNSW candidate list size (default 64)
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+from typing import Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf-flat", "hnsw", "ivf-pq")
+ANN_FILE = "index.ann.faiss"
+ANN_META_FILE = "index.ann.json"
+
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+NLIST = int(os.getenv("FAISS_NLIST", 0))
+HNSW_M = int(os.getenv("FAISS_HNSW_M", 32))
+HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", 200))
+PQ_M = int(os.getenv("FAISS_PQ_M", 48))
+PQ_BITS = int(os.getenv("FAISS_PQ_BITS", 8))
+
+NPROBE = int(os.getenv("FAISS_NPROBE", 16))
+EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", 64))
+
+# faiss warns below ~39 training points per k-means centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def default_nlist(count: int) -> int:
+    return max(1, min(int(4 * math.sqrt(count)), count // MIN_POINTS_PER_CENTROID))
+
+
+def ann_settings(index_type: str = FAISS_INDEX_TYPE) -> dict:
+    """Everything the saved ANN index was built with; a mismatch means it must be rebuilt"""
+    if index_type == "flat":
+        return {"type": "flat"}
+    return {
+        "type": index_type, "nlist": NLIST, "hnsw_m": HNSW_M,
+        "hnsw_ef_construction": HNSW_EF_CONSTRUCTION, "pq_m": PQ_M, "pq_bits": PQ_BITS
+    }
+
+
+def build_ann_index(vectors: np.ndarray, index_type: str, metric: int = faiss.METRIC_L2) -> faiss.Index:
+    """Train (where needed) and fill an index of `index_type`; row i of `vectors` becomes id i"""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS_INDEX_TYPE '{index_type}', expected one of {', '.join(INDEX_TYPES)}")
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+
+    if index_type == "flat":
+        index = faiss.IndexFlat(dim, metric)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, metric)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    else:
+        nlist = NLIST or default_nlist(count)
+        quantizer = faiss.IndexFlat(dim, metric)
+
+        if index_type == "ivf-pq" and dim % PQ_M == 0 and count >= MIN_POINTS_PER_CENTROID * 2 ** PQ_BITS:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, PQ_M, PQ_BITS, metric)
+        else:
+            if index_type == "ivf-pq":
+                print(f"⚠️ ivf-pq needs {MIN_POINTS_PER_CENTROID * 2 ** PQ_BITS} chunks and FAISS_PQ_M dividing {dim}; "
+                      f"using ivf-flat for {count} chunks")
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+
+        index.train(vectors)
+
+    index.add(vectors)
+    return index
+
+
+def set_search_params(index: faiss.Index, nprobe: int = NPROBE, ef_search: int = EF_SEARCH) -> faiss.Index:
+    """Apply query-time parameters to whichever kind of index this is"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+
+    return index
+
+
+def store_fingerprint(db) -> str:
+    """Hash of a LangChain FAISS store's rows, in order: which chunk ID each row number holds"""
+    digest = hashlib.sha256(str(db.index.ntotal).encode())
+    for row in range(db.index.ntotal):
+        digest.update(b"\0" + db.index_to_docstore_id[row].encode("utf-8"))
+    return digest.hexdigest()
+
+
+def remove_ann_index(save_path: str) -> None:
+    for file in (ANN_META_FILE, ANN_FILE):
+        path = os.path.join(save_path, file)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def write_ann_index(db, save_path: str, index_type: str = FAISS_INDEX_TYPE) -> Optional[str]:
+    """Build the ANN copy of a LangChain FAISS store's flat index (or remove a stale one when the type is flat)"""
+    remove_ann_index(save_path)
+
+    flat_index = db.index
+    if index_type == "flat" or flat_index.ntotal == 0:
+        return None
+
+    started = time.perf_counter()
+    vectors = flat_index.reconstruct_n(0, flat_index.ntotal)
+    index = build_ann_index(vectors, index_type, flat_index.metric_type)
+
+    path = os.path.join(save_path, ANN_FILE)
+    faiss.write_index(index, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+    # Written last: an ANN file without matching metadata is never used
+    meta_path = os.path.join(save_path, ANN_META_FILE)
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump({"fingerprint": store_fingerprint(db), "settings": ann_settings(index_type)}, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    print(f"✅ {index_type} index over {index.ntotal} chunks built in {time.perf_counter() - started:.1f}s: {path}")
+    return path
+
+
+def load_ann_index(save_path: str, db) -> faiss.Index:
+    """
+    The ANN index saved next to a LangChain FAISS store, tuned for search, or the
+    store's own flat index if there is none or it was built from other rows.
+    """
+    path = os.path.join(save_path, ANN_FILE)
+    meta_path = os.path.join(save_path, ANN_META_FILE)
+    if not os.path.exists(path):
+        return db.index
+
+    meta = None
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+    if meta is None or meta.get("fingerprint") != store_fingerprint(db):
+        print(f"⚠️ {path} was built from a different version of the store; "
+              f"using exact search until MemCreator is re-run")
+        return db.index
+
+    return set_search_params(faiss.read_index(path))
@@ -0,0 +1,220 @@
+"""
+Embedding stage for RAG ingestion, with an on-disk cache of chunk vectors.
+
+EmbeddingCache keeps every vector it has seen in one float32 matrix file,
+memory-mapped for reads, plus a key log: the content hash of row i on line i.
+Both files are only ever appended to, so saving a batch costs the size of
+the batch, not of the cache.
+Re-ingesting a PDF, or rebuilding the index with the model unchanged, reads
+vectors back from the map instead of running the model again. The cache lives
+in a directory per model and normalisation setting, so changing either never
+mixes vectors.
+
+ChunkEmbedder dedupes texts, serves cached vectors and embeds the rest in
+large batches, optionally across several worker processes
+(sentence-transformers' multi-process pool). One process already uses every
+core through torch's intra-op threads, so extra workers only pay off on
+machines with many cores or several devices.
+
+Environment:
+    EMBEDDING_CACHE_DIR   where caches are stored (default vectorstore/embedding_cache)
+    EMBED_BATCH_SIZE      texts per model batch (default 256)
+    EMBED_WORKERS         embedding processes (default 1)
+    EMBED_NORMALIZE       unit-length vectors, "1" or "0" (default 1)
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "vectorstore/embedding_cache")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 256))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", 1))
+EMBED_NORMALIZE = os.getenv("EMBED_NORMALIZE", "1") == "1"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_dir(model_name: str, normalize: bool = EMBED_NORMALIZE) -> str:
+    name = model_name.rstrip("/").replace("/", "--") + ("-normalized" if normalize else "")
+    return os.path.join(EMBEDDING_CACHE_DIR, name)
+
+
+class EmbeddingCache:
+    """Append-only float32 matrix on disk (memory-mapped for reads) and a content hash -> row index"""
+
+    KEY_LINE = 65  # sha256 hex digest + newline
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.keys_path = os.path.join(directory, "keys.txt")
+        self.meta_path = os.path.join(directory, "meta.json")
+        os.makedirs(directory, exist_ok=True)
+
+        self.dim: Optional[int] = None
+        self.rows: Dict[str, int] = {}
+        self._load()
+
+        self._matrix: Optional[np.memmap] = None
+
+    def _load(self) -> None:
+        self._migrate_index_json()
+        if not os.path.exists(self.meta_path):
+            return
+
+        with open(self.meta_path) as f:
+            self.dim = json.load(f)["dim"]
+
+        keys = []
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path) as f:
+                keys = [line[:-1] for line in f if line.endswith("\n")]
+
+        # Vectors are written before their keys, so an interrupted write can only leave extra vectors
+        vector_rows = os.path.getsize(self.vectors_path) // (self.dim * 4) if os.path.exists(self.vectors_path) else 0
+        self.rows = {key: row for row, key in enumerate(keys[:vector_rows])}
+
+    def _migrate_index_json(self) -> None:
+        """Caches written before the key log kept a single index.json; convert it once"""
+        legacy = os.path.join(self.directory, "index.json")
+        if not os.path.exists(legacy):
+            return
+
+        with open(legacy) as f:
+            index = json.load(f)
+        with open(self.keys_path, "w") as f:
+            f.writelines(f"{key}\n" for key in sorted(index["rows"], key=index["rows"].get))
+        self._write_meta(index["dim"])
+        os.remove(legacy)
+
+    def _write_meta(self, dim: int) -> None:
+        with open(self.meta_path + ".tmp", "w") as f:
+            json.dump({"dim": dim}, f)
+        os.replace(self.meta_path + ".tmp", self.meta_path)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.rows
+
+    def _map(self) -> Optional[np.memmap]:
+        if self._matrix is None and self.rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self.rows), self.dim))
+        return self._matrix
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for the keys that have one"""
+        matrix = self._map()
+        return {key: np.array(matrix[self.rows[key]]) for key in keys if key in self.rows}
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._write_meta(self.dim)
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Vector size {vectors.shape[1]} does not match cache size {self.dim}")
+
+        new_rows = {}
+        for row, key in enumerate(keys):
+            if key not in self.rows and key not in new_rows:
+                new_rows[key] = row
+        if not new_rows:
+            return
+
+        # Anything past the known rows is left over from an interrupted write; overwrite it
+        start = len(self.rows)
+        with open(self.vectors_path, "r+b" if os.path.exists(self.vectors_path) else "wb") as f:
+            f.truncate(start * self.dim * 4)
+            f.seek(0, os.SEEK_END)
+            f.write(vectors[list(new_rows.values())].tobytes())
+
+        with open(self.keys_path, "r+" if os.path.exists(self.keys_path) else "w") as f:
+            f.truncate(start * self.KEY_LINE)
+            f.seek(0, os.SEEK_END)
+            f.writelines(f"{key}\n" for key in new_rows)
+
+        for offset, key in enumerate(new_rows):
+            self.rows[key] = start + offset
+
+        self._matrix = None
+
+
+class ChunkEmbedder:
+    """Embeds texts through an EmbeddingCache, computing only the vectors it has not seen"""
+
+    def __init__(
+            self,
+            embeddings,
+            model_name: str,
+            batch_size: int = EMBED_BATCH_SIZE,
+            workers: int = EMBED_WORKERS,
+            normalize: bool = EMBED_NORMALIZE
+    ):
+        # The LangChain embeddings object; FAISS keeps it for embedding queries
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.workers = workers
+        self.normalize = normalize
+        self.cache = EmbeddingCache(cache_dir(model_name, normalize))
+        self.stats = {"cached": 0, "embedded": 0}
+        self._pool = None
+
+    def __enter__(self) -> "ChunkEmbedder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self.embeddings.client.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        model = getattr(self.embeddings, "client", None)
+
+        if model is None or not hasattr(model, "encode"):
+            # Not sentence-transformers: let the LangChain wrapper batch
+            vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+            if self.normalize:
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            return vectors
+
+        if self.workers > 1:
+            if self._pool is None:
+                self._pool = model.start_multi_process_pool(["cpu"] * self.workers)
+            vectors = model.encode_multi_process(
+                texts, self._pool, batch_size=self.batch_size, normalize_embeddings=self.normalize
+            )
+        else:
+            vectors = model.encode(
+                texts, batch_size=self.batch_size, normalize_embeddings=self.normalize, convert_to_numpy=True
+            )
+        return np.asarray(vectors, dtype=np.float32)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """One float32 vector per text, in order"""
+        keys = [content_hash(text) for text in texts]
+        vectors = self.cache.get_many(keys)
+        self.stats["cached"] += sum(1 for key in keys if key in vectors)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        if missing:
+            computed = self._encode(list(missing.values()))
+            self.cache.put_many(list(missing), computed)
+            vectors.update(zip(missing, computed))
+            self.stats["embedded"] += len(missing)
+
+        return np.stack([vectors[key] for key in keys]) if keys else np.zeros((0, self.cache.dim or 0), np.float32)
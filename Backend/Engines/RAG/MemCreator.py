@@ -1,5 +1,42 @@
+"""
+Builds the FAISS vector store used by the RAG chatbot from the PDFs in Data/.
+
+Ingestion is incremental: a manifest next to the index records every PDF's
+hash and, per page, the page-text hash and the IDs of its chunks. A run only
+parses PDFs whose hash changed, only embeds pages whose text changed, and
+deletes the chunks of changed pages and of PDFs removed from Data/. Changing
+the chunking settings or embedding model forces a full rebuild, as does a
+store whose chunk IDs do not match the manifest (a run interrupted between
+saving the two).
+
+PDFs are parsed and chunked in a process pool, largest first, and their
+chunks are streamed into the embedding stage as each PDF finishes, so parsing
+and embedding overlap and parsing scales with the number of cores. Vectors
+come from the embedding cache (EmbeddingCache.py) when a chunk's text has been
+embedded before, so rebuilds only run the model on new text.
+
+The store itself is always an exact flat index. With FAISS_INDEX_TYPE set to
+ivf-flat, hnsw or ivf-pq, an approximate index is trained on the full chunk
+set after every change and saved alongside it for Query.py (see AnnIndex.py).
+
+Run from Backend/:
+    python -m Engines.RAG.MemCreator            incremental update
+    python -m Engines.RAG.MemCreator --rebuild  rebuild from scratch
+    python -m Engines.RAG.MemCreator --index-type hnsw
+
+Environment:
+    INGEST_WORKERS   processes parsing PDFs (default: CPU count)
+    (embedding batch size, processes and cache: see EmbeddingCache.py)
+    (ANN index type and parameters: see AnnIndex.py)
+"""
+
+import argparse
+import hashlib
+import json
 import os
-from typing import List
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_community.embeddings import HuggingFaceEmbeddings
@@ -7,96 +44,325 @@ from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from Engines.RAG.AnnIndex import FAISS_INDEX_TYPE, INDEX_TYPES, ann_settings, remove_ann_index, write_ann_index
+from Engines.RAG.EmbeddingCache import ChunkEmbedder, EMBED_BATCH_SIZE, EMBED_NORMALIZE, EMBED_WORKERS
+
 
 DATA_PATH = "Data/"
 DB_FAISS_PATH = "vectorstore/db_faiss"
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+MANIFEST_FILE = "manifest.json"
+BATCH_SIZE = EMBED_BATCH_SIZE
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1))
 
 
-def load_pdf_from_directory(directory: str) -> List[Document]:
-    if not os.path.exists(directory):
-        print(f"❌ Directory not found: {directory}")
-        return []
-
-    documents = []
-    pdf_files = [f for f in os.listdir(directory) if f.lower().endswith(".pdf")]
-
-    if not pdf_files:
-        print(f"⚠️ No PDF files found in {directory}")
-        return []
+def list_pdfs(directory: str) -> List[str]:
+    return sorted(f for f in os.listdir(directory) if f.lower().endswith(".pdf"))
 
-    print(f"\n📂 Found {len(pdf_files)} PDF file(s)")
-
-    for file in pdf_files:
-        pdf_path = os.path.join(directory, file)
-        try:
-            loader = PyPDFLoader(pdf_path)
-            docs = loader.load()
-            for doc in docs:
-                doc.metadata['source_file'] = file
-
-            documents.extend(docs)
-            print(f"✅ Loaded: {file} ({len(docs)} pages)")
-        except Exception as e:
-            print(f"❌ Error loading {file}: {e}")
 
-    print(f"\n📄 Total pages loaded: {len(documents)}")
-    return documents
+def load_pdf(pdf_path: str, file: str) -> List[Document]:
+    docs = PyPDFLoader(pdf_path).load()
+    for doc in docs:
+        doc.metadata['source_file'] = file
+    return docs
 
 
-def create_chunks(
-        documents: List[Document],
-        chunk_size: int = CHUNK_SIZE,
-        chunk_overlap: int = CHUNK_OVERLAP
-) -> List[Document]:
-    if not documents:
-        print("⚠️ No documents to chunk")
-        return []
-
-    splitter = RecursiveCharacterTextSplitter(
+def get_splitter(chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         length_function=len,
         separators=["\n\n", "\n", " ", ""]
     )
 
-    chunks = splitter.split_documents(documents)
-    print(f"📚 Created {len(chunks)} text chunks")
-    print(f"   └─ Avg chunk size: {sum(len(c.page_content) for c in chunks) // len(chunks)} chars")
-
-    return chunks
-
 
 def get_embedding_model():
     print(f"\n🔧 Loading embedding model: {EMBEDDING_MODEL}")
-    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    # Queries must be normalised like the stored chunk vectors
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL, encode_kwargs={"normalize_embeddings": EMBED_NORMALIZE})
+
 
+def _embed_batch(db: Optional[FAISS], chunks: List[Document], ids: List[str], embedder: ChunkEmbedder) -> FAISS:
+    texts = [chunk.page_content for chunk in chunks]
+    text_embeddings = list(zip(texts, embedder.embed(texts).tolist()))
+    metadatas = [chunk.metadata for chunk in chunks]
 
-def create_vector_store(chunks: List[Document], embeddings, save_path: str) -> FAISS:
-    if not chunks:
-        raise ValueError("No chunks provided to create vector store")
+    if db is None:
+        return FAISS.from_embeddings(text_embeddings, embedder.embeddings, metadatas=metadatas, ids=ids)
+    db.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+    return db
 
-    print(f"\n🔄 Creating FAISS vector store (this may take a while)...")
 
-    batch_size = 100
-    db = None
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(file: str, page: str, page_digest: str, index: int) -> str:
+    """Stable ID: the same page text at the same place in a file always yields the same chunk IDs"""
+    return hashlib.sha1(f"{file}|{page}|{page_digest}|{index}".encode("utf-8")).hexdigest()
+
+
+def index_settings() -> dict:
+    """Anything that changes the chunks or vectors; a mismatch forces a rebuild"""
+    return {
+        "embedding_model": EMBEDDING_MODEL,
+        "normalize_embeddings": EMBED_NORMALIZE,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP
+    }
+
+
+def load_manifest(save_path: str) -> Optional[dict]:
+    path = os.path.join(save_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(save_path: str, manifest: dict) -> None:
+    path = os.path.join(save_path, MANIFEST_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def _page_ids(entry: dict) -> List[str]:
+    return [chunk for page in entry["pages"].values() for chunk in page["chunk_ids"]]
+
+
+def _save_search_index(db: FAISS, save_path: str, manifest: dict, index_type: str) -> None:
+    """Build the ANN index and record it in the manifest; a failure leaves exact search in place"""
+    try:
+        write_ann_index(db, save_path, index_type)
+    except Exception as e:
+        print(f"⚠️ Could not build the {index_type} index ({e}); Query.py will use exact search")
+        return
+    save_manifest(save_path, {**manifest, "ann": ann_settings(index_type)})
+
+
+def _parse_pdf(job: Tuple[str, str, str, dict]) -> dict:
+    """Load one PDF and chunk the pages whose text changed (runs in a worker process)"""
+    directory, file, digest, old_pages = job
+    started = time.perf_counter()
+
+    pages = load_pdf(os.path.join(directory, file), file)
+    splitter = get_splitter()
+
+    entry = {"sha256": digest, "pages": {}}
+    chunks: List[Document] = []
+    ids: List[str] = []
+
+    changed_pages = 0
+
+    for page in pages:
+        key = str(page.metadata.get("page", len(entry["pages"])))
+        page_digest = text_hash(page.page_content)
+
+        if key in old_pages and old_pages[key]["sha256"] == page_digest:
+            entry["pages"][key] = old_pages[key]
+            continue
+
+        page_chunks = splitter.split_documents([page])
+        page_ids = [chunk_id(file, key, page_digest, i) for i in range(len(page_chunks))]
+        chunks.extend(page_chunks)
+        ids.extend(page_ids)
+        entry["pages"][key] = {"sha256": page_digest, "chunk_ids": page_ids}
+        changed_pages += 1
+
+    return {
+        "entry": entry,
+        "chunks": chunks,
+        "ids": ids,
+        "pages": len(pages),
+        "changed_pages": changed_pages,
+        "seconds": time.perf_counter() - started
+    }
+
+
+def _parse_all(jobs: List[Tuple[str, str, str, dict]], workers: int) -> Iterator[Tuple[str, Optional[dict], Optional[Exception]]]:
+    """Yield (file, result, error) for each job as soon as it finishes"""
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            try:
+                yield job[1], _parse_pdf(job), None
+            except Exception as e:
+                yield job[1], None, e
+        return
 
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i:i + batch_size]
-        print(f"   Processing batch {i // batch_size + 1}/{(len(chunks) - 1) // batch_size + 1}")
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {pool.submit(_parse_pdf, job): job[1] for job in jobs}
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], None if error else future.result(), error
+
+
+def _embed_pending(
+        db: Optional[FAISS],
+        chunks: List[Document],
+        ids: List[str],
+        embedder: ChunkEmbedder,
+        metrics: dict,
+        final: bool = False
+) -> Optional[FAISS]:
+    """Embed full batches from the pending buffer (and the remainder when `final`), consuming it"""
+    while len(chunks) >= BATCH_SIZE or (final and chunks):
+        started = time.perf_counter()
+        db = _embed_batch(db, chunks[:BATCH_SIZE], ids[:BATCH_SIZE], embedder)
+        metrics["embed_seconds"] += time.perf_counter() - started
+        metrics["chunks"] += len(chunks[:BATCH_SIZE])
+        del chunks[:BATCH_SIZE], ids[:BATCH_SIZE]
+        print(f"   Embedded {metrics['chunks']} chunks ({metrics['chunks'] / metrics['embed_seconds']:.1f} chunks/s)")
 
-        if db is None:
-            db = FAISS.from_documents(batch, embeddings)
+    return db
+
+
+def ingest(
+        directory: str = DATA_PATH,
+        save_path: str = DB_FAISS_PATH,
+        rebuild: bool = False,
+        workers: int = INGEST_WORKERS,
+        embed_workers: int = EMBED_WORKERS,
+        index_type: str = FAISS_INDEX_TYPE
+) -> Optional[FAISS]:
+    """
+    Bring the vector store in line with the PDFs in `directory`, embedding only
+    new or changed pages and deleting chunks whose page or PDF is gone, then
+    retrain the `index_type` search index if anything changed.
+    """
+    if not os.path.exists(directory):
+        print(f"❌ Directory not found: {directory}")
+        return None
+
+    embeddings = get_embedding_model()
+
+    manifest = None if rebuild else load_manifest(save_path)
+    if manifest is not None and manifest.get("settings") != index_settings():
+        print("⚠️ Chunking or embedding settings changed, rebuilding from scratch")
+        manifest = None
+
+    db = None
+    if manifest is not None:
+        try:
+            db = FAISS.load_local(save_path, embeddings, allow_dangerous_deserialization=True)
+        except Exception as e:
+            print(f"⚠️ Could not load existing vector store ({e}), rebuilding from scratch")
+            manifest = None
+
+    if db is not None:
+        expected = {chunk for entry in manifest["files"].values() for chunk in _page_ids(entry)}
+        if set(db.index_to_docstore_id.values()) != expected:
+            print("⚠️ Vector store does not match the manifest (interrupted save?), rebuilding from scratch")
+            db, manifest = None, None
+
+    old_files: Dict[str, dict] = manifest["files"] if manifest is not None else {}
+    files: Dict[str, dict] = {}
+    counts = {"unchanged": 0, "updated": 0, "added": 0, "removed": 0}
+
+    jobs = []
+    for file in list_pdfs(directory):
+        digest = file_hash(os.path.join(directory, file))
+        previous = old_files.get(file)
+
+        if previous is not None and previous["sha256"] == digest:
+            files[file] = previous
+            counts["unchanged"] += 1
         else:
-            batch_db = FAISS.from_documents(batch, embeddings)
-            db.merge_from(batch_db)
+            jobs.append((directory, file, digest, previous["pages"] if previous is not None else {}))
+
+    # Largest PDFs first so one big file does not start last and hold up the pool
+    jobs.sort(key=lambda job: os.path.getsize(os.path.join(directory, job[1])), reverse=True)
 
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    metrics = {"pages": 0, "chunks": 0, "parse_seconds": 0.0, "embed_seconds": 0.0}
+    pending_chunks: List[Document] = []
+    pending_ids: List[str] = []
+    started = time.perf_counter()
 
+    if jobs:
+        print(f"\n⚙️ Parsing {len(jobs)} PDF(s) with {max(1, min(workers, len(jobs)))} worker(s)")
+
+    embedder = ChunkEmbedder(embeddings, EMBEDDING_MODEL, workers=embed_workers)
+    try:
+        for done, (file, result, error) in enumerate(_parse_all(jobs, workers), 1):
+            previous = old_files.get(file)
+
+            if error is not None:
+                print(f"[{done}/{len(jobs)}] ❌ Error loading {file}: {error}")
+                if previous is not None:
+                    # Keep serving the last good version
+                    files[file] = previous
+                continue
+
+            files[file] = result["entry"]
+            counts["updated" if previous is not None else "added"] += 1
+            metrics["pages"] += result["pages"]
+            metrics["parse_seconds"] += result["seconds"]
+            print(f"[{done}/{len(jobs)}] ✅ {'Updated' if previous is not None else 'Added'}: {file} "
+                  f"({result['changed_pages']}/{result['pages']} pages, {len(result['chunks'])} chunks to embed, "
+                  f"parsed in {result['seconds']:.1f}s)")
+
+            # Stream chunks into the embedding stage while other PDFs are still being parsed
+            pending_chunks.extend(result["chunks"])
+            pending_ids.extend(result["ids"])
+            db = _embed_pending(db, pending_chunks, pending_ids, embedder, metrics)
+
+        db = _embed_pending(db, pending_chunks, pending_ids, embedder, metrics, final=True)
+    finally:
+        embedder.close()
+
+    # Chunks of changed pages, removed pages and removed PDFs
+    kept = {chunk for entry in files.values() for chunk in _page_ids(entry)}
+    stale = [chunk for entry in old_files.values() for chunk in _page_ids(entry) if chunk not in kept]
+
+    for file in old_files:
+        if file not in files:
+            counts["removed"] += 1
+            print(f"🗑️ Removed: {file}")
+
+    print(f"\n📄 PDFs: {counts['added']} new, {counts['updated']} changed, "
+          f"{counts['removed']} removed, {counts['unchanged']} unchanged")
+    print(f"📚 Chunks: {metrics['chunks']} added ({embedder.stats['cached']} vectors from cache, "
+          f"{embedder.stats['embedded']} embedded), {len(stale)} to delete")
+
+    if jobs:
+        elapsed = time.perf_counter() - started
+        print(f"⏱️ {metrics['pages']} pages in {elapsed:.1f}s wall "
+              f"({metrics['pages'] / elapsed:.1f} pages/s, {metrics['parse_seconds']:.1f}s parsing across workers, "
+              f"{metrics['embed_seconds']:.1f}s embedding)")
+
+    if not jobs and not stale and db is not None:
+        print("✅ Vector store already up to date")
+        if manifest.get("ann") != ann_settings(index_type):
+            # Only the search index settings changed (or its last build failed); chunks and vectors are reused
+            _save_search_index(db, save_path, manifest, index_type)
+        return db
+
+    if stale and db is not None:
+        db.delete(stale)
+
+    if db is None:
+        print("⚠️ Nothing to index")
+        return None
+
+    os.makedirs(save_path, exist_ok=True)
+    # Never leave an ANN index built over the old rows next to the new store
+    remove_ann_index(save_path)
     db.save_local(save_path)
-    print(f"✅ FAISS vector store saved at: {save_path}")
+    manifest = {"settings": index_settings(), "ann": None, "files": files}
+    save_manifest(save_path, manifest)
+    print(f"✅ FAISS vector store saved at: {save_path} ({db.index.ntotal} chunks)")
+
+    _save_search_index(db, save_path, manifest, index_type)
 
     return db
 
@@ -115,51 +381,41 @@ def test_vector_store(db: FAISS, query: str = "protein intake"):
 
 def main():
     """Main execution pipeline"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="ignore the manifest and rebuild from scratch")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--out", default=DB_FAISS_PATH)
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--embed-workers", type=int, default=EMBED_WORKERS)
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=FAISS_INDEX_TYPE,
+                        help="search index saved for Query.py (default: FAISS_INDEX_TYPE or flat)")
+    args = parser.parse_args()
+
     print("\n" + "=" * 60)
     print("PDF Ingestion and Vector Store Creation Pipeline")
     print("=" * 60)
 
-    # Step 1: Load PDFs
-    print("\n[STEP 1] Loading PDF documents...")
-    documents = load_pdf_from_directory(DATA_PATH)
-
-    if not documents:
-        print("\n❌ No documents loaded. Exiting.")
-        return
-
-    # Step 2: Create chunks
-    print("\n[STEP 2] Creating text chunks...")
-    text_chunks = create_chunks(documents, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-
-    if not text_chunks:
-        print("\n❌ No chunks created. Exiting.")
-        return
-
-    # Step 3: Initialize embeddings
-    print("\n[STEP 3] Initializing embedding model...")
-    embedding_model = get_embedding_model()
-
-    # Step 4: Create and save vector store
-    print("\n[STEP 4] Creating vector store...")
     try:
-        db = create_vector_store(text_chunks, embedding_model, DB_FAISS_PATH)
-
-        # Step 5: Test the vector store
-        print("\n[STEP 5] Testing vector store...")
-        test_vector_store(db)
-
-        print("\n" + "=" * 60)
-        print("✅ Pipeline completed successfully!")
-        print("=" * 60)
-        print(f"\nVector store statistics:")
-        print(f"  • Total documents processed: {len(documents)}")
-        print(f"  • Total chunks created: {len(text_chunks)}")
-        print(f"  • Storage location: {DB_FAISS_PATH}")
-
+        db = ingest(args.data, args.out, rebuild=args.rebuild, workers=args.workers, embed_workers=args.embed_workers,
+                    index_type=args.index_type)
     except Exception as e:
         print(f"\n❌ Failed to create vector store: {e}")
         raise
 
+    if db is None:
+        print("\n❌ No documents indexed. Exiting.")
+        return
+
+    # Test the vector store
+    test_vector_store(db)
+
+    print("\n" + "=" * 60)
+    print("✅ Pipeline completed successfully!")
+    print("=" * 60)
+    print(f"\nVector store statistics:")
+    print(f"  • Total chunks indexed: {db.index.ntotal}")
+    print(f"  • Storage location: {args.out}")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -9,42 +9,36 @@ from langchain_community.vectorstores import FAISS
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_huggingface import HuggingFaceEmbeddings
 
+import Engines.ML_Engine.embeddings  # registers minilm_embeddings
+from Engines.RAG.AnnIndex import load_ann_index
+from Engines.Registry import registry
 
 load_dotenv()
-API_KEY = os.getenv("GEMINI_API_KEY")
 
-if not API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
+DB_FAISS_PATH = "vectorstore/db_faiss"
 
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=API_KEY,
-    temperature=0.3,
-    max_tokens=1024,
-    convert_system_message_to_human=True
-)
+def _load_vectorstore() -> FAISS:
+    print("Loading vector store...")
+    try:
+        vectorstore = FAISS.load_local(
+            DB_FAISS_PATH,
+            registry.get("minilm_embeddings"),
+            allow_dangerous_deserialization=True
+        )
+        # Swap in the IVF/HNSW index MemCreator trained, if any, with FAISS_NPROBE / FAISS_EF_SEARCH applied
+        vectorstore.index = load_ann_index(DB_FAISS_PATH, vectorstore)
+        print(f"✅ Vector store loaded successfully ({type(vectorstore.index).__name__})")
+        return vectorstore
+    except Exception as e:
+        print(f"❌ Error loading vector store: {e}")
+        raise
 
-print("Loading embeddings and vector store...")
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-DB_FAISS_PATH = "vectorstore/db_faiss"
 
-try:
-    vectorstore = FAISS.load_local(
-        DB_FAISS_PATH,
-        embeddings,
-        allow_dangerous_deserialization=True
-    )
-    retriever = vectorstore.as_retriever(
-        search_type="similarity",
-        search_kwargs={"k": 5}
-    )
-    print("✅ Vector store loaded successfully")
-except Exception as e:
-    print(f"❌ Error loading vector store: {e}")
-    raise
+# Loaded on first chatbot call (or at startup via WARMUP_MODELS)
+registry.register("faiss_index", _load_vectorstore, fork_safe=True)
+
 
 history_aware_prompt = ChatPromptTemplate.from_messages([
     ("system", """Given the chat history and the latest user question, rephrase the question to be standalone.
@@ -88,13 +82,34 @@ If no relevant context is found above, inform the user politely and provide gene
 ])
 
 
-print("Creating retrieval chains")
-history_aware_retriever = create_history_aware_retriever(
-    llm, retriever, history_aware_prompt
-)
+def _build_retrieval_chain():
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash",
+        google_api_key=api_key,
+        temperature=0.3,
+        max_tokens=1024,
+        convert_system_message_to_human=True
+    )
+
+    retriever = registry.get("faiss_index").as_retriever(
+        search_type="similarity",
+        search_kwargs={"k": 5}
+    )
+
+    print("Creating retrieval chains")
+    history_aware_retriever = create_history_aware_retriever(
+        llm, retriever, history_aware_prompt
+    )
+
+    question_answer_chain = create_stuff_documents_chain(llm, qa_prompt)
+    return create_retrieval_chain(history_aware_retriever, question_answer_chain)
+
 
-question_answer_chain = create_stuff_documents_chain(llm, qa_prompt)
-retrieval_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
+registry.register("rag_chain", _build_retrieval_chain)
 
 
 def query_chain(
@@ -111,7 +126,7 @@ def query_chain(
             print(f"📝 Chat history length: {len(chat_history)}")
 
 
-        response = retrieval_chain.invoke({
+        response = registry.get("rag_chain").invoke({
             "input": question,
             "chat_history": chat_history
         })
@@ -0,0 +1,148 @@
+"""
+Lazy registry for heavyweight models (classifiers, embeddings, FAISS, LLM clients).
+
+Modules register a loader at import time, which is cheap, and call
+registry.get(name) when they actually need the object. Each model is loaded
+at most once per process, on first use or by an explicit warm-up, and its load
+time and state are recorded for the readiness endpoint and startup report.
+
+Models registered as fork_safe (plain weights/indexes, no gRPC channels or
+threads) can be preloaded in a pre-fork master process. Forked workers then
+share those pages copy-on-write instead of each loading their own copy.
+
+Environment:
+    WARMUP_MODELS   comma-separated models to load eagerly at startup, or "all"
+                    (default: none, everything loads on first use); an unknown
+                    name fails startup
+    PRELOAD_MODELS  fork-safe models to load in the gunicorn master before
+                    workers fork, or "all" (default: every fork-safe model)
+"""
+
+import gc
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._fork_safe: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any], fork_safe: bool = False) -> None:
+        """Register how to build `name`; nothing is loaded until it is needed"""
+        with self._lock:
+            self._loaders[name] = loader
+            self._fork_safe[name] = fork_safe
+            self._locks.setdefault(name, threading.Lock())
+            self._status.setdefault(name, {"state": "unloaded", "load_seconds": None, "error": None})
+
+    def get(self, name: str) -> Any:
+        """The loaded model, loading it on first use (concurrent callers wait for one load)"""
+        if name in self._models:
+            return self._models[name]
+
+        if name not in self._loaders:
+            raise KeyError(f"No model registered as '{name}'")
+
+        with self._locks[name]:
+            if name in self._models:
+                return self._models[name]
+
+            self._status[name].update(state="loading", error=None)
+            started = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                self._status[name].update(state="failed", error=str(e))
+                logger.error(f"Failed to load model '{name}': {e}")
+                raise
+
+            elapsed = time.perf_counter() - started
+            self._models[name] = model
+            self._status[name].update(state="ready", load_seconds=round(elapsed, 3))
+            logger.info(f"Loaded model '{name}' in {elapsed:.2f}s")
+            return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def names(self) -> List[str]:
+        return list(self._loaders)
+
+    def fork_safe_names(self) -> List[str]:
+        return [name for name, safe in self._fork_safe.items() if safe]
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: dict(status) for name, status in self._status.items()}
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Load the given models (default: all registered), collecting failures instead of raising"""
+        for name in names if names is not None else self.names():
+            try:
+                self.get(name)
+            except Exception:
+                pass
+        return self.status()
+
+    def warm_up_in_background(self, names: Optional[Iterable[str]] = None) -> threading.Thread:
+        thread = threading.Thread(target=self.warm_up, args=(names,), name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+registry = ModelRegistry()
+
+
+def _names_from_env(variable: str, default: str, all_names: List[str]) -> List[str]:
+    value = os.getenv(variable, default).strip()
+    if value.lower() == "all":
+        return all_names
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def warmup_models_from_env() -> List[str]:
+    """
+    WARMUP_MODELS as a list of registered names. Raises ValueError on a name
+    nothing registered: it could never load, so /ready would stay 503 forever.
+    """
+    names = _names_from_env("WARMUP_MODELS", "", registry.names())
+    unknown = [name for name in names if name not in registry.names()]
+    if unknown:
+        raise ValueError(f"WARMUP_MODELS names unregistered model(s) {', '.join(unknown)}; "
+                         f"registered: {', '.join(registry.names())}")
+    return names
+
+
+def preload_for_fork(names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Load fork-safe models in the master process so forked workers share them.
+
+    Must run before workers fork and must not run inference (that would start
+    thread pools the children cannot use). Afterwards everything allocated so
+    far is frozen out of the garbage collector, so the children's GC passes do
+    not write to - and thereby un-share - those pages.
+    """
+    fork_safe = registry.fork_safe_names()
+    names = list(names) if names is not None else _names_from_env("PRELOAD_MODELS", "all", fork_safe)
+
+    for name in names:
+        if name not in fork_safe:
+            print(f"⚠️ Not preloading '{name}': not registered as fork-safe")
+
+    started = time.perf_counter()
+    status = registry.warm_up([name for name in names if name in fork_safe])
+    gc.freeze()
+
+    print(f"✅ Preloaded {', '.join(n for n in names if registry.is_loaded(n)) or 'nothing'} "
+          f"in {time.perf_counter() - started:.2f}s (shared copy-on-write with workers)")
+    return status
@@ -0,0 +1,34 @@
+"""
+Multi-worker deployment: gunicorn -c gunicorn.conf.py main:app
+
+Fork-safe models (classifiers, MiniLM embeddings, FAISS index) are loaded once
+in the master before the workers fork, so every worker shares one copy of
+their memory copy-on-write. The app itself (Firestore and Gemini gRPC
+clients, job queue and batcher threads) is still imported per worker, because
+gRPC channels and threads do not survive a fork.
+
+Environment:
+    WEB_CONCURRENCY   worker processes (default 2)
+    PRELOAD_MODELS    models to preload in the master (default: all fork-safe)
+"""
+
+import importlib
+import os
+
+bind = f"{os.getenv('HOST', '127.0.0.1')}:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+# Workers size their thread pools and pick the shared job queue backend from this
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = False
+
+# Modules that register the fork-safe models
+MODEL_MODULES = ["Engines.ML_Engine.core", "Engines.ML_Engine.similarity", "Engines.RAG.Query"]
+
+
+def on_starting(server):
+    for module in MODEL_MODULES:
+        importlib.import_module(module)
+
+    from Engines.Registry import preload_for_fork
+    preload_for_fork()
@@ -1,8 +1,19 @@
+import time
+
+# Boot timer starts before the heavy imports below
+BOOT_STARTED = time.perf_counter()
+
 import os
+from contextlib import asynccontextmanager
 
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from Engines.DB_Engine.UserCache import user_cache_scope
+from Engines.Generative_Engine import Gateway
+from Engines.Registry import registry, warmup_models_from_env
 
 from routes.Chatbot import BotRouter
 from routes.Habbit import HabbitRouter
@@ -13,7 +24,36 @@ from routes.User import user_router
 # Load environment variables from .env
 load_dotenv()
 
-app = FastAPI()
+IMPORT_SECONDS = time.perf_counter() - BOOT_STARTED
+
+# Models that must be loaded before /ready reports ready
+WARMUP_MODELS = warmup_models_from_env()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    boot_seconds = time.perf_counter() - BOOT_STARTED
+    app.state.boot_seconds = boot_seconds
+
+    print(f"🚀 Startup: imports {IMPORT_SECONDS:.2f}s, boot {boot_seconds:.2f}s")
+    print(f"   Models (lazy): {', '.join(registry.names())}")
+
+    if WARMUP_MODELS:
+        print(f"   Warming up in background: {', '.join(WARMUP_MODELS)}")
+        registry.warm_up_in_background(WARMUP_MODELS)
+
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def user_cache_middleware(request: Request, call_next):
+    # Read each user document at most once per request
+    with user_cache_scope():
+        return await call_next(request)
+
 
 app.include_router(user_router, prefix="/api/v1/user", tags=["User"])
 app.include_router(LogRouter, prefix="/api/v1/log", tags=["Log"])
@@ -29,6 +69,29 @@ def read_root():
 def read_root_head():
     return 1
 
+@app.get("/ready")
+def readiness():
+    # Ready once every warm-up model has loaded; the rest load on first use
+    status = registry.status()
+    ready = all(status.get(name, {}).get("state") == "ready" for name in WARMUP_MODELS)
+
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "import_seconds": round(IMPORT_SECONDS, 3),
+            "boot_seconds": round(getattr(app.state, "boot_seconds", 0.0), 3),
+            "warmup": WARMUP_MODELS,
+            "models": status
+        }
+    )
+
+
+@app.get("/llm/stats")
+def llm_stats():
+    # Gemini call counts, cache/dedup hits, token usage and latency for this worker
+    return Gateway.stats()
+
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
 import Engines.DB_Engine.Chat as Chatbot
@@ -35,7 +36,8 @@ class HistoryLimitRequest(BaseModel):
 async def process_query(request: QueryRequest):
     try:
         pipeline = Chatbot.ChatHistoryPipeline()
-        result = pipeline.process_query(
+        result = await run_in_threadpool(
+            pipeline.process_query,
             query=request.query,
             user_id=request.user_id,
             verbose=request.verbose
@@ -48,7 +50,8 @@ async def process_query(request: QueryRequest):
 @BotRouter.post("/query/simple")
 async def simple_query(request: QueryRequest):
     try:
-        answer = Chatbot.query_with_history(
+        answer = await run_in_threadpool(
+            Chatbot.query_with_history,
             query=request.query,
             user_id=request.user_id,
             verbose=request.verbose
@@ -62,7 +65,8 @@ async def simple_query(request: QueryRequest):
 async def retrieve_history(request: HistoryLimitRequest):
     try:
         pipeline = Chatbot.ChatHistoryPipeline()
-        messages = pipeline.retrieve_history(
+        messages = await run_in_threadpool(
+            pipeline.retrieve_history,
             user_id=request.user_id,
             limit=request.limit
         )
@@ -79,7 +83,7 @@ async def retrieve_history(request: HistoryLimitRequest):
 async def load_full_chat(request: UserIdRequest):
     try:
         pipeline = Chatbot.ChatHistoryPipeline()
-        messages = pipeline.load_full_chat(user_id=request.user_id)
+        messages = await run_in_threadpool(pipeline.load_full_chat, user_id=request.user_id)
         return {
             "user_id": request.user_id,
             "total_messages": len(messages),
@@ -93,7 +97,7 @@ async def load_full_chat(request: UserIdRequest):
 async def clear_history(request: ClearHistoryRequest):
     try:
         pipeline = Chatbot.ChatHistoryPipeline()
-        success = pipeline.clear_history(user_id=request.user_id)
+        success = await run_in_threadpool(pipeline.clear_history, user_id=request.user_id)
         return {
             "success": success,
             "message": f"Chat history cleared for user {request.user_id}" if success else "Failed to clear history"
@@ -106,7 +110,7 @@ async def clear_history(request: ClearHistoryRequest):
 async def get_chat_summary(request: UserIdRequest):
     try:
         pipeline = Chatbot.ChatHistoryPipeline()
-        summary = pipeline.get_chat_summary(user_id=request.user_id)
+        summary = await run_in_threadpool(pipeline.get_chat_summary, user_id=request.user_id)
         return {
             "user_id": request.user_id,
             **summary
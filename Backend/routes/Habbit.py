@@ -3,12 +3,13 @@ from fastapi import APIRouter, BackgroundTasks, HTTPException
 from fastapi.concurrency import run_in_threadpool
 
 from Engines.DB_Engine.Habbit import (
-    initiate_analysis, 
-    complete_analysis, 
-    get_analysis_report, 
-    is_analysis_in_progress
+    initiate_analysis_async,
+    complete_analysis,
+    get_analysis_report_async,
+    is_analysis_in_progress_async
 )
 from Config import firestoreDB
+from Engines.DB_Engine.UserCache import user_cache_scope
 from datetime import datetime
 from Engines.Analysis.HabitAnalyzer import generate_habit_analysis_report
 
@@ -20,7 +21,8 @@ def process_habit_analysis(user_id: str, analysis_id: str):
     """
     try:
         # Step 2: Perform the habit analysis
-        analysis_result = generate_habit_analysis_report(uid=user_id)
+        with user_cache_scope():
+            analysis_result = generate_habit_analysis_report(uid=user_id)
         
         # Step 3: Complete and update the analysis document with results
         complete_analysis(user_id=user_id, analysis_id=analysis_id, report=analysis_result)
@@ -45,14 +47,14 @@ async def refresh_habit_analysis(user_id: str, bg: BackgroundTasks):
     and return the doc id. Analysis runs in background using multithreading.
     """
     # Check if analysis is already running
-    if is_analysis_in_progress(user_id):
+    if await is_analysis_in_progress_async(user_id):
         raise HTTPException(
             status_code=409, 
             detail="Analysis already in progress for this user"
         )
     
     # Step 1: Initiate analysis and create pending document
-    analysis_id = initiate_analysis(user_id)
+    analysis_id = await initiate_analysis_async(user_id)
     
     # Step 2: Queue the analysis task in background thread
     bg.add_task(
@@ -73,7 +75,7 @@ async def get_habit_analysis_report(user_id: str):
     """
     Retrieve the latest habit analysis report for the user.
     """
-    report = get_analysis_report(user_id)
+    report = await get_analysis_report_async(user_id)
     if report is None:
         raise HTTPException(
             status_code=404, 
@@ -1,7 +1,7 @@
 from datetime import datetime, date
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, File, UploadFile, Form, BackgroundTasks
+from fastapi import APIRouter, HTTPException, File, UploadFile, Form
 from pydantic import BaseModel, Field
 from starlette.concurrency import run_in_threadpool
 
@@ -25,25 +25,32 @@ from Engines.DB_Engine.Meal import (
     get_meals_by_date,
     get_meal_entry, recommend_meal, get_combined_engagement_graph_data,
 )
-from Engines.Generative_Engine.LogAnalysis import identify_log, FoodItem as IdentifiedFoodItem, adjust_confidence, \
-    calculate_semantic_similarity, identify_image, FoodItem
-from Engines.ML_Engine.core import predict_food
+from Engines.DB_Engine.UserCache import user_cache_scope
+from Engines.Generative_Engine.LogAnalysis import FoodItem, adjust_confidence, analyse_prediction
+from Engines.Jobs.JobQueue import JobQueue
+from Engines.ML_Engine.batching import Overloaded
+from Engines.ML_Engine.core import predict_food_async
 
 LogRouter = APIRouter()
 
 
 class PredictionResponse(BaseModel):
-    result: IdentifiedFoodItem
+    result: FoodItem
     suggested_food: str
     confidence: float
     original_ml_confidence: float
+    ml_predictions: List[dict] = Field(default_factory=list, description="Top-k classifier labels with probabilities")
     timestamp: datetime = Field(default_factory=datetime.now)
 
 
 async def _classify_meal(file_contents: bytes) -> dict:
     try:
-        prediction = predict_food(file_contents)
+        prediction = await predict_food_async(file_contents)
         return prediction
+    except Overloaded:
+        # Inference queue is full: shed load instead of queueing without bound
+        raise HTTPException(status_code=503, detail="Image classifier is busy, try again shortly",
+                            headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Classification failed: {str(e)}")
 
@@ -69,69 +76,36 @@ async def predict_endpoint(
         # Read file contents
         contents = await image.read()
 
-        # Create a temporary file for identify_image (Gemini needs file path)
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-            tmp_file.write(contents)
-            tmp_file_path = tmp_file.name
+        loop = asyncio.get_event_loop()
 
-        try:
-            # Run both identification methods in parallel
-            loop = asyncio.get_event_loop()
-
-            # Run ML classification
-            ml_task = _classify_meal(contents)
-
-            # Run Gemini vision identification in thread pool
-            vision_task = loop.run_in_executor(
-                executor,
-                identify_image,
-                tmp_file_path
-            )
-
-            # Wait for both to complete
-            prediction_dict, vision_result = await asyncio.gather(ml_task, vision_task)
-
-        finally:
-            # Clean up temp file
-            import os
-            if os.path.exists(tmp_file_path):
-                os.unlink(tmp_file_path)
+        # ML classification runs locally; its label feeds the single LLM call
+        prediction_dict = await _classify_meal(contents)
 
         # Store original ML confidence
         original_ml_confidence = prediction_dict["confidence"]
         ml_classification = prediction_dict["result"]
 
-        # Get vision model results
-        vision_name = vision_result["name"]
-        vision_confidence = vision_result["confidence"]
-        vision_description = vision_result["description"]
-
-        # Calculate semantic similarity between ML classification and user input
-        ml_similarity = await loop.run_in_executor(
+        # One Gemini call: vision identification, both similarities and the ML refinement
+        analysis = await loop.run_in_executor(
             executor,
-            calculate_semantic_similarity,
+            analyse_prediction,
+            contents,
             ml_classification,
             name,
             description if description else ""
         )
 
-        # Calculate semantic similarity between vision result and user input
-        vision_similarity = await loop.run_in_executor(
-            executor,
-            calculate_semantic_similarity,
-            vision_name,
-            name,
-            description if description else ""
-        )
+        vision_confidence = analysis.vision_confidence
+        ml_similarity = analysis.ml_similarity
+        vision_similarity = analysis.vision_similarity
 
         print(
             f"ML Classification: {ml_classification} (confidence: {original_ml_confidence:.2f}, similarity: {ml_similarity:.2f})")
         print(
-            f"Vision Classification: {vision_name} (confidence: {vision_confidence:.2f}, similarity: {vision_similarity:.2f})")
+            f"Vision Classification: {analysis.vision_name} (confidence: {vision_confidence:.2f}, similarity: {vision_similarity:.2f})")
 
         # Decide which result to use
-        # Prefer identify_image (vision) in case of dispute
+        # Prefer the vision identification in case of dispute
         # Weighted score = confidence * similarity
         ml_score = original_ml_confidence * ml_similarity
         vision_score = vision_confidence * vision_similarity
@@ -139,31 +113,21 @@ async def predict_endpoint(
         # Give vision model a slight preference (1.1x multiplier)
         vision_score *= 1.1
 
+        suggested_food = ml_classification
         if vision_score >= ml_score:
             # Use vision model result
             print("Using vision model result")
-            final_name = vision_name
-            final_description = vision_description
-            suggested_food = ml_classification
+            final_name = analysis.vision_name
+            final_description = analysis.vision_description
 
             # Adjust confidence based on vision similarity
             final_confidence = adjust_confidence(vision_confidence, vision_similarity)
         else:
             # Use ML model result with LLM refinement
             print("Using ML model result with LLM refinement")
-            identified_food_item = await loop.run_in_executor(
-                executor,
-                identify_log,
-                ml_classification,
-                name,
-                original_ml_confidence,
-                description if description else ""
-            )
-
-            final_name = identified_food_item.name
-            final_description = identified_food_item.description
-            final_confidence = identified_food_item.confidence
-            suggested_food = ml_classification
+            final_name = analysis.ml_name
+            final_description = analysis.ml_description
+            final_confidence = adjust_confidence(original_ml_confidence, ml_similarity)
 
         # Create final FoodItem
         final_food_item = FoodItem(
@@ -178,6 +142,7 @@ async def predict_endpoint(
             suggested_food=suggested_food,
             confidence=final_confidence,
             original_ml_confidence=original_ml_confidence,
+            ml_predictions=prediction_dict.get("top_k", []),
             timestamp=datetime.now()
         )
 
@@ -192,7 +157,7 @@ async def predict_endpoint(
 
 @LogRouter.get("/barcode/read/{code}")
 async def get_product(code: str):
-    data = read_barcode(code)
+    data = await run_in_threadpool(read_barcode, code)
     if data is None:
         raise HTTPException(status_code=404, detail="Product not found")
     return data
@@ -210,24 +175,34 @@ def process_analysis(
         result = nutrient_analysis(name, description, amnt)
 
         # Step 3: Update doc with results
-        update_meal_entry(
-            username=username,
-            doc_id=doc_id,
-            nutrient_breakdown=result,
-            serving_size=amnt
-        )
+        with user_cache_scope():
+            update_meal_entry(
+                username=username,
+                doc_id=doc_id,
+                nutrient_breakdown=result,
+                serving_size=amnt
+            )
         print("done")
     except Exception as e:
         print(f"Analysis failed for doc {doc_id}: {str(e)}")
+        # Let the job queue retry with backoff
+        raise
+
+
+# Analysis runs on the queue's own bounded worker pool, not the request threadpool
+analysis_queue = JobQueue()
+analysis_queue.register("meal_analysis", process_analysis)
 
 
 @LogRouter.post("/analyse")
-async def analyze_endpoint(data: AnalysisRequest, bg: BackgroundTasks):
+async def analyze_endpoint(data: AnalysisRequest):
     # Step 1: Create pending doc
-    doc_id = create_pending_meal_entry(data.username)
-    bg.add_task(
-        run_in_threadpool,
-        process_analysis,
+    doc_id = await run_in_threadpool(create_pending_meal_entry, data.username)
+
+    # The meal doc ID doubles as the job ID for status lookups
+    analysis_queue.enqueue(
+        "meal_analysis",
+        job_id=doc_id,
         username=data.username,
         doc_id=doc_id,
         name=data.name,
@@ -241,11 +216,32 @@ async def analyze_endpoint(data: AnalysisRequest, bg: BackgroundTasks):
     }
 
 
+@LogRouter.get("/analyse/queue")
+async def get_analysis_queue_stats():
+    """Get worker and job counts for the analysis queue"""
+    return await run_in_threadpool(analysis_queue.stats)
+
+
+@LogRouter.get("/analyse/status/{doc_id}")
+async def get_analysis_status(doc_id: str):
+    """Get the status of a meal analysis job"""
+    job = await run_in_threadpool(analysis_queue.get_job, doc_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No analysis job found for {doc_id}")
+    return {
+        "doc_id": doc_id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "error": job.error
+    }
+
+
 @LogRouter.get("/meal/{meal_id}")
 async def get_meal(username: str, meal_id: str):
     """Get a specific meal entry"""
     try:
-        meal = get_meal_entry(username, meal_id)
+        meal = await run_in_threadpool(get_meal_entry, username, meal_id)
         return {
             "status": "success",
             "meal": meal
@@ -262,7 +258,7 @@ async def get_daily_meals(username: str, date: Optional[str] = None):
     try:
         # FIX: Use datetime.today().date() instead of date.today()
         target_date = datetime.strptime(date, "%Y-%m-%d").date() if date else datetime.today().date()
-        meals = get_meals_by_date(username, target_date)
+        meals = await run_in_threadpool(get_meals_by_date, username, target_date)
         return {
             "status": "success",
             "date": target_date.isoformat(),
@@ -281,7 +277,7 @@ async def get_meals_range(username: str, start_date: str, end_date: str):
     try:
         start = datetime.strptime(start_date, "%Y-%m-%d").date()
         end = datetime.strptime(end_date, "%Y-%m-%d").date()
-        meals = get_meals_by_range(username, start, end)
+        meals = await run_in_threadpool(get_meals_by_range, username, start, end)
         return {
             "status": "success",
             "start_date": start.isoformat(),
@@ -299,7 +295,7 @@ async def get_meals_range(username: str, start_date: str, end_date: str):
 async def delete_meal(username: str, meal_id: str):
     """Delete a meal entry"""
     try:
-        success = delete_meal_entry(username, meal_id)
+        success = await run_in_threadpool(delete_meal_entry, username, meal_id)
         return {
             "status": "success",
             "message": "Meal deleted successfully",
@@ -317,7 +313,7 @@ async def get_daily_nutrition(username: str, date: Optional[str] = None):
     try:
         # FIX: Use datetime.today().date() instead of date.today()
         target_date = datetime.strptime(date, "%Y-%m-%d").date() if date else datetime.today().date()
-        stats = get_daily_nutrition_stats(username, target_date)
+        stats = await run_in_threadpool(get_daily_nutrition_stats, username, target_date)
         return {
             "status": "success",
             **stats
@@ -333,7 +329,7 @@ async def get_weekly_nutrition(username: str, date: Optional[str] = None):
     """Get weekly nutrition summary"""
     try:
         target_date = datetime.strptime(date, "%Y-%m-%d").date() if date else None
-        summary = get_weekly_nutrition_summary(username, target_date)
+        summary = await run_in_threadpool(get_weekly_nutrition_summary, username, target_date)
         return {
             "status": "success",
             **summary
@@ -348,7 +344,7 @@ async def get_weekly_nutrition(username: str, date: Optional[str] = None):
 async def get_streak(username: str, min_meals_per_day: int = 3, days_to_check: int = 30):
     """Get user's meal logging streak"""
     try:
-        streak_data = calculate_meal_streak(username, min_meals_per_day, days_to_check)
+        streak_data = await run_in_threadpool(calculate_meal_streak, username, min_meals_per_day, days_to_check)
         return {
             "status": "success",
             **streak_data
@@ -370,7 +366,7 @@ async def get_top_nutrients_endpoint(
     try:
         start = datetime.strptime(start_date, "%Y-%m-%d").date()
         end = datetime.strptime(end_date, "%Y-%m-%d").date()
-        top_nutrients = get_top_nutrients(username, start, end, top_n)
+        top_nutrients = await run_in_threadpool(get_top_nutrients, username, start, end, top_n)
         return {
             "status": "success",
             **top_nutrients
@@ -392,7 +388,7 @@ async def get_nutrient_timeline_endpoint(
     try:
         start = datetime.strptime(start_date, "%Y-%m-%d").date()
         end = datetime.strptime(end_date, "%Y-%m-%d").date()
-        timeline = get_nutrient_timeline(username, nutrient_name, start, end)
+        timeline = await run_in_threadpool(get_nutrient_timeline, username, nutrient_name, start, end)
         return {
             "status": "success",
             **timeline
@@ -415,7 +411,7 @@ async def get_nutrient_distribution_endpoint(
         start = datetime.strptime(start_date, "%Y-%m-%d").date()
         end = datetime.strptime(end_date, "%Y-%m-%d").date()
         nutrient_list = nutrients.split(",") if nutrients else None
-        distribution = get_nutrient_distribution(username, start, end, nutrient_list)
+        distribution = await run_in_threadpool(get_nutrient_distribution, username, start, end, nutrient_list)
         return {
             "status": "success",
             **distribution
@@ -432,7 +428,7 @@ async def get_macro_breakdown_endpoint(username: str, date: Optional[str] = None
     try:
         # FIX: Use datetime.today().date() instead of date.today()
         target_date = datetime.strptime(date, "%Y-%m-%d").date() if date else datetime.today().date()
-        breakdown = get_macro_breakdown(username, target_date)
+        breakdown = await run_in_threadpool(get_macro_breakdown, username, target_date)
         return {
             "status": "success",
             **breakdown
@@ -453,7 +449,7 @@ async def get_category_breakdown_endpoint(
     try:
         start = datetime.strptime(start_date, "%Y-%m-%d").date()
         end = datetime.strptime(end_date, "%Y-%m-%d").date()
-        breakdown = get_category_breakdown(username, start, end)
+        breakdown = await run_in_threadpool(get_category_breakdown, username, start, end)
         return {
             "status": "success",
             **breakdown
@@ -476,7 +472,7 @@ async def compare_nutrients_endpoint(
         start = datetime.strptime(start_date, "%Y-%m-%d").date()
         end = datetime.strptime(end_date, "%Y-%m-%d").date()
         nutrient_list = nutrients.split(",")
-        comparison = get_nutrient_comparison(username, nutrient_list, start, end)
+        comparison = await run_in_threadpool(get_nutrient_comparison, username, nutrient_list, start, end)
         return {
             "status": "success",
             **comparison
@@ -490,7 +486,7 @@ async def compare_nutrients_endpoint(
 async def get_recommendations_endpoint(username:str , goal:str):
      """Get recommendations for a specific goal"""
      try:
-         result = recommend_meal(username, goal)
+         result = await run_in_threadpool(recommend_meal, username, goal)
          return result
      except ValueError as e:
          raise HTTPException(status_code=400, detail=str(e))
@@ -515,7 +511,7 @@ async def get_engagement_graph(
                 raise HTTPException(status_code=400, detail="Invalid end_date format. Use ISO format (YYYY-MM-DD)")
 
         # Get combined engagement data
-        result = get_combined_engagement_graph_data(username, days, parsed_end_date)
+        result = await run_in_threadpool(get_combined_engagement_graph_data, username, days, parsed_end_date)
 
         return {
             "success": True,
@@ -2,6 +2,7 @@ from datetime import datetime, date
 from typing import Optional, List
 
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 
 from Engines.DB_Engine.Water import (
@@ -61,7 +62,7 @@ class WeeklySummaryResponse(BaseModel):
 async def create_water_intake(username: str, intake: WaterIntakeCreate):
     """Add a new water intake entry for a user"""
     try:
-        result = add_water_intake(username, intake.amount, intake.timestamp)
+        result = await run_in_threadpool(add_water_intake, username, intake.amount, intake.timestamp)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -73,7 +74,7 @@ async def create_water_intake(username: str, intake: WaterIntakeCreate):
 async def create_quick_glass(username: str):
     """Add a quick glass of water (uses user's default glass size)"""
     try:
-        result = add_quick_glass(username)
+        result = await run_in_threadpool(add_quick_glass, username)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -85,7 +86,7 @@ async def create_quick_glass(username: str):
 async def get_water_by_date(username: str, target_date: date):
     """Get all water intakes for a specific date"""
     try:
-        intakes = get_water_intake_by_date(username, target_date)
+        intakes = await run_in_threadpool(get_water_intake_by_date, username, target_date)
         return intakes
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -97,7 +98,7 @@ async def get_water_by_date(username: str, target_date: date):
 async def get_water_by_range(username: str, start_date: date, end_date: date):
     """Get all water intakes within a date range"""
     try:
-        intakes = get_water_intake_by_range(username, start_date, end_date)
+        intakes = await run_in_threadpool(get_water_intake_by_range, username, start_date, end_date)
         return intakes
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -109,7 +110,7 @@ async def get_water_by_range(username: str, start_date: date, end_date: date):
 async def update_water(username: str, intake_id: str, intake_update: WaterIntakeUpdate):
     """Update an existing water intake entry"""
     try:
-        result = update_water_intake(username, intake_id, intake_update.amount, intake_update.timestamp)
+        result = await run_in_threadpool(update_water_intake, username, intake_id, intake_update.amount, intake_update.timestamp)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -121,7 +122,7 @@ async def update_water(username: str, intake_id: str, intake_update: WaterIntake
 async def delete_water(username: str, intake_id: str):
     """Delete a water intake entry"""
     try:
-        success = delete_water_intake(username, intake_id)
+        success = await run_in_threadpool(delete_water_intake, username, intake_id)
         return {"success": success, "message": "Water intake deleted successfully"}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -133,7 +134,7 @@ async def delete_water(username: str, intake_id: str):
 async def get_daily_stats(username: str, target_date: date):
     """Get daily water intake statistics"""
     try:
-        stats = get_daily_water_stats(username, target_date)
+        stats = await run_in_threadpool(get_daily_water_stats, username, target_date)
         return stats
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -145,7 +146,7 @@ async def get_daily_stats(username: str, target_date: date):
 async def get_today_stats(username: str):
     """Get today's water intake statistics"""
     try:
-        stats = get_daily_water_stats(username, date.today())
+        stats = await run_in_threadpool(get_daily_water_stats, username, date.today())
         return stats
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -157,7 +158,7 @@ async def get_today_stats(username: str):
 async def get_water_streak(username: str, target_percentage: float = 80.0, days_to_check: int = 30):
     """Calculate water intake streak"""
     try:
-        streak = calculate_water_streak(username, target_percentage, days_to_check)
+        streak = await run_in_threadpool(calculate_water_streak, username, target_percentage, days_to_check)
         return streak
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -169,7 +170,7 @@ async def get_water_streak(username: str, target_percentage: float = 80.0, days_
 async def get_weekly_water_summary(username: str, target_date: Optional[date] = None):
     """Get weekly water intake summary"""
     try:
-        summary = get_weekly_summary(username, target_date)
+        summary = await run_in_threadpool(get_weekly_summary, username, target_date)
         return summary
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
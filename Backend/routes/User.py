@@ -3,7 +3,9 @@ from pydantic import BaseModel, Field
 from typing import Optional, List
 from enum import Enum
 from datetime import datetime
-from Config import firestoreDB
+from Config import firestoreAsyncDB
+from Engines.DB_Engine.Rollup import ROLLUP_VERSION
+from Engines.DB_Engine.UserCache import get_user_doc_async, invalidate_user
 
 
 class Gender(str, Enum):
@@ -55,8 +57,8 @@ async def init_user(user: User):
     """Create a user in Firestore using username as document ID"""
     try:
         # Check if username already exists
-        doc_ref = firestoreDB.collection("users").document(user.username)
-        if doc_ref.get().exists:
+        doc_ref = firestoreAsyncDB.collection("users").document(user.username)
+        if (await get_user_doc_async(user.username)).exists:
             raise HTTPException(status_code=409, detail="Username already exists")
 
         # Prepare user data for storage
@@ -71,12 +73,14 @@ async def init_user(user: User):
             "activity_factor": user.activity_factor,
             "GlassSize": 250.0,  # Auto-initialize with default value
             "Water": [],  # Auto-initialize as empty list
+            "rollup_version": ROLLUP_VERSION,  # New users have no history to backfill
             "created_at": datetime.now(),
             "updated_at": datetime.now()
         }
 
         # Store in Firestore using username as document ID
-        doc_ref.set(user_data)
+        await doc_ref.set(user_data)
+        invalidate_user(user.username)
 
         # Return the created user
         return UserResponse(
@@ -103,8 +107,7 @@ async def init_user(user: User):
 async def get_user_by_username(username: str):
     """Retrieve a user by their username"""
     try:
-        doc_ref = firestoreDB.collection("users").document(username)
-        doc = doc_ref.get()
+        doc = await get_user_doc_async(username)
 
         if not doc.exists:
             raise HTTPException(status_code=404, detail="User not found")
@@ -134,8 +137,8 @@ async def update_user(username: str, user: User):
     """Update an existing user"""
     try:
         # Check if user exists
-        doc_ref = firestoreDB.collection("users").document(username)
-        doc = doc_ref.get()
+        doc_ref = firestoreAsyncDB.collection("users").document(username)
+        doc = await get_user_doc_async(username)
 
         if not doc.exists:
             raise HTTPException(status_code=404, detail="User not found")
@@ -161,10 +164,11 @@ async def update_user(username: str, user: User):
         }
 
         # Update in Firestore
-        doc_ref.update(user_data)
+        await doc_ref.update(user_data)
+        invalidate_user(username)
 
         # Get updated document
-        updated_doc = doc_ref.get()
+        updated_doc = await get_user_doc_async(username)
         updated_data = updated_doc.to_dict()
 
         # Ensure all fields exist in response with default values
@@ -189,17 +193,18 @@ async def update_user(username: str, user: User):
 async def update_glass_size(username: str, glass_size: float):
     """Update the glass size for a user"""
     try:
-        doc_ref = firestoreDB.collection("users").document(username)
-        doc = doc_ref.get()
+        doc_ref = firestoreAsyncDB.collection("users").document(username)
+        doc = await get_user_doc_async(username)
 
         if not doc.exists:
             raise HTTPException(status_code=404, detail="User not found")
 
         # Update glass size
-        doc_ref.update({
+        await doc_ref.update({
             "GlassSize": glass_size,
             "updated_at": datetime.now()
         })
+        invalidate_user(username)
 
         return {
             "message": "Glass size updated successfully",